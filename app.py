@@ -4,11 +4,11 @@ Aplicação Flask Refatorada - Gestão de Ordens de Serviço
 Ponto de entrada principal da aplicação.
 """
 
+import io
 import os
 import logging
 import secrets
 import json
-import pandas as pd
 import datetime
 from pathlib import Path
 
@@ -19,7 +19,8 @@ try:
 except ImportError:
     pass  # python-dotenv não instalado, usando variáveis de ambiente do sistema
 
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, session
+import click
+from flask import Flask, Response, render_template, jsonify, request, redirect, url_for, flash, session, stream_with_context
 from flask_wtf.csrf import CSRFProtect
 from flask_caching import Cache
 
@@ -33,11 +34,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Imports dos serviços
-from appmodules.services import SheetsService, NotificationService, UserService
+from appmodules.services import (
+    SheetsService, NotificationService, UserService, UserDirectorySync, PasswordVerifier, DocumentStore,
+    TimeReportService, CentraisRepository, FerramentasRepository, ArquivoLog
+)
+from appmodules.services.time_report_service import formatar_horas
 from appmodules.services.whatsapp_webhook_service import WhatsAppWebhookService
 from appmodules.routes.auth_routes import auth_bp
-from appmodules.routes.os_routes import os_bp
-from appmodules.utils import login_required, admin_required
+from appmodules.routes.os_routes import os_bp, MAX_ETIQUETAS_QR
+from appmodules.utils.qr_labels import gerar_pdf_etiquetas
+from appmodules.utils import login_required, admin_required, get_current_user_role
+from appmodules.utils.text import encontrar_coluna, normalizar_texto
 from appmodules.models.usuario import Role
 
 # Inicializa serviços globais
@@ -50,10 +57,28 @@ CENTRAIS_TAB = os.getenv('GOOGLE_SHEET_CENTRAIS_TAB', 'Controle de Centrais')
 FERRAMENTAS_TAB = os.getenv('GOOGLE_SHEET_FERRAMENTAS_TAB', 'Controle de Ferramentas')
 HISTORICO_FERRAMENTAS_TAB = os.getenv('GOOGLE_SHEET_HISTORICO_FERRAMENTAS_TAB', 'Histórico de Ferramentas')
 PRODUCAO_TAB = os.getenv('GOOGLE_SHEET_PRODUCAO_TAB', 'Controle de Produção')
+# Limite de centrais por chamada de /centrais/programacao/lote
+MAX_PROGRAMACOES_LOTE = int(os.getenv('CENTRAIS_PROGRAMACAO_LOTE_MAX', '200'))
+# Paginação do histórico de ferramentas
+HISTORICO_LIMITE_PADRAO = 50
+HISTORICO_LIMITE_MAXIMO = 200
+# Arquivo local das abas que só crescem (ver `flask arquivar-logs`). Sem padrão:
+# precisa apontar para um disco persistente, senão o deploy apaga as linhas arquivadas
+LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR', '').strip()
+HISTORICO_ARCHIVE_AFTER_DAYS = int(os.getenv('HISTORICO_ARCHIVE_AFTER_DAYS', '365'))
+HORARIO_ARCHIVE_AFTER_DAYS = int(os.getenv('HORARIO_ARCHIVE_AFTER_DAYS', '365'))
+# Conexão com a planilha e carga de usuários em segundo plano: o worker aceita
+# requisições na hora e /health informa quando os serviços estão prontos
+SERVICES_INIT_BACKGROUND = os.getenv('SERVICES_INIT_BACKGROUND', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
 
 try:
-    sheets_service = SheetsService(str(CREDS_FILE), SHEET_ID, SHEET_TAB, HORARIO_TAB, USUARIOS_TAB, PRODUCAO_TAB)
-    user_service = UserService(sheets_service)
+    sheets_service = SheetsService(str(CREDS_FILE), SHEET_ID, SHEET_TAB, HORARIO_TAB, USUARIOS_TAB, PRODUCAO_TAB,
+                                   arquivo_horario=ArquivoLog(LOG_ARCHIVE_DIR, 'horario') if LOG_ARCHIVE_DIR else None,
+                                   em_segundo_plano=SERVICES_INIT_BACKGROUND)
+    user_sync_db = os.getenv('USER_DIRECTORY_SYNC_DB', '').strip()
+    user_directory_sync = UserDirectorySync(user_sync_db) if user_sync_db else None
+    user_service = UserService(sheets_service, directory_sync=user_directory_sync,
+                               em_segundo_plano=SERVICES_INIT_BACKGROUND)
     logger.info("Serviços inicializados com sucesso")
 except Exception as e:
     logger.error(f"Erro ao inicializar serviços: {e}")
@@ -99,12 +124,21 @@ app.config.update(
 )
 
 csrf = CSRFProtect(app)
+# Upload em streaming valida o CSRF no próprio corpo multipart (ver receber_upload_stream)
+csrf.exempt('appmodules.routes.os_routes.upload_documento')
 cache = Cache(app)
 
 # Torna serviços disponíveis globalmente
 app.config['sheets_service'] = sheets_service
 app.config['user_service'] = user_service
+app.config['password_verifier'] = PasswordVerifier.from_env(user_service) if user_service else None
 app.config['notification_service'] = NotificationService
+app.config['time_report_service'] = TimeReportService()
+app.config['centrais_repository'] = CentraisRepository(sheets_service, CENTRAIS_TAB) if sheets_service else None
+app.config['ferramentas_repository'] = FerramentasRepository(
+    sheets_service, FERRAMENTAS_TAB, HISTORICO_FERRAMENTAS_TAB,
+    arquivo_historico=ArquivoLog(LOG_ARCHIVE_DIR, 'historico_ferramentas') if LOG_ARCHIVE_DIR else None
+) if sheets_service else None
 
 # Inicializa serviço de webhook WhatsApp
 webhook_service = WhatsAppWebhookService(sheets_service=sheets_service)
@@ -114,11 +148,20 @@ app.config['webhook_service'] = webhook_service
 app.register_blueprint(auth_bp)
 app.register_blueprint(os_bp)
 
+
+@app.before_request
+def sincronizar_usuarios():
+    """Aplica alterações de usuários feitas por outros workers."""
+    user_service = app.config.get('user_service')
+    if user_service:
+        user_service.sincronizar()
+
 # ════════════════════════════════════════════════════════════════════════════════
 # ROTAS DE WEBHOOK (WhatsApp)
 # ════════════════════════════════════════════════════════════════════════════════
 
 @app.route('/webhook/whatsapp', methods=['GET', 'POST'])
+@csrf.exempt
 def webhook_whatsapp():
     """
     Webhook para receber mensagens do WhatsApp.
@@ -149,6 +192,7 @@ def webhook_whatsapp():
     
     # Processar POST (mensagem recebida)
     if request.method == 'POST':
+        message_id = None
         try:
             dados = request.get_json() or {}
             
@@ -160,6 +204,14 @@ def webhook_whatsapp():
                 return jsonify({'OK': True}), 200
             
             mensagem = mensagens[0]
+
+            # Reentregas do provedor são descartadas antes de qualquer processamento;
+            # o id só fica registrado se o processamento terminar (ver except abaixo)
+            message_id = mensagem.get('id')
+            if message_id and not webhook_service.registrar_mensagem(message_id):
+                logger.info(f"Mensagem WhatsApp duplicada ignorada: {message_id}")
+                return jsonify({'OK': True, 'duplicada': True}), 200
+
             tipo = mensagem.get('type', 'unknown')
             
             # Processar apenas mensagens de texto
@@ -198,6 +250,9 @@ def webhook_whatsapp():
             
         except Exception as e:
             logger.error(f"Erro ao processar webhook: {e}", exc_info=True)
+            if message_id:
+                # Falhou: a reentrega do provedor precisa ser processada
+                webhook_service.liberar_mensagem(message_id)
             return jsonify({'erro': str(e)}), 500
 
 
@@ -273,12 +328,11 @@ def usuarios_admin():
 def relatorios():
     """Página de relatórios."""
     import datetime as dt
+    # pandas só é carregado na primeira requisição que precisa dele
+    import pandas as pd
 
     def _first_col(df, *candidatos):
-        for col in candidatos:
-            if col in df.columns:
-                return col
-        return None
+        return encontrar_coluna(df.columns, *candidatos)
 
     def _parse_datetime_maybe_time(valor, base_dt):
         if valor is None:
@@ -485,8 +539,99 @@ def relatorios():
 @admin_required
 def tempo_por_funcionario():
     """Página com tempo de trabalho por funcionário."""
-    return render_template('tempo_por_funcionario.html',
-        dados=[], chart_data={}, total_registros=0)
+    import pandas as pd
+
+    funcionario = request.args.get('funcionario', '').strip()
+    pedido_os = request.args.get('pedido_os', '').strip()
+    data_inicio = request.args.get('data_inicio', '').strip()
+    data_fim = request.args.get('data_fim', '').strip()
+    per_page = max(5, min(100, _parse_int_field(request.args.get('per_page'), 20)))
+    page = max(1, _parse_int_field(request.args.get('page'), 1))
+
+    contexto = dict(
+        funcionario=funcionario, pedido_os=pedido_os,
+        data_inicio=data_inicio, data_fim=data_fim,
+        data_inicio_iso=data_inicio, data_fim_iso=data_fim,
+        per_page=per_page, page=page, aviso_periodo=None,
+        dados=[], diario=[], semanal=[], total_registros=0,
+        total_horas='0h00', sessoes=0, registros_sem_par=0,
+        chart_data={'bar_labels': [], 'bar_values': [], 'urg_labels': [], 'urg_values': []})
+
+    sheets_service = app.config.get('sheets_service')
+    if not sheets_service:
+        return render_template('tempo_por_funcionario.html', **contexto,
+            mensagem_erro="Serviço de planilhas indisponível"), 503
+
+    disponivel, erro_msg = sheets_service.is_available()
+    if not disponivel:
+        return render_template('tempo_por_funcionario.html', **contexto, mensagem_erro=erro_msg)
+
+    inicio = pd.to_datetime(data_inicio, format='%Y-%m-%d', errors='coerce') if data_inicio else None
+    fim = pd.to_datetime(data_fim, format='%Y-%m-%d', errors='coerce') if data_fim else None
+    inicio = None if inicio is None or pd.isna(inicio) else inicio
+    fim = None if fim is None or pd.isna(fim) else fim
+    if inicio is not None and fim is not None and inicio > fim:
+        inicio, fim = fim, inicio
+        contexto['aviso_periodo'] = "Data início posterior à data fim: o período foi invertido."
+
+    try:
+        # Com data início, o relatório inclui os registros já arquivados desde aquele mês
+        registros = sheets_service.get_time_records_df(desde=inicio)
+        versao = f"horario-{sheets_service.time_records_versao_desde(inicio)}"
+        relatorio = app.config['time_report_service'].relatorio(
+            registros, versao=versao, funcionario=funcionario, pedido_os=pedido_os,
+            data_inicio=inicio, data_fim=fim)
+
+        resumo = relatorio.resumo
+        for linha in resumo:
+            os_item = sheets_service.get_os_indexada(linha['pedido_os']) or {}
+            linha['urgencia'] = str(os_item.get('Nível de prioridade', '') or 'Desconhecida').strip()
+            linha['tempo'] = formatar_horas(linha['horas'])
+
+        export = request.args.get('export', '').strip().lower()
+        if export in ('csv', 'xlsx'):
+            df_export = pd.DataFrame(
+                resumo, columns=['funcionario', 'pedido_os', 'horas', 'sessoes', 'urgencia']
+            ).rename(columns={
+                'funcionario': 'Funcionário', 'pedido_os': 'Pedido/OS',
+                'horas': 'Horas', 'sessoes': 'Sessões', 'urgencia': 'Urgência'})
+            if export == 'xlsx':
+                try:
+                    buffer = io.BytesIO()
+                    df_export.to_excel(buffer, index=False, sheet_name='Tempo por Funcionário')
+                    return Response(buffer.getvalue(),
+                        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                        headers={'Content-Disposition': 'attachment; filename=tempo_por_funcionario.xlsx'})
+                except ImportError:
+                    logger.warning("openpyxl não instalado; exportando tempo por funcionário em CSV")
+            return Response(df_export.to_csv(index=False, sep=';', decimal=',').encode('utf-8-sig'),
+                mimetype='text/csv',
+                headers={'Content-Disposition': 'attachment; filename=tempo_por_funcionario.csv'})
+
+        horas_urgencia = {}
+        for linha in resumo:
+            horas_urgencia[linha['urgencia']] = horas_urgencia.get(linha['urgencia'], 0) + linha['horas']
+
+        contexto.update(
+            dados=resumo[(page - 1) * per_page:page * per_page],
+            diario=relatorio.diario[:60],
+            semanal=relatorio.semanal[:30],
+            total_registros=len(resumo),
+            total_horas=formatar_horas(relatorio.total_horas),
+            sessoes=relatorio.sessoes,
+            registros_sem_par=relatorio.registros_sem_par,
+            chart_data={
+                'bar_labels': [f"{l['funcionario']} · #{l['pedido_os']}" for l in resumo[:20]],
+                'bar_values': [l['horas'] for l in resumo[:20]],
+                'urg_labels': list(horas_urgencia.keys()),
+                'urg_values': [round(v, 2) for v in horas_urgencia.values()],
+            })
+        return render_template('tempo_por_funcionario.html', **contexto)
+
+    except Exception as e:
+        logger.error(f"Erro ao calcular tempo por funcionário: {e}")
+        return render_template('erro.html',
+            mensagem=f"Erro ao calcular tempo por funcionário: {e}"), 500
 
 
 # ════════════════════════════════════════════════════════════════════════════════
@@ -524,37 +669,28 @@ def handle_exception(e):
 @admin_required
 def centrais():
     """Página de controle de centrais."""
-    sheets_service = app.config.get('sheets_service')
-    if not sheets_service:
+    centrais_repository = app.config.get('centrais_repository')
+    if not centrais_repository:
         return render_template('centrais.html',
             centrais=[], mensagem="Serviço de planilhas indisponível",
             tipo_mensagem='danger'), 503
     
     if request.method == 'POST':
-        try:
-            # Adiciona nova central
-            dados = {
-                'Número de Portas': request.form.get('num_portas', ''),
-                'Código de Série': request.form.get('codigo_serie', ''),
-                'Status': request.form.get('status', ''),
-                'Obra Utilizada': request.form.get('obra', ''),
-                'Data Cadastro': pd.Timestamp.now().strftime('%d/%m/%Y %H:%M:%S'),
-                'Programação': ''
-            }
-            
-            # Garante que a aba existe
-            worksheet = get_or_create_centrais_worksheet(sheets_service)
-            
-            # Adiciona nova linha
-            worksheet.append_row(list(dados.values()))
-            
-            # Redireciona para evitar resubmissão (padrão PRG - Post-Redirect-Get)
+        # Adiciona nova central
+        adicionada = centrais_repository.adicionar(
+            numero_portas=request.form.get('num_portas', ''),
+            codigo_serie=request.form.get('codigo_serie', ''),
+            status=request.form.get('status', ''),
+            obra=request.form.get('obra', ''),
+            data_cadastro=datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+        )
+
+        # Redireciona para evitar resubmissão (padrão PRG - Post-Redirect-Get)
+        if adicionada:
             flash("Central cadastrada com sucesso!", "success")
-            return redirect(url_for('centrais'))
-        except Exception as e:
-            logger.error(f"Erro ao adicionar central: {e}", exc_info=True)
-            flash(f"Erro ao adicionar central: {e}", "danger")
-            return redirect(url_for('centrais'))
+        else:
+            flash("Erro ao adicionar central", "danger")
+        return redirect(url_for('centrais'))
     
     # GET - lista centrais e mostra mensagens flash
     mensagem = None
@@ -565,355 +701,110 @@ def centrais():
             tipo_mensagem, mensagem = flashes[0]
     
     return render_template('centrais.html',
-        centrais=get_centrais_list(sheets_service),
+        centrais=[central.como_dict() for central in centrais_repository.listar()],
         mensagem=mensagem,
         tipo_mensagem=tipo_mensagem)
 
 
-def get_or_create_centrais_worksheet(sheets_service):
-    """Obtém ou cria a worksheet de centrais."""
-    try:
-        spreadsheet = sheets_service.client.open_by_key(sheets_service.sheet_id)
-        headers_padrao = ['Número de Portas', 'Código de Série', 'Status', 'Obra Utilizada', 'Data Cadastro', 'Programação', 'Programação Resumo']
-        try:
-            worksheet = spreadsheet.worksheet(CENTRAIS_TAB)
-        except Exception:
-            # Aba não existe, cria
-            worksheet = spreadsheet.add_worksheet(title=CENTRAIS_TAB, rows=100, cols=10)
-            worksheet.append_row(headers_padrao)
-            logger.info(f"Aba '{CENTRAIS_TAB}' criada")
-        else:
-            current_headers = [str(valor or '').strip() for valor in worksheet.row_values(1)]
-            # Detecta cabeçalhos duplicados (após normalização) e loga avisos
-            normalized_counts = {}
-            for h in current_headers:
-                key = _normalizar_texto_basico(h)
-                if not key:
-                    continue
-                normalized_counts[key] = normalized_counts.get(key, 0) + 1
-            duplicates = [k for k, v in normalized_counts.items() if v > 1]
-            if duplicates:
-                logger.warning(f"Cabeçalhos duplicados detectados na aba '{CENTRAIS_TAB}': {duplicates}")
-            # Garante que as colunas de programação existam
-            need_prog = not any(_normalizar_texto_basico(campo) == 'programacao' for campo in current_headers)
-            need_prog_resumo = not any(_normalizar_texto_basico(campo) == 'programacao resumo' for campo in current_headers)
-            # Garante que a coluna Data Cadastro exista (compatibilidade com versões antigas)
-            need_data_cadastro = not any(_normalizar_texto_basico(campo) in ('data cadastro', 'data', 'cadastro') for campo in current_headers)
-            if need_prog or need_prog_resumo:
-                novos = list(current_headers)
-                if need_prog:
-                    novos.append('Programação')
-                if need_prog_resumo:
-                    novos.append('Programação Resumo')
-                if need_data_cadastro:
-                    # Inserir Data Cadastro antes da Programação, se possível
-                    # Se não houver espaço claro, acrescenta ao final
-                    insert_at = None
-                    try:
-                        idx_obra = next(i for i, h in enumerate(novos) if _normalizar_texto_basico(h) == 'obra utilizada' or _normalizar_texto_basico(h) == 'obra')
-                        insert_at = idx_obra + 1
-                    except StopIteration:
-                        insert_at = None
-                    if insert_at is not None and insert_at <= len(novos):
-                        novos.insert(insert_at, 'Data Cadastro')
-                    else:
-                        novos.append('Data Cadastro')
-                worksheet.update('A1', [novos])
-        return worksheet
-    except Exception as e:
-        logger.error(f"Erro ao obter/criar worksheet: {e}")
-        raise
-
-
-def _normalizar_texto_basico(texto):
-    """Normaliza texto para comparação simples de cabeçalhos."""
-    return (
-        str(texto or '')
-        .strip()
-        .lower()
-        .replace('á', 'a')
-        .replace('à', 'a')
-        .replace('â', 'a')
-        .replace('ã', 'a')
-        .replace('é', 'e')
-        .replace('ê', 'e')
-        .replace('í', 'i')
-        .replace('ó', 'o')
-        .replace('ô', 'o')
-        .replace('õ', 'o')
-        .replace('ú', 'u')
-        .replace('ç', 'c')
-    )
+@app.route('/centrais/atualizar/<registro_id>', methods=['POST'])
+@admin_required
+def atualizar_central(registro_id):
+    """Atualiza status de uma central."""
+    centrais_repository = app.config.get('centrais_repository')
+    if not centrais_repository:
+        return jsonify({'success': False, 'message': 'Serviço indisponível'}), 503
 
+    if centrais_repository.obter(registro_id) is None:
+        return jsonify({'success': False, 'message': 'Central não encontrada'}), 404
 
-def _programacao_json_to_summary(programacao_raw: str, total_portas: int) -> str:
-    """Converte JSON de programação em resumo legível: '1→2,3; 2→1'."""
-    try:
-        if not programacao_raw:
-            return ''
+    status = request.form.get('status', '')
+    obra = request.form.get('obra', '')
+    if not centrais_repository.atualizar_status(registro_id, status, obra):
+        return jsonify({'success': False, 'message': 'Erro ao atualizar central'}), 500
 
-        parsed = json.loads(programacao_raw)
-    except Exception:
-        return ''
+    return jsonify({'success': True, 'message': 'Central atualizada!'})
 
-    linhas = [[] for _ in range(max(0, int(total_portas or 0)))]
-
-    def process_row_item(row_index, item):
-        if row_index < 0 or row_index >= len(linhas):
-            return
-
-        # item can be list, number, or other
-        if isinstance(item, list):
-            # if elements numeric-like -> treat as numbers
-            numeric_elements = True
-            for x in item:
-                if not (isinstance(x, (int, float)) or (isinstance(x, str) and str(x).strip().lstrip('-').isdigit())):
-                    numeric_elements = False
-                    break
-
-            if numeric_elements:
-                for x in item:
-                    try:
-                        n = int(float(x)) - 1
-                        if 0 <= n < len(linhas) and n not in linhas[row_index]:
-                            linhas[row_index].append(n)
-                    except Exception:
-                        continue
-                return
-
-            # Otherwise, look for 'X' markers
-            for idx, val in enumerate(item):
-                if str(val or '').strip().upper() == 'X':
-                    if idx not in linhas[row_index]:
-                        linhas[row_index].append(idx)
-            return
-
-        # single numeric value
-        if isinstance(item, (int, float)) or (isinstance(item, str) and str(item).strip().lstrip('-').isdigit()):
-            try:
-                n = int(float(item)) - 1
-                if 0 <= n < len(linhas) and n not in linhas[row_index]:
-                    linhas[row_index].append(n)
-            except Exception:
-                pass
-
-    # parsed formats: dict with 'selecoes', array of arrays, array of numbers
-    if isinstance(parsed, dict) and 'selecoes' in parsed and isinstance(parsed['selecoes'], list):
-        for i, itm in enumerate(parsed['selecoes']):
-            process_row_item(i, itm)
-    elif isinstance(parsed, list):
-        for i, itm in enumerate(parsed):
-            process_row_item(i, itm)
-
-    parts = []
-    for i, cols in enumerate(linhas):
-        if not cols:
-            continue
-        cols_sorted = sorted(set(cols))
-        cols_text = ','.join(str(c + 1) for c in cols_sorted)
-        parts.append(f"{i + 1}→{cols_text}")
-
-    return '; '.join(parts)
-
-
-def get_centrais_list(sheets_service):
-    """Obtém lista de centrais."""
-    try:
-        worksheet = get_or_create_centrais_worksheet(sheets_service)
-        data = worksheet.get_all_values()
-        if len(data) < 2:
-            return []
 
-        headers = [str(h or '').strip() for h in data[0]]
+@app.route('/centrais/programacao/<registro_id>', methods=['POST'])
+@admin_required
+def atualizar_programacao_central(registro_id):
+    """Atualiza a programação de uma central."""
+    centrais_repository = app.config.get('centrais_repository')
+    if not centrais_repository:
+        return jsonify({'success': False, 'message': 'Serviço indisponível'}), 503
 
-        # Constroi um mapa de cabeçalhos preservando a PRIMEIRA ocorrência normalizada
-        header_map = {}
-        for i, h in enumerate(headers):
-            if not h:
-                continue
-            key = _normalizar_texto_basico(h)
-            if key and key not in header_map:
-                header_map[key] = i
-
-        def _get_val(row, *aliases):
-            for alias in aliases:
-                idx = header_map.get(_normalizar_texto_basico(alias))
-                if idx is not None and idx < len(row):
-                    return str(row[idx] or '').strip()
-            return ''
-
-        centrais_normalizadas = []
-        for linha in data[1:]:
-            if not any(str(c or '').strip() for c in linha):
-                continue
+    if centrais_repository.obter(registro_id) is None:
+        return jsonify({'success': False, 'message': 'Central não encontrada'}), 404
 
-            centrais_normalizadas.append({
-                'Número de Portas': _get_val(linha, 'Número de Portas', 'Numero de Portas', 'Portas'),
-                'Código de Série': _get_val(linha, 'Código de Série', 'Codigo de Serie', 'Codigo', 'Série'),
-                'Status': _get_val(linha, 'Status'),
-                'Obra Utilizada': _get_val(linha, 'Obra Utilizada', 'Obra'),
-                'Data Cadastro': _get_val(linha, 'Data Cadastro', 'Data de Cadastro', 'Cadastro', 'Data'),
-                'Programação': _get_val(linha, 'Programação', 'Programacao'),
-                'Programação Resumo': _get_val(linha, 'Programação Resumo', 'Programacao Resumo', 'ProgramacaoResumo', 'Programacao_Resumo'),
-            })
+    programacao_compact = _compactar_programacao(request.form.get('programacao', ''))
+    resumo = centrais_repository.atualizar_programacao(registro_id, programacao_compact)
+    if resumo is None:
+        return jsonify({'success': False, 'message': 'Erro ao atualizar programação'}), 500
 
-        return centrais_normalizadas
-    except Exception as e:
-        logger.warning(f"Erro ao obter centrais: {e}")
-        return []
+    return jsonify({'success': True, 'message': 'Programação atualizada!', 'resumo': resumo})
 
 
-@app.route('/centrais/atualizar/<int:row_id>', methods=['POST'])
-@admin_required
-def atualizar_central(row_id):
-    """Atualiza status de uma central."""
-    sheets_service = app.config.get('sheets_service')
-    if not sheets_service:
-        return jsonify({'success': False, 'message': 'Serviço indisponível'}), 503
-    
+def _compactar_programacao(programacao):
+    """Normaliza/compacta o JSON de programação para armazenamento (aceita texto ou objeto já lido)."""
+    if programacao in (None, ''):
+        return ''
     try:
-        worksheet = get_or_create_centrais_worksheet(sheets_service)
-
-        # row_id é baseado em 1, mas começa do header, então +2
-        row_num = row_id + 2
-
-        status = request.form.get('status', '')
-        obra = request.form.get('obra', '')
-
-        # Localiza dinamicamente as colunas por nome para evitar sobrescritas
-        headers = [str(h or '').strip() for h in worksheet.row_values(1)]
-        header_map = {}
-        for i, h in enumerate(headers):
-            key = _normalizar_texto_basico(h)
-            if key and key not in header_map:
-                header_map[key] = i
-
-        def col_letter(idx: int) -> str:
-            # Converte índice 0-based para letra de coluna A..Z, AA, AB...
-            result = ''
-            i = idx + 1
-            while i > 0:
-                i, rem = divmod(i - 1, 26)
-                result = chr(65 + rem) + result
-            return result
-
-        # Possíveis chaves para 'Status' e 'Obra Utilizada'
-        status_keys = ('status',)
-        obra_keys = ('obra utilizada', 'obra')
-
-        status_idx = next((header_map[k] for k in status_keys if k in header_map), None)
-        obra_idx = next((header_map[k] for k in obra_keys if k in header_map), None)
-
-        if status_idx is not None and obra_idx is not None:
-            start = col_letter(min(status_idx, obra_idx))
-            end = col_letter(max(status_idx, obra_idx))
-            worksheet.update(f'{start}{row_num}:{end}{row_num}', [[status if status_idx<=obra_idx else obra, obra if status_idx<=obra_idx else status]])
-        elif status_idx is not None:
-            col = col_letter(status_idx)
-            worksheet.update(f'{col}{row_num}:{col}{row_num}', [[status]])
-        elif obra_idx is not None:
-            col = col_letter(obra_idx)
-            worksheet.update(f'{col}{row_num}:{col}{row_num}', [[obra]])
-        else:
-            # fallback legacy: colunas C:D
-            worksheet.update(f'C{row_num}:D{row_num}', [[status, obra]])
-        
-        return jsonify({'success': True, 'message': 'Central atualizada!'})
-    except Exception as e:
-        logger.error(f"Erro ao atualizar central: {e}", exc_info=True)
-        return jsonify({'success': False, 'message': str(e)}), 500
+        parsed = json.loads(programacao) if isinstance(programacao, str) else programacao
+        return json.dumps(parsed, ensure_ascii=False, separators=(',', ':'))
+    except Exception:
+        return str(programacao)
 
 
-@app.route('/centrais/programacao/<int:row_id>', methods=['POST'])
+@app.route('/centrais/programacao/lote', methods=['POST'])
 @admin_required
-def atualizar_programacao_central(row_id):
-    """Atualiza a programação de uma central."""
-    sheets_service = app.config.get('sheets_service')
-    if not sheets_service:
-        return jsonify({'success': False, 'message': 'Serviço indisponível'}), 503
-
-    try:
-
-        worksheet = get_or_create_centrais_worksheet(sheets_service)
-        row_num = row_id + 2
-        programacao = request.form.get('programacao', '')
-
-        # Normaliza/compacta JSON para armazenamento
-        if programacao:
-            try:
-                parsed = json.loads(programacao)
-                programacao_compact = json.dumps(parsed, ensure_ascii=False, separators=(',', ':'))
-            except Exception:
-                programacao_compact = str(programacao)
-        else:
-            programacao_compact = ''
-
-        # Identifica índices das colunas dinamicamente, criando colunas se necessário
-        headers = [str(h or '').strip() for h in worksheet.row_values(1)]
-        header_map = {_normalizar_texto_basico(h): i for i, h in enumerate(headers) if h}
-
-        prog_idx = header_map.get(_normalizar_texto_basico('Programação'))
-        resumo_idx = header_map.get(_normalizar_texto_basico('Programação Resumo'))
-
-        # Se as colunas não existirem, adiciona-as ao final
-        if prog_idx is None or resumo_idx is None:
-            new_headers = list(headers)
-            if prog_idx is None:
-                new_headers.append('Programação')
-                prog_idx = len(new_headers) - 1
-            if resumo_idx is None:
-                new_headers.append('Programação Resumo')
-                resumo_idx = len(new_headers) - 1
-            worksheet.update('A1', [new_headers])
-
-        # Recarrega a linha para obter o número de portas
-        row_values = worksheet.row_values(row_num)
-        num_portas = 0
-        portas_idx = header_map.get(_normalizar_texto_basico('Número de Portas'))
-        if portas_idx is not None and portas_idx < len(row_values):
-            try:
-                num_portas = int(float(str(row_values[portas_idx]).strip().replace(',', '.')))
-            except Exception:
-                num_portas = 0
-
-        resumo = _programacao_json_to_summary(programacao_compact, num_portas)
-
-        # Grava programação e resumo nas colunas correspondentes (1-based col)
-        try:
-            # gspread usa índices 1-based para update_cell
-            worksheet.update_cell(row_num, prog_idx + 1, programacao_compact)
-            worksheet.update_cell(row_num, resumo_idx + 1, resumo)
-        except Exception:
-            # fallback: tenta atualizar por range usando letras (menos provável de falhar)
-            try:
-                worksheet.update(range_name=f'F{row_num}:G{row_num}', values=[[programacao_compact, resumo]])
-            except Exception as e:
-                raise
-
-        return jsonify({'success': True, 'message': 'Programação atualizada!', 'resumo': resumo})
-    except Exception as e:
-        logger.error(f"Erro ao atualizar programação da central: {e}", exc_info=True)
-        return jsonify({'success': False, 'message': str(e)}), 500
+def atualizar_programacao_centrais_lote():
+    """
+    Atualiza a programação de várias centrais em uma única gravação.
 
+    Corpo JSON: {"centrais": [{"id": "...", "programacao": {...} ou "..."}, ...]}
+    (token CSRF no cabeçalho X-CSRFToken). Responde o resultado de cada central.
+    """
+    centrais_repository = app.config.get('centrais_repository')
+    if not centrais_repository:
+        return jsonify({'success': False, 'message': 'Serviço indisponível'}), 503
 
-@app.route('/centrais/deletar/<int:row_id>', methods=['POST'])
+    dados = request.get_json(silent=True) or {}
+    itens = dados.get('centrais') if isinstance(dados, dict) else None
+    if not isinstance(itens, list) or not itens or not all(isinstance(i, dict) and i.get('id') for i in itens):
+        return jsonify({'success': False, 'message': 'Informe a lista de centrais (id e programacao)'}), 400
+    if len(itens) > MAX_PROGRAMACOES_LOTE:
+        return jsonify({'success': False, 'message': f"Máximo de {MAX_PROGRAMACOES_LOTE} centrais por lote"}), 400
+
+    programacoes = {
+        str(item['id']).strip(): _compactar_programacao(item.get('programacao', ''))
+        for item in itens
+    }
+    resultados = centrais_repository.atualizar_programacoes(programacoes)
+    lista = [{'id': registro_id, **resultado} for registro_id, resultado in resultados.items()]
+    atualizadas = sum(1 for r in lista if r['success'])
+
+    return jsonify({
+        'success': atualizadas == len(lista),
+        'message': f"{atualizadas} de {len(lista)} programações atualizadas",
+        'resultados': lista,
+    }), 200 if atualizadas else 400
+
+
+@app.route('/centrais/deletar/<registro_id>', methods=['POST'])
 @admin_required
-def deletar_central(row_id):
+def deletar_central(registro_id):
     """Deleta uma central."""
-    sheets_service = app.config.get('sheets_service')
-    if not sheets_service:
+    centrais_repository = app.config.get('centrais_repository')
+    if not centrais_repository:
         return jsonify({'success': False, 'message': 'Serviço indisponível'}), 503
-    
-    try:
-        worksheet = get_or_create_centrais_worksheet(sheets_service)
-        row_num = row_id + 2  # +2 por causa do header
-        worksheet.delete_rows(row_num)
-        
-        return jsonify({'success': True, 'message': 'Central deletada!'})
-    except Exception as e:
-        logger.error(f"Erro ao deletar central: {e}", exc_info=True)
-        return jsonify({'success': False, 'message': str(e)}), 500
-        return jsonify({'success': False, 'message': str(e)}), 500
+
+    if centrais_repository.obter(registro_id) is None:
+        return jsonify({'success': False, 'message': 'Central não encontrada'}), 404
+
+    if not centrais_repository.deletar(registro_id):
+        return jsonify({'success': False, 'message': 'Erro ao deletar central'}), 500
+
+    return jsonify({'success': True, 'message': 'Central deletada!'})
 
 
 def _parse_int_field(value, default=0):
@@ -969,7 +860,7 @@ def _append_producao_info(existing_info: str, nova_info: str) -> str:
     if not nova_info:
         return existing_info
 
-    timestamp = pd.Timestamp.now().strftime('%d/%m/%Y %H:%M:%S')
+    timestamp = datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')
     extra = f"[{timestamp}] {nova_info}"
     if existing_info:
         return existing_info + "\n" + extra
@@ -978,19 +869,13 @@ def _append_producao_info(existing_info: str, nova_info: str) -> str:
 
 def _get_current_user_role():
     """Retorna a role do usuário logado, se disponível."""
-    username = session.get('usuario')
-    if not username:
+    if not session.get('usuario'):
         return None
 
-    user_service = app.config.get('user_service')
-    if not user_service:
+    if not app.config.get('user_service'):
         return session.get('role')
 
-    user_data = user_service.get_usuario(username)
-    if user_data:
-        return user_data.role
-
-    return session.get('role')
+    return get_current_user_role()
 
 
 @app.route('/producao', methods=['GET', 'POST'])
@@ -1014,7 +899,7 @@ def producao():
 
         try:
             dados = [
-                pd.Timestamp.now().strftime('%d/%m/%Y %H:%M:%S'),
+                datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
                 request.form.get('nome_item', '').strip(),
                 _format_codigo_code(request.form.get('codigo_item', '').strip()),
                 _format_mtc_code(request.form.get('mtc_projeto', '')),
@@ -1031,7 +916,7 @@ def producao():
                 flash('Nome do item e código são obrigatórios.', 'danger')
                 return redirect(url_for('producao'))
 
-            item_id = int(pd.Timestamp.now().timestamp())
+            item_id = int(datetime.datetime.now().timestamp())
             row_data = [str(item_id)] + dados
 
             if not sheets_service.add_producao(row_data):
@@ -1120,8 +1005,8 @@ def producao_dados():
         status_counts = {'Concluído': 0, 'Em andamento': 0, 'Pendente': 0}
 
         def _status_bucket(valor):
-            texto = str(valor or '').strip().lower()
-            if texto in ('concluído', 'concluido', 'finalizado', 'finalizada'):
+            texto = normalizar_texto(valor)
+            if texto in ('concluido', 'finalizado', 'finalizada'):
                 return 'Concluído'
             if texto in ('em andamento', 'andamento'):
                 return 'Em andamento'
@@ -1203,8 +1088,8 @@ def itens():
                 return redirect(url_for('itens'))
 
             row_data = [
-                str(int(pd.Timestamp.now().timestamp())),
-                pd.Timestamp.now().strftime('%d/%m/%Y %H:%M:%S'),
+                str(int(datetime.datetime.now().timestamp())),
+                datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
                 nome_item,
                 codigo_item,
                 mtc_projeto,
@@ -1270,34 +1155,27 @@ def itens():
 @admin_required
 def ferramentas():
     """Página de controle de ferramentas."""
-    sheets_service = app.config.get('sheets_service')
-    if not sheets_service:
+    ferramentas_repository = app.config.get('ferramentas_repository')
+    if not ferramentas_repository:
         return render_template('ferramentas.html',
             ferramentas=[], mensagem="Serviço de planilhas indisponível",
             tipo_mensagem='danger'), 503
 
     if request.method == 'POST':
-        try:
-            dados = [
-                request.form.get('nome', ''),
-                request.form.get('patrocinio', ''),
-                pd.Timestamp.now().strftime('%d/%m/%Y'),
-                request.form.get('ultima_manutencao', ''),
-                request.form.get('status', 'Disponível'),
-                request.form.get('observacao', ''),
-                request.form.get('responsavel', '')
-            ]
-            worksheet = get_or_create_ferramentas_worksheet(sheets_service)
-            worksheet.append_row(dados)
-            usuario_atual = session.get('usuario', 'desconhecido')
-            detalhes_hist = f"Patrocínio: {dados[1]}, Responsável: {dados[6]}, Status: {dados[4]}, Obs: {dados[5]}"
-            add_historico_entry(sheets_service, dados[0], 'Cadastro', usuario_atual, detalhes_hist)
-            flash("Ferramenta cadastrada com sucesso!", "success")
-            return redirect(url_for('ferramentas'))
-        except Exception as e:
-            logger.error(f"Erro ao adicionar ferramenta: {e}", exc_info=True)
-            flash(f"Erro ao adicionar ferramenta: {e}", "danger")
+        dados = {
+            'Nome': request.form.get('nome', ''),
+            'Patrocínio': request.form.get('patrocinio', ''),
+            'Data de Cadastro': datetime.datetime.now().strftime('%d/%m/%Y'),
+            'Última Manutenção': request.form.get('ultima_manutencao', ''),
+            'Status': request.form.get('status', 'Disponível'),
+            'Observação': request.form.get('observacao', ''),
+            'Responsável': request.form.get('responsavel', ''),
+        }
+        if not ferramentas_repository.adicionar(dados, session.get('usuario', 'desconhecido')):
+            flash("Erro ao adicionar ferramenta", "danger")
             return redirect(url_for('ferramentas'))
+        flash("Ferramenta cadastrada com sucesso!", "success")
+        return redirect(url_for('ferramentas'))
 
     mensagem = None
     tipo_mensagem = None
@@ -1307,127 +1185,46 @@ def ferramentas():
             tipo_mensagem, mensagem = flashes[0]
 
     return render_template('ferramentas.html',
-        ferramentas=get_ferramentas_list(sheets_service),
+        ferramentas=[ferramenta.como_dict() for ferramenta in ferramentas_repository.listar()],
         mensagem=mensagem,
         tipo_mensagem=tipo_mensagem)
 
 
-def get_or_create_ferramentas_worksheet(sheets_service):
-    """Obtém ou cria a worksheet de ferramentas."""
-    try:
-        spreadsheet = sheets_service.client.open_by_key(sheets_service.sheet_id)
-        try:
-            worksheet = spreadsheet.worksheet(FERRAMENTAS_TAB)
-            headers = worksheet.row_values(1)
-            if 'Responsável' not in headers:
-                worksheet.update('G1', [['Responsável']])
-        except Exception:
-            worksheet = spreadsheet.add_worksheet(title=FERRAMENTAS_TAB, rows=500, cols=10)
-            worksheet.append_row(['Nome', 'Patrocínio', 'Data de Cadastro',
-                                   'Última Manutenção', 'Status', 'Observação', 'Responsável'])
-            logger.info(f"Aba '{FERRAMENTAS_TAB}' criada")
-        return worksheet
-    except Exception as e:
-        logger.error(f"Erro ao obter/criar worksheet de ferramentas: {e}")
-        raise
-
-
-def get_ferramentas_list(sheets_service):
-    """Obtém lista de ferramentas."""
-    try:
-        worksheet = get_or_create_ferramentas_worksheet(sheets_service)
-        dados = worksheet.get_all_records()
-        return dados if dados else []
-    except Exception as e:
-        logger.warning(f"Erro ao obter ferramentas: {e}")
-        return []
-
-
-def get_or_create_historico_worksheet(sheets_service):
-    """Obtém ou cria a worksheet de histórico de ferramentas."""
-    try:
-        spreadsheet = sheets_service.client.open_by_key(sheets_service.sheet_id)
-        try:
-            worksheet = spreadsheet.worksheet(HISTORICO_FERRAMENTAS_TAB)
-        except Exception:
-            worksheet = spreadsheet.add_worksheet(title=HISTORICO_FERRAMENTAS_TAB, rows=1000, cols=5)
-            worksheet.append_row(['Ferramenta', 'Evento', 'Data/Hora', 'Usuário', 'Detalhes'])
-            logger.info(f"Aba '{HISTORICO_FERRAMENTAS_TAB}' criada")
-        return worksheet
-    except Exception as e:
-        logger.error(f"Erro ao obter/criar worksheet de histórico: {e}")
-        raise
-
-
-def add_historico_entry(sheets_service, nome_ferramenta, evento, usuario, detalhes=''):
-    """Adiciona uma entrada no histórico de ferramentas."""
-    try:
-        worksheet = get_or_create_historico_worksheet(sheets_service)
-        data_hora = pd.Timestamp.now().strftime('%d/%m/%Y %H:%M:%S')
-        worksheet.append_row([nome_ferramenta, evento, data_hora, usuario, detalhes])
-    except Exception as e:
-        logger.warning(f"Erro ao adicionar histórico: {e}")
-
-
-@app.route('/ferramentas/atualizar/<int:row_id>', methods=['POST'])
+@app.route('/ferramentas/atualizar/<registro_id>', methods=['POST'])
 @admin_required
-def atualizar_ferramenta(row_id):
+def atualizar_ferramenta(registro_id):
     """Atualiza uma ferramenta."""
-    sheets_service = app.config.get('sheets_service')
-    if not sheets_service:
+    ferramentas_repository = app.config.get('ferramentas_repository')
+    if not ferramentas_repository:
         return jsonify({'success': False, 'message': 'Serviço indisponível'}), 503
 
     try:
-        worksheet = get_or_create_ferramentas_worksheet(sheets_service)
-        row_num = row_id + 2  # +2 pelo cabeçalho
-        dados_atuais = worksheet.row_values(row_num)
-        nome_ferramenta = dados_atuais[0] if dados_atuais else 'Desconhecida'
-        novo_responsavel = request.form.get('responsavel', '')
-        nova_manutencao = request.form.get('ultima_manutencao', '')
-        novo_status = request.form.get('status', '')
-        nova_observacao = request.form.get('observacao', '')
-        old_manutencao = dados_atuais[3] if len(dados_atuais) > 3 else ''
-        old_status = dados_atuais[4] if len(dados_atuais) > 4 else ''
-        old_observacao = dados_atuais[5] if len(dados_atuais) > 5 else ''
-        old_responsavel = dados_atuais[6] if len(dados_atuais) > 6 else ''
-        worksheet.update(
-            f'D{row_num}:G{row_num}',
-            [[nova_manutencao, novo_status, nova_observacao, novo_responsavel]]
-        )
-        changes = []
-        if novo_responsavel != old_responsavel:
-            changes.append(f"Responsável: {old_responsavel or '-'} → {novo_responsavel or '-'}")
-        if nova_manutencao != old_manutencao:
-            changes.append(f"Manutenção: {old_manutencao or '-'} → {nova_manutencao or '-'}")
-        if novo_status != old_status:
-            changes.append(f"Status: {old_status or '-'} → {novo_status or '-'}")
-        if nova_observacao != old_observacao:
-            changes.append(f"Obs: {old_observacao or '-'} → {nova_observacao or '-'}")
-        detalhes_hist = ', '.join(changes) if changes else 'Sem alterações'
-        usuario_atual = session.get('usuario', 'desconhecido')
-        add_historico_entry(sheets_service, nome_ferramenta, 'Edição', usuario_atual, detalhes_hist)
+        novos = {
+            'Última Manutenção': request.form.get('ultima_manutencao', ''),
+            'Status': request.form.get('status', ''),
+            'Observação': request.form.get('observacao', ''),
+            'Responsável': request.form.get('responsavel', ''),
+        }
+        anteriores = ferramentas_repository.atualizar(registro_id, novos, session.get('usuario', 'desconhecido'))
+        if anteriores is None:
+            return jsonify({'success': False, 'message': 'Ferramenta não encontrada'}), 404
         return jsonify({'success': True, 'message': 'Ferramenta atualizada!'})
     except Exception as e:
         logger.error(f"Erro ao atualizar ferramenta: {e}", exc_info=True)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
-@app.route('/ferramentas/deletar/<int:row_id>', methods=['POST'])
+@app.route('/ferramentas/deletar/<registro_id>', methods=['POST'])
 @admin_required
-def deletar_ferramenta(row_id):
+def deletar_ferramenta(registro_id):
     """Deleta uma ferramenta."""
-    sheets_service = app.config.get('sheets_service')
-    if not sheets_service:
+    ferramentas_repository = app.config.get('ferramentas_repository')
+    if not ferramentas_repository:
         return jsonify({'success': False, 'message': 'Serviço indisponível'}), 503
 
     try:
-        worksheet = get_or_create_ferramentas_worksheet(sheets_service)
-        row_num = row_id + 2
-        dados_atuais = worksheet.row_values(row_num)
-        nome_ferramenta = dados_atuais[0] if dados_atuais else 'Desconhecida'
-        usuario_atual = session.get('usuario', 'desconhecido')
-        worksheet.delete_rows(row_num)
-        add_historico_entry(sheets_service, nome_ferramenta, 'Exclusão', usuario_atual, 'Ferramenta excluída')
+        if ferramentas_repository.deletar(registro_id, session.get('usuario', 'desconhecido')) is None:
+            return jsonify({'success': False, 'message': 'Ferramenta não encontrada'}), 404
         return jsonify({'success': True, 'message': 'Ferramenta deletada!'})
     except Exception as e:
         logger.error(f"Erro ao deletar ferramenta: {e}", exc_info=True)
@@ -1437,31 +1234,98 @@ def deletar_ferramenta(row_id):
 @app.route('/ferramentas/historico')
 @admin_required
 def historico_ferramentas():
-    """Retorna histórico de uma ferramenta em JSON."""
-    sheets_service = app.config.get('sheets_service')
-    if not sheets_service:
+    """
+    Retorna histórico de uma ferramenta em JSON, do mais recente ao mais antigo.
+
+    Paginação: ?nome=&limit=&cursor= (cursor = `proximo_cursor` da página anterior).
+    """
+    ferramentas_repository = app.config.get('ferramentas_repository')
+    if not ferramentas_repository:
         return jsonify({'success': False, 'historico': []})
     nome = request.args.get('nome', '')
     try:
-        worksheet = get_or_create_historico_worksheet(sheets_service)
-        todos = worksheet.get_all_records()
-        if nome:
-            filtrado = [r for r in todos if r.get('Ferramenta', '').lower() == nome.lower()]
-        else:
-            filtrado = todos
-        filtrado = list(reversed(filtrado))
-        return jsonify({'success': True, 'historico': filtrado})
+        limit = min(HISTORICO_LIMITE_MAXIMO, max(1, int(request.args.get('limit', HISTORICO_LIMITE_PADRAO))))
+        cursor = request.args.get('cursor', '').strip()
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'success': False, 'historico': [], 'error': 'Parâmetros de paginação inválidos'}), 400
+    try:
+        historico, proximo_cursor = ferramentas_repository.historico(nome, limit, cursor)
+        return jsonify({'success': True, 'historico': historico, 'proximo_cursor': proximo_cursor})
     except Exception as e:
         logger.error(f"Erro ao obter histórico: {e}")
         return jsonify({'success': False, 'historico': [], 'error': str(e)})
 
 
+@app.route('/ferramentas/etiquetas-qr.pdf')
+@admin_required
+def etiquetas_qr_ferramentas():
+    """Folha de etiquetas QR (PDF) para ferramentas (?ids=a1b2,c3d4; sem parâmetro, todas)."""
+    ferramentas_repository = app.config.get('ferramentas_repository')
+    if not ferramentas_repository:
+        return render_template('erro.html', mensagem="Serviço de planilhas indisponível"), 503
+
+    ids_param = request.args.get('ids', '').strip()
+    if ids_param:
+        ids = [i.strip() for i in ids_param.split(',') if i.strip()]
+        selecionadas = [f for f in map(ferramentas_repository.obter, dict.fromkeys(ids)) if f is not None]
+    else:
+        selecionadas = ferramentas_repository.listar()
+    selecionadas = [ferramenta.como_dict() for ferramenta in selecionadas]
+
+    if not selecionadas:
+        return render_template('erro.html', mensagem="Nenhuma ferramenta selecionada."), 404
+    if len(selecionadas) > MAX_ETIQUETAS_QR:
+        return render_template('erro.html', mensagem=f"Máximo de {MAX_ETIQUETAS_QR} etiquetas por folha."), 400
+
+    etiquetas = []
+    for ferramenta in selecionadas:
+        nome = str(ferramenta.get('Nome', '') or '').strip()
+        patrocinio = str(ferramenta.get('Patrocínio', '') or '').strip()
+        legenda = f"{nome} ({patrocinio})" if patrocinio else nome
+        etiquetas.append((url_for('ferramentas', busca=patrocinio or nome, _external=True), legenda))
+
+    return Response(
+        stream_with_context(gerar_pdf_etiquetas(etiquetas)),
+        mimetype='application/pdf',
+        headers={'Content-Disposition': 'inline; filename=etiquetas-ferramentas.pdf'},
+    )
+
+
 @app.route('/favicon.ico')
 def favicon():
     """Favicon vazio para evitar erro 404."""
     return '', 204
 
 
+# ════════════════════════════════════════════════════════════════════════════════
+# COMANDOS
+# ════════════════════════════════════════════════════════════════════════════════
+
+@app.cli.command('arquivar-logs')
+def arquivar_logs():
+    """Move para LOG_ARCHIVE_DIR as linhas antigas do histórico de ferramentas e do controle de horário."""
+    if not LOG_ARCHIVE_DIR:
+        raise SystemExit("Defina LOG_ARCHIVE_DIR em um disco persistente antes de arquivar: "
+                         "as linhas saem da planilha e só ficam nesse diretório")
+    sheets_service = app.config.get('sheets_service')
+    if not sheets_service:
+        raise SystemExit("Serviço de planilhas indisponível")
+
+    horario = sheets_service.arquivar_time_records(HORARIO_ARCHIVE_AFTER_DAYS)
+    click.echo(f"Controle de Horário: {horario} registro(s) arquivado(s)")
+    ferramentas_repository = app.config.get('ferramentas_repository')
+    historico = ferramentas_repository.arquivar_historico(HISTORICO_ARCHIVE_AFTER_DAYS) if ferramentas_repository else 0
+    click.echo(f"Histórico de Ferramentas: {historico} evento(s) arquivado(s)")
+
+
+@app.cli.command('importar-documentos')
+def importar_documentos():
+    """Indexa no armazenamento por conteúdo os arquivos antigos soltos em uploads/documentos (rodar uma vez)."""
+    store = DocumentStore(Path(app.root_path) / 'uploads' / 'documentos')
+    click.echo(f"{store.importar_arquivos_legados()} documento(s) legado(s) importado(s)")
+
+
 # ════════════════════════════════════════════════════════════════════════════════
 # PONTO DE ENTRADA
 # ════════════════════════════════════════════════════════════════════════════════
@@ -4,9 +4,28 @@ from dataclasses import dataclass
 from enum import Enum
 from werkzeug.security import generate_password_hash, check_password_hash
 import datetime
+import hmac
+import os
+from functools import lru_cache
 from typing import Optional
 
 
+def metodo_hash_configurado() -> str:
+    """Algoritmo/custo de hash configurado (sintaxe do Werkzeug, ex.: 'pbkdf2:sha256:600000')."""
+    return os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256').strip() or 'pbkdf2:sha256'
+
+
+@lru_cache(maxsize=8)
+def _prefixo_metodo(metodo: str) -> str:
+    """Prefixo efetivo gravado pelo Werkzeug para o método (inclui custo padrão)."""
+    return generate_password_hash('', method=metodo).split('$', 1)[0]
+
+
+def gerar_hash_senha(senha: str) -> str:
+    """Gera o hash de senha padrão do sistema (função de módulo para uso em process pool)."""
+    return generate_password_hash(senha, method=metodo_hash_configurado())
+
+
 class Role(str, Enum):
     """Enum para roles de usuário."""
     ADMIN = 'admin'
@@ -22,11 +41,13 @@ class Usuario:
     senha_hash: str
     role: str = Role.ADMIN.value
     data_cadastro: Optional[str] = ''
+    # Senha legada em texto plano aguardando migração para hash em background
+    migracao_pendente: bool = False
     
     @classmethod
     def criar(cls, username: str, senha: str, role: str = Role.ADMIN.value) -> 'Usuario':
         """Cria novo usuário com senha hasheada."""
-        senha_hash = generate_password_hash(senha, method='pbkdf2:sha256')
+        senha_hash = gerar_hash_senha(senha)
         ts = datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')
         return cls(username=username, senha_hash=senha_hash, role=role, data_cadastro=ts)
 
@@ -35,20 +56,34 @@ class Usuario:
         """Verifica se o valor parece um hash suportado pelo Werkzeug."""
         return str(valor or '').startswith(('pbkdf2:', 'scrypt:'))
     
+    def precisa_rehash(self) -> bool:
+        """Indica se o hash foi gerado com algoritmo/custo diferente do configurado."""
+        if self.migracao_pendente or not self.is_hash_valido(self.senha_hash):
+            return False
+        metodo_atual = str(self.senha_hash).split('$', 1)[0]
+        return metodo_atual != _prefixo_metodo(metodo_hash_configurado())
+    
     def verificar_senha(self, senha: str) -> bool:
         """Verifica se a senha está correta."""
+        if self.migracao_pendente:
+            # Senha legada ainda não migrada: comparação em tempo constante
+            return bool(senha) and hmac.compare_digest(
+                str(self.senha_hash).encode('utf-8'), str(senha).encode('utf-8')
+            )
         if not self.is_hash_valido(self.senha_hash):
             return False
         return check_password_hash(self.senha_hash, senha)
     
     def atualizar_senha(self, nova_senha: str) -> None:
         """Atualiza senha do usuário."""
-        self.senha_hash = generate_password_hash(nova_senha, method='pbkdf2:sha256')
+        self.senha_hash = gerar_hash_senha(nova_senha)
+        self.migracao_pendente = False
     
     def to_dict(self) -> dict:
         """Converte para dicionário."""
         return {
-            'senha': self.senha_hash,
+            'senha': '' if self.migracao_pendente else self.senha_hash,
+            'migracao_pendente': self.migracao_pendente,
             'role': self.role
             , 'data_cadastro': self.data_cadastro
         }
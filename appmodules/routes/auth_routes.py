@@ -3,6 +3,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
 from werkzeug.security import check_password_hash, generate_password_hash
 from appmodules.models import ValidadorUsuario
+from appmodules.services.password_verifier import VerificadorSaturadoError
+from appmodules.utils import save_auth_snapshot
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -26,10 +28,21 @@ def login():
         if not usuario:
             return render_template('login.html', erro='Usuário ou senha inválidos.')
         
-        # Verifica senha
-        if usuario.verificar_senha(password):
+        # Verifica senha (pool limitado; recusa rápida quando saturado)
+        verifier = current_app.config.get('password_verifier')
+        try:
+            senha_valida = verifier.verificar(usuario, password) if verifier else usuario.verificar_senha(password)
+        except VerificadorSaturadoError:
+            resposta = current_app.make_response((
+                render_template('login.html', erro='Muitos logins simultâneos. Tente novamente em alguns segundos.'),
+                429
+            ))
+            resposta.headers['Retry-After'] = '2'
+            return resposta
+
+        if senha_valida:
             session['usuario'] = usuario.username
-            session['role'] = usuario.role
+            save_auth_snapshot(usuario, user_service)
             session.permanent = True
             flash(f'Bem-vindo, {username}!', 'success')
             
@@ -3,13 +3,22 @@
 import datetime
 import io
 import logging
+import threading
 from pathlib import Path
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file
-import qrcode
-from werkzeug.utils import secure_filename
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file, jsonify, abort,
+    Response, stream_with_context
+)
+from flask_wtf.csrf import ValidationError, validate_csrf
 from appmodules.models import OrdemServico, ValidadorOS
 from appmodules.services import NotificationService
+from appmodules.services.document_store import DocumentStore
 from appmodules.utils import admin_required
+from appmodules.utils.qr_labels import gerar_pdf_etiquetas
+from appmodules.utils.qr_codes import BOX_SIZE_MAX, BOX_SIZE_MIN, BOX_SIZE_PADRAO, FORMATOS_QR, renderizar_qr
+from appmodules.utils.upload_stream import (
+    UploadError, UploadFormatoError, UploadMuitoGrandeError, receber_upload_stream
+)
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +26,7 @@ ALLOWED_UPLOAD_EXTENSIONS = {
     'pdf', 'doc', 'docx', 'txt', 'png', 'jpg', 'jpeg', 'webp', 'xlsx', 'xls'
 }
 MAX_UPLOAD_SIZE_BYTES = 10 * 1024 * 1024
+MAX_ETIQUETAS_QR = 1000
 
 os_bp = Blueprint('os', __name__)
 
@@ -36,12 +46,37 @@ def _valor_form_ou_original(form_value: str, original_data: dict, *chaves: str,
     return _primeiro_valor_disponivel(original_data, *chaves, default=default)
 
 
-def _extensao_permitida(filename: str) -> bool:
-    """Valida se a extensão do arquivo está na lista permitida."""
-    if '.' not in filename:
-        return False
-    ext = filename.rsplit('.', 1)[1].lower()
-    return ext in ALLOWED_UPLOAD_EXTENSIONS
+_document_store_lock = threading.Lock()
+
+
+def _document_store() -> DocumentStore:
+    """Armazenamento de documentos da aplicação (criado no primeiro uso em uploads/documentos)."""
+    store = current_app.config.get('document_store')
+    if store is None:
+        with _document_store_lock:
+            store = current_app.config.get('document_store')
+            if store is None:
+                store = DocumentStore(Path(current_app.root_path) / 'uploads' / 'documentos')
+                current_app.config['document_store'] = store
+    return store
+
+
+def _validar_csrf_upload(campos: dict) -> None:
+    """Valida o token CSRF do upload (a rota é isenta do CSRF global para não bufferizar o corpo)."""
+    token = campos.get('csrf_token') or request.headers.get('X-CSRFToken')
+    try:
+        validate_csrf(token)
+    except ValidationError:
+        raise UploadError('Sessão expirada. Recarregue a página e tente novamente.')
+
+    # Número do pedido (opcional) validado antes de gravar o arquivo
+    numero_pedido = str(campos.get('numero_pedido') or '').strip().lstrip('#')
+    if numero_pedido:
+        sheets_service = current_app.config.get('sheets_service')
+        if not sheets_service:
+            raise UploadError('Não foi possível validar o número do pedido agora. Tente novamente.')
+        if not sheets_service.get_os_indexada(numero_pedido):
+            raise UploadError(f"Pedido número '{numero_pedido}' não encontrado.")
 
 
 @os_bp.route('/')
@@ -50,39 +85,109 @@ def homepage():
     return render_template('index.html')
 
 
-def _gerar_qr_buffer(formato: str = 'PNG'):
-    """Gera o QR code do formulário em memória no formato solicitado."""
-    formulario_url = url_for('os.homepage', _external=True)
-
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=10,
-        border=4,
+# Alvos permitidos para QR codes (evita gerar QR para URLs arbitrárias)
+_ALVOS_QR = {
+    'formulario': 'os.homepage',
+    'consultar': 'os.consultar_pedido',
+    'upload': 'os.upload_documento',
+}
+QR_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+
+def _resposta_qr(dados: str, formato: str, box_size: int = BOX_SIZE_PADRAO, download_name: str = 'qr'):
+    """Responde com o QR em cache, com ETag forte e Cache-Control longo."""
+    conteudo, etag = renderizar_qr(dados, formato, box_size)
+    resposta = send_file(
+        io.BytesIO(conteudo),
+        mimetype=FORMATOS_QR[formato],
+        as_attachment=False,
+        download_name=f'{download_name}.{formato.lower()}',
+        etag=etag,
+        conditional=True,
+        max_age=QR_CACHE_MAX_AGE_SECONDS,
     )
-    qr.add_data(formulario_url)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color='black', back_color='white')
-    buffer = io.BytesIO()
-    img.save(buffer, format=formato)
-    buffer.seek(0)
-    return buffer
-
+    resposta.cache_control.public = True
+    return resposta
 
 
 @os_bp.route('/qr-formulario.png')
 def qr_formulario_png():
     """Gera um QR code apontando para a página do formulário em PNG."""
-    buffer = _gerar_qr_buffer('PNG')
-    return send_file(buffer, mimetype='image/png', as_attachment=False, download_name='qr-formulario.png')
+    return _resposta_qr(url_for('os.homepage', _external=True), 'PNG', download_name='qr-formulario')
 
 
 @os_bp.route('/qr-formulario.pdf')
 def qr_formulario_pdf():
     """Gera um QR code apontando para a página do formulário em PDF."""
-    buffer = _gerar_qr_buffer('PDF')
-    return send_file(buffer, mimetype='application/pdf', as_attachment=False, download_name='qr-formulario.pdf')
+    return _resposta_qr(url_for('os.homepage', _external=True), 'PDF', download_name='qr-formulario')
+
+
+@os_bp.route('/qr/<alvo>.<formato>')
+def qr_alvo(alvo, formato):
+    """QR code para uma página do sistema (ex.: /qr/consultar.png?numero_pedido=42&tamanho=8)."""
+    endpoint = _ALVOS_QR.get(alvo)
+    formato = formato.upper()
+    if not endpoint or formato not in FORMATOS_QR:
+        abort(404)
+
+    parametros = {}
+    if alvo == 'consultar':
+        numero_pedido = str(request.args.get('numero_pedido', '')).strip().lstrip('#')
+        if numero_pedido:
+            if not numero_pedido.isalnum() or len(numero_pedido) > 20:
+                abort(400)
+            parametros['numero_pedido'] = numero_pedido
+
+    try:
+        box_size = int(request.args.get('tamanho', BOX_SIZE_PADRAO))
+    except ValueError:
+        abort(400)
+    box_size = max(BOX_SIZE_MIN, min(BOX_SIZE_MAX, box_size))
+
+    dados = url_for(endpoint, _external=True, **parametros)
+    return _resposta_qr(dados, formato, box_size, download_name=f'qr-{alvo}')
+
+
+def _ids_da_query(parametro: str = 'ids'):
+    """Lista de IDs separados por vírgula na query string (sem repetição, na ordem)."""
+    ids = []
+    for item in str(request.args.get(parametro, '')).split(','):
+        item = item.strip().lstrip('#')
+        if item and item not in ids:
+            ids.append(item)
+    return ids
+
+
+@os_bp.route('/os/etiquetas-qr.pdf')
+@admin_required
+def etiquetas_qr_os():
+    """Folha de etiquetas QR (PDF) para as OS informadas em ?ids=1,2,3."""
+    sheets_service = current_app.config.get('sheets_service')
+    if not sheets_service:
+        return render_template('erro.html', mensagem="Serviço de planilhas indisponível"), 503
+
+    ids = _ids_da_query()
+    if not ids:
+        abort(400)
+    if len(ids) > MAX_ETIQUETAS_QR:
+        return render_template('erro.html', mensagem=f"Máximo de {MAX_ETIQUETAS_QR} etiquetas por folha."), 400
+
+    etiquetas = []
+    for os_id in ids:
+        os_item = sheets_service.get_os_indexada(os_id)
+        if not os_item:
+            continue
+        equipamento = str(os_item.get('Equipamento ou Local afetado', '') or '').strip()
+        legenda = f"OS #{os_id}" + (f" - {equipamento}" if equipamento else '')
+        etiquetas.append((url_for('os.consultar_pedido', numero_pedido=os_id, _external=True), legenda))
+    if not etiquetas:
+        abort(404)
+
+    return Response(
+        stream_with_context(gerar_pdf_etiquetas(etiquetas)),
+        mimetype='application/pdf',
+        headers={'Content-Disposition': 'inline; filename=etiquetas-os.pdf'},
+    )
 
 
 @os_bp.route('/enviar', methods=['POST'])
@@ -179,10 +284,20 @@ def gerenciar():
                 return datetime.datetime.min
         
         chamados_ordenados = sorted(chamados, key=sort_key, reverse=(order == 'desc'))
+
+        # Contagem de anexos em lote (uma consulta agrupada para a página inteira)
+        try:
+            anexos_por_os = _document_store().contar_por_pedidos(
+                str(chamado.get('ID', '')) for chamado in chamados_ordenados
+            )
+        except Exception as e:
+            logger.warning(f"Falha ao contar anexos das OS: {e}")
+            anexos_por_os = {}
         
         return render_template(
             'gerenciar.html',
             chamados=chamados_ordenados,
+            anexos_por_os=anexos_por_os,
             current_sort=sort_by,
             current_order=order
         )
@@ -567,36 +682,63 @@ def upload_documento():
         if request.content_length and request.content_length > MAX_UPLOAD_SIZE_BYTES:
             mensagem = 'Arquivo muito grande. Limite máximo de 10 MB.'
             tipo_mensagem = 'danger'
-            return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem), 400
+            return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem), \
+                UploadMuitoGrandeError.status_code
 
-        file = request.files.get('arquivo')
-        if not file or not file.filename:
+        boundary = request.mimetype_params.get('boundary')
+        if request.mimetype != 'multipart/form-data' or not boundary:
             mensagem = 'Selecione um arquivo para enviar.'
             tipo_mensagem = 'danger'
             return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem), 400
 
-        if not _extensao_permitida(file.filename):
+        try:
+            store = _document_store()
+            # Corpo lido em blocos direto para o disco (não passa por request.files)
+            recebido = receber_upload_stream(
+                request.stream, boundary.encode('latin-1'), store.tmp_dir,
+                campo_arquivo='arquivo',
+                extensoes_permitidas=ALLOWED_UPLOAD_EXTENSIONS,
+                max_bytes=MAX_UPLOAD_SIZE_BYTES,
+                validar_campos=_validar_csrf_upload,
+            )
+        except UploadMuitoGrandeError as e:
+            mensagem = 'Arquivo muito grande. Limite máximo de 10 MB.'
+            tipo_mensagem = 'danger'
+            return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem), e.status_code
+        except UploadFormatoError as e:
             mensagem = 'Formato não permitido. Use: PDF, DOC, DOCX, TXT, PNG, JPG, JPEG, WEBP, XLSX ou XLS.'
             tipo_mensagem = 'danger'
-            return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem), 400
+            return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem), e.status_code
+        except UploadError as e:
+            mensagem = str(e)
+            tipo_mensagem = 'danger'
+            return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem), e.status_code
+        except Exception as e:
+            logger.error("Erro ao receber arquivo enviado: %s", e, exc_info=True)
+            mensagem = 'Não foi possível enviar o arquivo agora. Tente novamente.'
+            tipo_mensagem = 'danger'
+            return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem), 500
 
         try:
-            upload_dir = Path(current_app.root_path) / 'uploads' / 'documentos'
-            upload_dir.mkdir(parents=True, exist_ok=True)
-
-            filename_original = secure_filename(file.filename)
-            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{timestamp}_{filename_original}"
-            file_path = upload_dir / filename
-
-            file.save(file_path)
-            logger.info("Arquivo recebido com sucesso: %s", file_path.name)
+            # Conteúdo já armazenado é reaproveitado (deduplicação por SHA-256)
+            numero_pedido = str(recebido.campos.get('numero_pedido') or '').strip().lstrip('#')
+            documento, novo = store.armazenar(
+                recebido.caminho, recebido.sha256, recebido.tamanho, recebido.nome_original,
+                numero_pedido=numero_pedido
+            )
+            if novo:
+                logger.info("Arquivo recebido com sucesso: %s (id=%s, %s bytes, OS %s)",
+                            documento.nome_original, documento.id, documento.tamanho, numero_pedido or '-')
 
             mensagem = 'Arquivo enviado com sucesso!'
+            if numero_pedido:
+                mensagem = f'Arquivo enviado com sucesso e vinculado ao pedido #{numero_pedido}!'
             tipo_mensagem = 'success'
             return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem)
         except Exception as e:
             logger.error("Erro ao salvar arquivo enviado: %s", e, exc_info=True)
+            if recebido.caminho.exists():
+                recebido.caminho.unlink()
             mensagem = 'Não foi possível enviar o arquivo agora. Tente novamente.'
             tipo_mensagem = 'danger'
             return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem), 500
@@ -604,22 +746,81 @@ def upload_documento():
     return render_template('upload_arquivo.html', mensagem=mensagem, tipo_mensagem=tipo_mensagem)
 
 
+@os_bp.route('/os/<numero_pedido>/anexos')
+@admin_required
+def anexos_os(numero_pedido):
+    """Lista os documentos vinculados a uma OS."""
+    documentos = _document_store().listar_por_pedido(numero_pedido)
+    return jsonify({
+        'numero_pedido': numero_pedido,
+        'anexos': [
+            {
+                'id': doc.id,
+                'nome': doc.nome_original,
+                'tamanho': doc.tamanho,
+                'mime': doc.mime,
+                'enviado_em': doc.enviado_em,
+                'url': url_for('os.baixar_anexo_os', numero_pedido=numero_pedido, documento_id=doc.id),
+            }
+            for doc in documentos
+        ]
+    })
+
+
+@os_bp.route('/os/<numero_pedido>/anexos/<int:documento_id>')
+@admin_required
+def baixar_anexo_os(numero_pedido, documento_id):
+    """Serve um anexo da OS (suporta Range e requisições condicionais)."""
+    store = _document_store()
+    documento = store.obter(documento_id)
+    if not documento or documento.numero_pedido != str(numero_pedido).strip():
+        abort(404)
+    caminho = store.caminho_objeto(documento.sha256)
+    if not caminho.exists():
+        abort(404)
+    # Conteúdo imutável: o SHA-256 serve como ETag
+    resposta = send_file(
+        caminho,
+        mimetype=documento.mime,
+        download_name=documento.nome_original,
+        conditional=True,
+        etag=documento.sha256,
+        max_age=3600,
+    )
+    resposta.accept_ranges = 'bytes'
+    return resposta
+
+
 @os_bp.route('/health')
 def health():
-    """Endpoint de healthcheck."""
+    """Endpoint de healthcheck (503 enquanto os serviços ainda inicializam)."""
     sheets_service = current_app.config.get('sheets_service')
     if not sheets_service:
         return {
             'status': 'degraded',
             'sheets_connected': False,
+            'ready': False,
             'timestamp': datetime.datetime.now().isoformat(),
             'reason': 'sheets_service not initialized'
         }, 503
+
+    user_service = current_app.config.get('user_service')
+    pronto = sheets_service.pronto and (user_service is None or user_service.pronto)
+    if not pronto:
+        return {
+            'status': 'starting',
+            'sheets_connected': False,
+            'ready': False,
+            'sheets_ready': sheets_service.pronto,
+            'users_ready': bool(user_service and user_service.pronto),
+            'timestamp': datetime.datetime.now().isoformat()
+        }, 503
     
     disponivel, _ = sheets_service.is_available()
     
     return {
         'status': 'healthy' if disponivel else 'degraded',
         'sheets_connected': disponivel,
+        'ready': True,
         'timestamp': datetime.datetime.now().isoformat()
     }, 200
@@ -3,9 +3,28 @@
 from .sheets_service import SheetsService
 from .notification_service import NotificationService
 from .user_service import UserService
+from .user_directory_sync import UserDirectorySync
+from .password_verifier import PasswordVerifier, VerificadorSaturadoError
+from .document_store import DocumentStore, Documento
+from .time_report_service import TimeReportService, RelatorioTempo
+from .centrais_repository import CentraisRepository, Central
+from .ferramentas_repository import FerramentasRepository, Ferramenta
+from .log_archive import ArquivoLog
 
 __all__ = [
     'SheetsService',
     'NotificationService',
-    'UserService'
+    'UserService',
+    'UserDirectorySync',
+    'PasswordVerifier',
+    'VerificadorSaturadoError',
+    'DocumentStore',
+    'Documento',
+    'TimeReportService',
+    'RelatorioTempo',
+    'CentraisRepository',
+    'Central',
+    'FerramentasRepository',
+    'Ferramenta',
+    'ArquivoLog'
 ]
@@ -0,0 +1,437 @@
+"""
+Repositório da aba "Controle de Centrais".
+
+Mantém a aba aberta, o mapa cabeçalho → coluna (recalculado só quando o
+cabeçalho muda) e as linhas já decodificadas em registros `Central`, com
+cache por TTL. As alterações feitas por aqui atualizam o cache no lugar, sem
+reler a aba.
+
+Cada central é endereçada pelo ID estável da coluna `ID` oculta (ver
+`stable_ids`), e não pela posição na listagem.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from gspread.utils import rowcol_to_a1
+
+from appmodules.services.stable_ids import (
+    MapaIds, garantir_coluna_id, linha_confere, linhas_conferem, novo_id, preencher_ids_faltantes,
+)
+from appmodules.utils.programacao import (
+    codificar_bitset, decodificar_bitset, decodificar_json, resumo_matriz,
+)
+from appmodules.utils.text import mapa_cabecalhos, normalizar_cabecalho
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HEADERS_PADRAO = [
+    'Número de Portas', 'Código de Série', 'Status', 'Obra Utilizada',
+    'Data Cadastro', 'Programação', 'Programação Resumo', 'Programação Bits',
+]
+
+
+# Campo do registro -> (rótulo exibido, aliases aceitos no cabeçalho já normalizados)
+CAMPOS_CENTRAL: Dict[str, tuple] = {
+    campo: (rotulo, tuple(normalizar_cabecalho(a) for a in aliases))
+    for campo, rotulo, aliases in (
+        ('numero_portas', 'Número de Portas', ('Número de Portas', 'Numero de Portas', 'Portas')),
+        ('codigo_serie', 'Código de Série', ('Código de Série', 'Codigo de Serie', 'Codigo', 'Série')),
+        ('status', 'Status', ('Status',)),
+        ('obra', 'Obra Utilizada', ('Obra Utilizada', 'Obra')),
+        ('data_cadastro', 'Data Cadastro', ('Data Cadastro', 'Data de Cadastro', 'Cadastro', 'Data')),
+        ('programacao', 'Programação', ('Programação', 'Programacao')),
+        ('programacao_resumo', 'Programação Resumo',
+         ('Programação Resumo', 'Programacao Resumo', 'ProgramacaoResumo', 'Programacao_Resumo')),
+        ('programacao_bits', 'Programação Bits', ('Programação Bits', 'Programacao Bits')),
+    )
+}
+
+
+@dataclass
+class Central:
+    """Linha da aba de centrais já decodificada."""
+
+    linha: int
+    id: str = ''
+    numero_portas: str = ''
+    codigo_serie: str = ''
+    status: str = ''
+    obra: str = ''
+    data_cadastro: str = ''
+    programacao: str = ''
+    programacao_resumo: str = ''
+    programacao_bits: str = ''
+
+    @property
+    def portas(self) -> int:
+        """Número de portas como inteiro (0 se inválido)."""
+        try:
+            return int(float(str(self.numero_portas).strip().replace(',', '.')))
+        except Exception:
+            return 0
+
+    def matriz_programacao(self) -> 'np.ndarray':
+        """Matriz da programação; usa a forma compacta quando ela bate com o número de portas."""
+        matriz = decodificar_bitset(self.programacao_bits, self.portas) if self.programacao_bits else None
+        return matriz if matriz is not None else decodificar_json(self.programacao, self.portas)
+
+    def como_dict(self) -> dict:
+        """Dicionário com os rótulos da planilha (formato usado pelo template)."""
+        dados = {rotulo: getattr(self, campo) for campo, (rotulo, _) in CAMPOS_CENTRAL.items()}
+        dados['ID'] = self.id
+        return dados
+
+
+class CentraisRepository:
+    """Acesso à aba de centrais com cache de registros decodificados."""
+
+    def __init__(self, sheets_service, tab_name: str):
+        """
+        Args:
+            sheets_service: SheetsService conectado (usa `client` e `sheet_id`)
+            tab_name: Nome da aba de centrais
+        """
+        self.sheets_service = sheets_service
+        self.tab_name = tab_name
+        self._worksheet = None
+        self._lock = threading.RLock()
+        self._headers: List[str] = []
+        self._header_versao = 0
+        self._colunas: Dict[str, Optional[int]] = {}
+        self._centrais: List[Central] = []
+        self._mapa: MapaIds[Central] = MapaIds()
+        self._idx_id: Optional[int] = None
+        self._carregado = False
+        self._expires_at = 0.0
+        self._ttl_seconds = max(5, int(os.getenv('CENTRAIS_CACHE_TTL_SECONDS', '120')))
+
+    @property
+    def header_versao(self) -> int:
+        """Incrementa sempre que o cabeçalho da aba muda."""
+        return self._header_versao
+
+    def invalidar(self) -> None:
+        """Descarta o cache (a próxima leitura relê a aba)."""
+        with self._lock:
+            self._carregado = False
+            self._expires_at = 0.0
+
+    def _aba(self):
+        """Abre (ou cria) a aba uma única vez e garante as colunas esperadas."""
+        if self._worksheet is not None:
+            return self._worksheet
+
+        spreadsheet = self.sheets_service.client.open_by_key(self.sheets_service.sheet_id)
+        try:
+            worksheet = spreadsheet.worksheet(self.tab_name)
+        except Exception:
+            # Aba não existe, cria
+            worksheet = spreadsheet.add_worksheet(title=self.tab_name, rows=100, cols=10)
+            worksheet.append_row(HEADERS_PADRAO)
+            logger.info(f"Aba '{self.tab_name}' criada")
+        else:
+            self._garantir_colunas(worksheet, [str(v or '').strip() for v in worksheet.row_values(1)])
+        self._worksheet = worksheet
+        return worksheet
+
+    def _garantir_colunas(self, worksheet, current_headers: List[str]) -> None:
+        """Acrescenta as colunas de programação (e Data Cadastro) em abas antigas."""
+        normalizados = [normalizar_cabecalho(h) for h in current_headers]
+        need_prog = 'programacao' not in normalizados
+        need_prog_resumo = 'programacao resumo' not in normalizados
+        # Garante que a coluna Data Cadastro exista (compatibilidade com versões antigas)
+        need_data_cadastro = not any(h in ('data cadastro', 'data', 'cadastro') for h in normalizados)
+        if not (need_prog or need_prog_resumo):
+            return
+
+        novos = list(current_headers)
+        if need_prog:
+            novos.append('Programação')
+        if need_prog_resumo:
+            novos.append('Programação Resumo')
+        if need_data_cadastro:
+            # Inserir Data Cadastro logo após a Obra, se houver; senão ao final
+            idx_obra = next((i for i, h in enumerate(normalizados) if h in ('obra utilizada', 'obra')), None)
+            if idx_obra is not None:
+                novos.insert(idx_obra + 1, 'Data Cadastro')
+            else:
+                novos.append('Data Cadastro')
+        worksheet.update('A1', [novos])
+
+    def _resolver_colunas(self, headers: Sequence[str]) -> None:
+        """Recalcula o mapa campo → coluna apenas quando o cabeçalho muda."""
+        headers = [str(h or '').strip() for h in headers]
+        if headers == self._headers and self._colunas:
+            return
+
+        header_map = mapa_cabecalhos(headers)
+        normalizados = [normalizar_cabecalho(h) for h in headers if h]
+        duplicados = sorted({h for h in normalizados if normalizados.count(h) > 1})
+        if duplicados:
+            logger.warning(f"Cabeçalhos duplicados detectados na aba '{self.tab_name}': {duplicados}")
+
+        self._headers = headers
+        self._colunas = {
+            campo: next((header_map[a] for a in aliases if a in header_map), None)
+            for campo, (_, aliases) in CAMPOS_CENTRAL.items()
+        }
+        self._header_versao += 1
+
+    def _decodificar(self, numero_linha: int, row: Sequence[str]) -> Central:
+        valores = {}
+        for campo, idx in self._colunas.items():
+            valores[campo] = str(row[idx] or '').strip() if idx is not None and idx < len(row) else ''
+        registro_id = str(row[self._idx_id] or '').strip() if self._idx_id < len(row) else ''
+        central = Central(linha=numero_linha, id=registro_id, **valores)
+        if central.programacao and not central.programacao_resumo:
+            central.programacao_resumo = resumo_matriz(central.matriz_programacao())
+        return central
+
+    def _carregar(self) -> None:
+        worksheet = self._aba()
+        data = worksheet.get_all_values()
+        headers = [str(h or '').strip() for h in data[0]] if data else list(HEADERS_PADRAO)
+        self._idx_id = garantir_coluna_id(worksheet, headers)
+        linhas = [list(row) for row in data[1:]]
+        preencher_ids_faltantes(worksheet, linhas, self._idx_id)
+        self._resolver_colunas(headers)
+        self._centrais = [
+            self._decodificar(numero, row)
+            for numero, row in enumerate(linhas, start=2)
+            if any(str(c or '').strip() for c in row)
+        ]
+        self._mapa.carregar(self._centrais)
+        self._carregado = True
+        self._expires_at = time.time() + self._ttl_seconds
+
+    def _garantir_carregado(self) -> None:
+        if not self._carregado or time.time() >= self._expires_at:
+            self._carregar()
+
+    def listar(self, use_cache: bool = True, force_refresh: bool = False) -> List[Central]:
+        """Centrais na ordem da planilha."""
+        try:
+            with self._lock:
+                if force_refresh or not use_cache or not self._carregado or time.time() >= self._expires_at:
+                    self._carregar()
+                return list(self._centrais)
+        except Exception as e:
+            logger.warning(f"Erro ao obter centrais: {e}")
+            return []
+
+    def obter(self, registro_id: str) -> Optional[Central]:
+        """Central pelo ID estável (sem reler a aba se o cache estiver válido)."""
+        try:
+            with self._lock:
+                self._garantir_carregado()
+                return self._mapa.obter(registro_id)
+        except Exception as e:
+            logger.warning(f"Erro ao obter central {registro_id}: {e}")
+            return None
+
+    def _localizar(self, registro_id: str) -> Optional[Central]:
+        """
+        Central pelo ID, conferindo na planilha se a linha ainda é dela.
+
+        Se outra instância inseriu/removeu linhas, o mapa é reconstruído e o
+        ID é resolvido de novo (None se a central foi apagada).
+        """
+        central = self.obter(registro_id)
+        if central is None:
+            return None
+        if linha_confere(self._aba(), central.linha, self._idx_id, central.id):
+            return central
+        logger.info(f"Aba '{self.tab_name}' alterada externamente; recarregando mapa de IDs")
+        self._carregar()
+        return self._mapa.obter(registro_id)
+
+    def _localizar_varios(self, registro_ids: Sequence[str]) -> Dict[str, Optional[Central]]:
+        """Como `_localizar`, para vários IDs com uma única leitura da coluna de ID."""
+        self._garantir_carregado()
+        encontradas = {registro_id: self._mapa.obter(registro_id) for registro_id in registro_ids}
+        presentes = [c for c in encontradas.values() if c is not None]
+        if presentes and not linhas_conferem(self._aba(), presentes, self._idx_id):
+            logger.info(f"Aba '{self.tab_name}' alterada externamente; recarregando mapa de IDs")
+            self._carregar()
+            encontradas = {registro_id: self._mapa.obter(registro_id) for registro_id in registro_ids}
+        return encontradas
+
+    def _coluna(self, campo: str) -> Optional[int]:
+        return self._colunas.get(campo)
+
+    def adicionar(self, numero_portas: str, codigo_serie: str, status: str, obra: str,
+                  data_cadastro: str) -> Optional[str]:
+        """
+        Acrescenta uma central, gravando cada valor na coluna do seu cabeçalho.
+
+        Returns:
+            ID da nova central, ou None em caso de erro
+        """
+        try:
+            with self._lock:
+                worksheet = self._aba()
+                if self._idx_id is None:
+                    headers = [str(h or '').strip() for h in worksheet.row_values(1)] or list(HEADERS_PADRAO)
+                    self._idx_id = garantir_coluna_id(worksheet, headers)
+                    self._resolver_colunas(headers)
+                nova = Central(linha=0, id=novo_id(), numero_portas=numero_portas, codigo_serie=codigo_serie,
+                               status=status, obra=obra, data_cadastro=data_cadastro)
+                colunas = [i for i in self._colunas.values() if i is not None]
+                largura = max(colunas + [self._idx_id, len(HEADERS_PADRAO) - 1]) + 1
+                row = [''] * largura
+                for campo, idx in self._colunas.items():
+                    if idx is not None:
+                        row[idx] = getattr(nova, campo)
+                row[self._idx_id] = nova.id
+
+                resposta = worksheet.append_row(row)
+                updated_range = (resposta or {}).get('updates', {}).get('updatedRange', '')
+                match = re.search(r'![A-Z]+(\d+)', str(updated_range))
+                nova.linha = int(match.group(1)) if match else 0
+                if self._carregado and nova.linha:
+                    self._centrais.append(nova)
+                    self._mapa.adicionar(nova)
+                else:
+                    self.invalidar()
+            return nova.id
+        except Exception as e:
+            logger.error(f"Erro ao adicionar central: {e}")
+            return None
+
+    def _garantir_campos(self, campos) -> None:
+        """Acrescenta ao cabeçalho as colunas ainda inexistentes dos campos informados."""
+        faltantes = [campo for campo in dict.fromkeys(campos) if self._coluna(campo) is None]
+        if faltantes:
+            novos = list(self._headers) + [CAMPOS_CENTRAL[campo][0] for campo in faltantes]
+            self._aba().update('A1', [novos])
+            self._resolver_colunas(novos)
+
+    def _celulas(self, central: Central, valores: Dict[str, str]) -> List[dict]:
+        return [
+            {'range': rowcol_to_a1(central.linha, self._coluna(campo) + 1), 'values': [[valor]]}
+            for campo, valor in valores.items()
+        ]
+
+    def _gravar_campos(self, central: Central, valores: Dict[str, str]) -> None:
+        """Grava os campos informados da linha em uma única chamada à API."""
+        self._garantir_campos(valores)
+        self._aba().batch_update(self._celulas(central, valores))
+        for campo, valor in valores.items():
+            setattr(central, campo, valor)
+
+    def atualizar_status(self, registro_id: str, status: str, obra: str) -> bool:
+        """Atualiza Status e Obra Utilizada de uma central."""
+        try:
+            with self._lock:
+                central = self._localizar(registro_id)
+                if central is None:
+                    return False
+                self._gravar_campos(central, {'status': status, 'obra': obra})
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao atualizar central: {e}")
+            return False
+
+    def atualizar_programacao(self, registro_id: str, programacao: str) -> Optional[str]:
+        """
+        Grava a programação (JSON compactado), o resumo e a forma compacta.
+
+        Só as células que mudaram são gravadas (nenhuma chamada se nada mudou).
+
+        Returns:
+            O resumo, ou None em caso de erro
+        """
+        try:
+            with self._lock:
+                central = self._localizar(registro_id)
+                if central is None:
+                    return None
+                resumo, valores = self._valores_programacao(central, programacao)
+                if valores:
+                    self._gravar_campos(central, valores)
+            return resumo
+        except Exception as e:
+            logger.error(f"Erro ao atualizar programação da central: {e}")
+            return None
+
+    @staticmethod
+    def _valores_programacao(central: Central, programacao: str) -> Tuple[str, Dict[str, str]]:
+        """Resumo da programação e os campos que mudam na central."""
+        matriz = decodificar_json(programacao, central.portas)
+        resumo = resumo_matriz(matriz)
+        valores = {
+            campo: valor for campo, valor in (
+                ('programacao', programacao),
+                ('programacao_resumo', resumo),
+                ('programacao_bits', codificar_bitset(matriz)),
+            )
+            if getattr(central, campo) != valor
+        }
+        return resumo, valores
+
+    def atualizar_programacoes(self, programacoes: Dict[str, str]) -> Dict[str, dict]:
+        """
+        Grava a programação de várias centrais em uma única `batch_update`.
+
+        Os IDs são conferidos com uma leitura da coluna de ID; só as células
+        que mudaram entram na gravação.
+
+        Args:
+            programacoes: ID da central → programação (JSON compactado)
+
+        Returns:
+            ID → {'success': bool, 'resumo': str} ou {'success': False, 'message': str}
+        """
+        resultados: Dict[str, dict] = {}
+        try:
+            with self._lock:
+                encontradas = self._localizar_varios(list(programacoes))
+                alteracoes = []
+                for registro_id, programacao in programacoes.items():
+                    central = encontradas[registro_id]
+                    if central is None:
+                        resultados[registro_id] = {'success': False, 'message': 'Central não encontrada'}
+                        continue
+                    resumo, valores = self._valores_programacao(central, programacao)
+                    resultados[registro_id] = {'success': True, 'resumo': resumo}
+                    if valores:
+                        alteracoes.append((central, valores))
+
+                if alteracoes:
+                    self._garantir_campos(campo for _, valores in alteracoes for campo in valores)
+                    self._aba().batch_update([
+                        celula for central, valores in alteracoes for celula in self._celulas(central, valores)
+                    ])
+                    for central, valores in alteracoes:
+                        for campo, valor in valores.items():
+                            setattr(central, campo, valor)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar programações das centrais: {e}")
+            for registro_id in programacoes:
+                if resultados.get(registro_id, {}).get('success', True):
+                    resultados[registro_id] = {'success': False, 'message': 'Erro ao gravar programação'}
+        return resultados
+
+    def deletar(self, registro_id: str) -> bool:
+        """Remove a linha da central e desloca as linhas seguintes no cache."""
+        try:
+            with self._lock:
+                central = self._localizar(registro_id)
+                if central is None:
+                    return False
+                self._aba().delete_rows(central.linha)
+                self._centrais.remove(central)
+                self._mapa.remover(central.id)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao deletar central: {e}")
+            return False
@@ -0,0 +1,202 @@
+"""
+Armazenamento de documentos enviados, endereçado por conteúdo.
+
+Cada conteúdo é gravado uma única vez em `objetos/<2 primeiros hex>/<sha256>`;
+reenvios do mesmo arquivo apenas reutilizam o objeto existente. Um índice
+SQLite guarda os metadados de cada envio (nome original, tamanho, mime,
+data e número do pedido vinculado), de modo que listagens e buscas são
+consultas indexadas em vez de varreduras do diretório.
+
+Arquivos do formato antigo soltos no diretório não são importados ao abrir o
+armazenamento (cada worker faria o mesmo trabalho, em disputa); a importação
+é feita uma vez com `flask importar-documentos`.
+"""
+import datetime
+import hashlib
+import logging
+import mimetypes
+import os
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Documento:
+    """Metadados de um documento enviado."""
+
+    id: int
+    sha256: str
+    nome_original: str
+    tamanho: int
+    mime: str
+    enviado_em: str
+    numero_pedido: str = ''
+
+
+class DocumentStore:
+    """Objetos deduplicados por SHA-256 com índice de metadados em SQLite."""
+
+    _COLUNAS = 'id, sha256, nome_original, tamanho, mime, enviado_em, numero_pedido'
+
+    def __init__(self, base_dir: Path):
+        """
+        Args:
+            base_dir: Diretório dos documentos (objetos, temporários e índice)
+        """
+        self.base_dir = Path(base_dir)
+        self.objetos_dir = self.base_dir / 'objetos'
+        self.tmp_dir = self.base_dir / 'tmp'
+        self.db_path = str(self.base_dir / 'documentos.sqlite3')
+
+        self.objetos_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre conexão curta com o SQLite (segura entre processos)."""
+        return sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+
+    def _init_db(self) -> None:
+        """Cria as tabelas e índices, se necessário."""
+        with closing(self._conectar()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS documentos ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'sha256 TEXT NOT NULL, '
+                'nome_original TEXT NOT NULL, '
+                'tamanho INTEGER NOT NULL, '
+                'mime TEXT NOT NULL, '
+                'enviado_em TEXT NOT NULL, '
+                "numero_pedido TEXT NOT NULL DEFAULT '', "
+                'UNIQUE (sha256, numero_pedido))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_documentos_enviado ON documentos(enviado_em)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_documentos_pedido ON documentos(numero_pedido)')
+
+    def caminho_objeto(self, sha256: str) -> Path:
+        """Caminho do objeto com o conteúdo informado."""
+        return self.objetos_dir / sha256[:2] / sha256
+
+    def armazenar(self, caminho_tmp: Path, sha256: str, tamanho: int, nome_original: str,
+                  numero_pedido: str = '', mime: Optional[str] = None) -> Tuple[Documento, bool]:
+        """
+        Move um arquivo recebido para o armazenamento e registra seus metadados.
+
+        Se o conteúdo já existir, o arquivo temporário é descartado. Se o
+        mesmo conteúdo já estiver registrado para o mesmo pedido, o registro
+        existente é retornado.
+
+        Returns:
+            (documento, novo): `novo` é False quando nada precisou ser gravado
+        """
+        destino = self.caminho_objeto(sha256)
+        if destino.exists():
+            Path(caminho_tmp).unlink()
+        else:
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(caminho_tmp, destino)
+
+        mime = mime or mimetypes.guess_type(nome_original)[0] or 'application/octet-stream'
+        enviado_em = datetime.datetime.now().isoformat(timespec='seconds')
+        numero_pedido = str(numero_pedido or '').strip()
+
+        with closing(self._conectar()) as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO documentos '
+                '(sha256, nome_original, tamanho, mime, enviado_em, numero_pedido) VALUES (?, ?, ?, ?, ?, ?)',
+                (sha256, nome_original, int(tamanho), mime, enviado_em, numero_pedido)
+            )
+            novo = cursor.rowcount == 1
+            row = conn.execute(
+                f'SELECT {self._COLUNAS} FROM documentos WHERE sha256 = ? AND numero_pedido = ?',
+                (sha256, numero_pedido)
+            ).fetchone()
+
+        if not novo:
+            logger.info("Documento duplicado ignorado (sha256=%s)", sha256[:16])
+        return Documento(*row), novo
+
+    def obter(self, documento_id: int) -> Optional[Documento]:
+        """Busca um documento pelo id."""
+        with closing(self._conectar()) as conn:
+            row = conn.execute(
+                f'SELECT {self._COLUNAS} FROM documentos WHERE id = ?', (int(documento_id),)
+            ).fetchone()
+        return Documento(*row) if row else None
+
+    def buscar_por_sha256(self, sha256: str) -> List[Documento]:
+        """Todos os envios de um mesmo conteúdo."""
+        with closing(self._conectar()) as conn:
+            rows = conn.execute(
+                f'SELECT {self._COLUNAS} FROM documentos WHERE sha256 = ? ORDER BY id', (sha256,)
+            ).fetchall()
+        return [Documento(*row) for row in rows]
+
+    def listar(self, limite: int = 50, offset: int = 0) -> List[Documento]:
+        """Documentos mais recentes primeiro."""
+        with closing(self._conectar()) as conn:
+            rows = conn.execute(
+                f'SELECT {self._COLUNAS} FROM documentos ORDER BY enviado_em DESC, id DESC LIMIT ? OFFSET ?',
+                (max(1, int(limite)), max(0, int(offset)))
+            ).fetchall()
+        return [Documento(*row) for row in rows]
+
+    def listar_por_pedido(self, numero_pedido: str) -> List[Documento]:
+        """Anexos de uma OS, do mais antigo ao mais recente."""
+        with closing(self._conectar()) as conn:
+            rows = conn.execute(
+                f'SELECT {self._COLUNAS} FROM documentos WHERE numero_pedido = ? ORDER BY id',
+                (str(numero_pedido).strip(),)
+            ).fetchall()
+        return [Documento(*row) for row in rows]
+
+    def contar_por_pedidos(self, numeros_pedido: Iterable[str]) -> Dict[str, int]:
+        """Quantidade de anexos por OS, em consultas agrupadas (sem uma consulta por OS)."""
+        numeros = sorted({str(n).strip() for n in numeros_pedido if str(n or '').strip()})
+        contagens: Dict[str, int] = {}
+        with closing(self._conectar()) as conn:
+            # Lotes abaixo do limite de parâmetros do SQLite
+            for inicio in range(0, len(numeros), 500):
+                lote = numeros[inicio:inicio + 500]
+                marcadores = ','.join('?' * len(lote))
+                for numero, total in conn.execute(
+                    f'SELECT numero_pedido, COUNT(*) FROM documentos '
+                    f'WHERE numero_pedido IN ({marcadores}) GROUP BY numero_pedido',
+                    lote
+                ):
+                    contagens[numero] = total
+        return contagens
+
+    def importar_arquivos_legados(self) -> int:
+        """Importa arquivos do formato antigo (`{timestamp}_{nome}`) soltos no diretório base."""
+        importados = 0
+        for caminho in sorted(self.base_dir.iterdir()):
+            if not caminho.is_file() or caminho.name.startswith('.') or caminho.name.startswith('documentos.sqlite3'):
+                continue
+            try:
+                hasher = hashlib.sha256()
+                with open(caminho, 'rb') as arquivo:
+                    for bloco in iter(lambda: arquivo.read(64 * 1024), b''):
+                        hasher.update(bloco)
+                tamanho = caminho.stat().st_size
+                # {AAAAMMDD}_{HHMMSS}_{nome} ou {AAAAMMDD}_{HHMMSS}_{sha256[:16]}_{nome}
+                nome_original = caminho.name
+                partes = caminho.name.split('_', 2)
+                if len(partes) == 3 and partes[0].isdigit() and partes[1].isdigit():
+                    nome_original = partes[2]
+                    prefixo, _, resto = nome_original.partition('_')
+                    if resto and prefixo == hasher.hexdigest()[:16]:
+                        nome_original = resto
+                self.armazenar(caminho, hasher.hexdigest(), tamanho, nome_original)
+                importados += 1
+            except Exception as e:
+                logger.warning("Falha ao importar documento legado %s: %s", caminho.name, e)
+        if importados:
+            logger.info("Importados %s documento(s) legados para o armazenamento", importados)
+        return importados
@@ -0,0 +1,352 @@
+"""
+Repositório da aba "Controle de Ferramentas".
+
+Mantém a aba aberta e as ferramentas em cache (TTL), cada uma endereçada
+pelo ID estável da coluna `ID` oculta (ver `stable_ids`). Edições e
+exclusões resolvem a linha pelo mapa de IDs, sem reler a aba.
+
+Cada alteração vai para a planilha junto com a sua linha no "Histórico de
+Ferramentas": os pedidos (`updateCells`/`deleteDimension` na aba de
+ferramentas e `appendCells` no histórico) seguem em um único
+`Spreadsheet.batch_update`.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from appmodules.services.historico_ferramentas import HistoricoFerramentas
+from appmodules.services.log_archive import ArquivoLog, arquivar_aba
+from appmodules.services.stable_ids import (
+    COLUNA_ID, MapaIds, garantir_coluna_id, linha_confere, novo_id, preencher_ids_faltantes,
+)
+
+logger = logging.getLogger(__name__)
+
+HEADERS_PADRAO = [
+    'Nome', 'Patrocínio', 'Data de Cadastro', 'Última Manutenção',
+    'Status', 'Observação', 'Responsável',
+]
+
+HEADERS_HISTORICO = ['Ferramenta', 'Evento', 'Data/Hora', 'Usuário', 'Detalhes']
+
+# Campos editáveis pela página (rótulo na planilha -> rótulo no histórico)
+CAMPOS_EDITAVEIS = {
+    'Responsável': 'Responsável',
+    'Última Manutenção': 'Manutenção',
+    'Status': 'Status',
+    'Observação': 'Obs',
+}
+
+
+def _linha_celulas(valores: Sequence[str]) -> dict:
+    """Linha no formato `RowData` da API (valores gravados como texto, sem interpretação)."""
+    return {'values': [{'userEnteredValue': {'stringValue': str(v or '')}} for v in valores]}
+
+
+def detalhes_edicao(anteriores: Dict[str, str], novos: Dict[str, str]) -> str:
+    """Texto do histórico para uma edição: `'Status: Disponível → Em Manutenção, ...'`."""
+    mudancas = [
+        f"{rotulo}: {anteriores.get(header) or '-'} → {novos.get(header) or '-'}"
+        for header, rotulo in CAMPOS_EDITAVEIS.items()
+        if header in novos and novos[header] != anteriores.get(header, '')
+    ]
+    return ', '.join(mudancas) if mudancas else 'Sem alterações'
+
+
+@dataclass
+class Ferramenta:
+    """Linha da aba de ferramentas."""
+
+    linha: int
+    id: str = ''
+    dados: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def nome(self) -> str:
+        return str(self.dados.get('Nome', '') or '')
+
+    def como_dict(self) -> dict:
+        """Dicionário cabeçalho → valor (formato usado pelo template), com o ID."""
+        dados = dict(self.dados)
+        dados[COLUNA_ID] = self.id
+        return dados
+
+
+class FerramentasRepository:
+    """Acesso à aba de ferramentas com cache e IDs estáveis."""
+
+    def __init__(self, sheets_service, tab_name: str, historico_tab: str,
+                 arquivo_historico: Optional[ArquivoLog] = None):
+        """
+        Args:
+            sheets_service: SheetsService conectado (usa `client` e `sheet_id`)
+            tab_name: Nome da aba de ferramentas
+            historico_tab: Nome da aba de histórico de ferramentas
+            arquivo_historico: Arquivo local das linhas antigas do histórico (opcional)
+        """
+        self.sheets_service = sheets_service
+        self.tab_name = tab_name
+        self.historico_tab = historico_tab
+        self._spreadsheet = None
+        self._worksheet = None
+        self._worksheet_historico = None
+        self._historico = HistoricoFerramentas(self._aba_historico, arquivo_historico)
+        self._lock = threading.RLock()
+        self._headers: List[str] = []
+        self._idx_id: Optional[int] = None
+        self._ferramentas: List[Ferramenta] = []
+        self._mapa: MapaIds[Ferramenta] = MapaIds()
+        self._carregado = False
+        self._expires_at = 0.0
+        self._ttl_seconds = max(5, int(os.getenv('FERRAMENTAS_CACHE_TTL_SECONDS', '120')))
+
+    def invalidar(self) -> None:
+        """Descarta o cache (a próxima leitura relê a aba)."""
+        with self._lock:
+            self._carregado = False
+            self._expires_at = 0.0
+
+    def _planilha(self):
+        if self._spreadsheet is None:
+            self._spreadsheet = self.sheets_service.client.open_by_key(self.sheets_service.sheet_id)
+        return self._spreadsheet
+
+    def _aba(self):
+        """Abre (ou cria) a aba uma única vez."""
+        if self._worksheet is not None:
+            return self._worksheet
+
+        spreadsheet = self._planilha()
+        try:
+            worksheet = spreadsheet.worksheet(self.tab_name)
+            headers = worksheet.row_values(1)
+            if 'Responsável' not in headers:
+                worksheet.update('G1', [['Responsável']])
+        except Exception:
+            worksheet = spreadsheet.add_worksheet(title=self.tab_name, rows=500, cols=10)
+            worksheet.append_row(HEADERS_PADRAO)
+            logger.info(f"Aba '{self.tab_name}' criada")
+        self._worksheet = worksheet
+        return worksheet
+
+    def _aba_historico(self):
+        """Abre (ou cria) a aba de histórico uma única vez."""
+        if self._worksheet_historico is not None:
+            return self._worksheet_historico
+
+        spreadsheet = self._planilha()
+        try:
+            worksheet = spreadsheet.worksheet(self.historico_tab)
+        except Exception:
+            worksheet = spreadsheet.add_worksheet(title=self.historico_tab, rows=1000, cols=5)
+            worksheet.append_row(HEADERS_HISTORICO)
+            logger.info(f"Aba '{self.historico_tab}' criada")
+        self._worksheet_historico = worksheet
+        return worksheet
+
+    def _pedido_historico(self, nome: str, evento: str, usuario: str, detalhes: str) -> dict:
+        """Pedido `appendCells` de uma linha do histórico."""
+        data_hora = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        return {'appendCells': {
+            'sheetId': self._aba_historico().id,
+            'rows': [_linha_celulas([nome, evento, data_hora, usuario, detalhes])],
+            'fields': 'userEnteredValue',
+        }}
+
+    def _pedido_celula(self, linha: int, coluna: int, valor: str) -> dict:
+        """Pedido `updateCells` de uma célula da aba de ferramentas (índices 1-based)."""
+        return {'updateCells': {
+            'range': {
+                'sheetId': self._aba().id,
+                'startRowIndex': linha - 1, 'endRowIndex': linha,
+                'startColumnIndex': coluna - 1, 'endColumnIndex': coluna,
+            },
+            'rows': [_linha_celulas([valor])],
+            'fields': 'userEnteredValue',
+        }}
+
+    def _enviar(self, pedidos: List[dict]) -> None:
+        self._planilha().batch_update({'requests': pedidos})
+        self._historico.marcar_desatualizado()
+
+    def historico(self, nome: str = '', limit: int = 50,
+                  cursor: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+        """Página do histórico, do mais recente ao mais antigo (ver `HistoricoFerramentas.consultar`)."""
+        return self._historico.consultar(nome, limit, cursor)
+
+    def arquivar_historico(self, horizonte_dias: int) -> int:
+        """
+        Move para o arquivo local os eventos do histórico mais antigos que
+        `horizonte_dias` (ver `log_archive.arquivar_aba`).
+
+        Returns:
+            Quantidade de eventos arquivados (0 sem arquivo configurado)
+        """
+        if self._historico.arquivo is None:
+            return 0
+        quantidade = arquivar_aba(
+            self._aba_historico(), self._historico.arquivo, 'Data/Hora',
+            ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y'), horizonte_dias)
+        if quantidade:
+            self._historico.marcar_desatualizado(completo=True)
+        return quantidade
+
+    def _decodificar(self, numero_linha: int, row: Sequence[str]) -> Ferramenta:
+        dados = {
+            header: row[idx] if idx < len(row) else ''
+            for idx, header in enumerate(self._headers)
+            if header and idx != self._idx_id
+        }
+        registro_id = str(row[self._idx_id] or '').strip() if self._idx_id < len(row) else ''
+        return Ferramenta(linha=numero_linha, id=registro_id, dados=dados)
+
+    def _carregar(self) -> None:
+        worksheet = self._aba()
+        data = worksheet.get_all_values()
+        headers = [str(h or '').strip() for h in data[0]] if data else list(HEADERS_PADRAO)
+        self._idx_id = garantir_coluna_id(worksheet, headers)
+        linhas = [list(row) for row in data[1:]]
+        preencher_ids_faltantes(worksheet, linhas, self._idx_id)
+        self._headers = headers
+        self._ferramentas = [
+            self._decodificar(numero, row)
+            for numero, row in enumerate(linhas, start=2)
+            if any(str(c or '').strip() for c in row)
+        ]
+        self._mapa.carregar(self._ferramentas)
+        self._carregado = True
+        self._expires_at = time.time() + self._ttl_seconds
+
+    def _garantir_carregado(self) -> None:
+        if not self._carregado or time.time() >= self._expires_at:
+            self._carregar()
+
+    def listar(self, use_cache: bool = True, force_refresh: bool = False) -> List[Ferramenta]:
+        """Ferramentas na ordem da planilha."""
+        try:
+            with self._lock:
+                if force_refresh or not use_cache:
+                    self._carregar()
+                else:
+                    self._garantir_carregado()
+                return list(self._ferramentas)
+        except Exception as e:
+            logger.warning(f"Erro ao obter ferramentas: {e}")
+            return []
+
+    def obter(self, registro_id: str) -> Optional[Ferramenta]:
+        """Ferramenta pelo ID estável (sem reler a aba se o cache estiver válido)."""
+        try:
+            with self._lock:
+                self._garantir_carregado()
+                return self._mapa.obter(registro_id)
+        except Exception as e:
+            logger.warning(f"Erro ao obter ferramenta {registro_id}: {e}")
+            return None
+
+    def _localizar(self, registro_id: str) -> Optional[Ferramenta]:
+        """Ferramenta pelo ID, conferindo se a linha ainda é dela (recarrega se não for)."""
+        ferramenta = self.obter(registro_id)
+        if ferramenta is None:
+            return None
+        if linha_confere(self._aba(), ferramenta.linha, self._idx_id, ferramenta.id):
+            return ferramenta
+        logger.info(f"Aba '{self.tab_name}' alterada externamente; recarregando mapa de IDs")
+        self._carregar()
+        return self._mapa.obter(registro_id)
+
+    def _coluna(self, header: str) -> int:
+        """Índice 0-based do cabeçalho (acrescenta a coluna se não existir)."""
+        if header not in self._headers:
+            self._headers.append(header)
+            self._aba().update_cell(1, len(self._headers), header)
+        return self._headers.index(header)
+
+    def adicionar(self, dados: Dict[str, str], usuario: str) -> Optional[str]:
+        """
+        Acrescenta uma ferramenta (`dados` com os rótulos de HEADERS_PADRAO) e
+        o evento 'Cadastro' no histórico, na mesma chamada à API.
+
+        Como `appendCells` não informa a linha gravada, o cache é descartado
+        (a próxima listagem relê a aba).
+
+        Returns:
+            ID da nova ferramenta, ou None em caso de erro
+        """
+        try:
+            with self._lock:
+                worksheet = self._aba()
+                if self._idx_id is None:
+                    headers = [str(h or '').strip() for h in worksheet.row_values(1)] or list(HEADERS_PADRAO)
+                    self._idx_id = garantir_coluna_id(worksheet, headers)
+                    self._headers = headers
+                registro_id = novo_id()
+                row = [str(dados.get(header, '') or '') if header else '' for header in self._headers]
+                row[self._idx_id] = registro_id
+                detalhes = ', '.join(f"{rotulo}: {dados.get(header, '') or ''}" for header, rotulo in (
+                    ('Patrocínio', 'Patrocínio'), ('Responsável', 'Responsável'),
+                    ('Status', 'Status'), ('Observação', 'Obs'),
+                ))
+
+                self._enviar([
+                    {'appendCells': {'sheetId': worksheet.id, 'rows': [_linha_celulas(row)],
+                                     'fields': 'userEnteredValue'}},
+                    self._pedido_historico(dados.get('Nome', ''), 'Cadastro', usuario, detalhes),
+                ])
+                self.invalidar()
+            return registro_id
+        except Exception as e:
+            logger.error(f"Erro ao adicionar ferramenta: {e}")
+            return None
+
+    def atualizar(self, registro_id: str, valores: Dict[str, str], usuario: str) -> Optional[Dict[str, str]]:
+        """
+        Grava os campos editáveis informados e o evento 'Edição' no histórico,
+        em uma única chamada à API.
+
+        Returns:
+            Valores anteriores dos campos, ou None se a ferramenta não existir
+        """
+        with self._lock:
+            ferramenta = self._localizar(registro_id)
+            if ferramenta is None:
+                return None
+            valores = {header: str(valor or '') for header, valor in valores.items() if header in CAMPOS_EDITAVEIS}
+            anteriores = {header: str(ferramenta.dados.get(header, '') or '') for header in valores}
+            pedidos = [
+                self._pedido_celula(ferramenta.linha, self._coluna(header) + 1, valor)
+                for header, valor in valores.items()
+            ]
+            pedidos.append(self._pedido_historico(
+                ferramenta.nome or 'Desconhecida', 'Edição', usuario, detalhes_edicao(anteriores, valores)))
+            self._enviar(pedidos)
+            ferramenta.dados.update(valores)
+            return anteriores
+
+    def deletar(self, registro_id: str, usuario: str) -> Optional[Ferramenta]:
+        """
+        Remove a linha da ferramenta e registra a 'Exclusão' no histórico, em
+        uma única chamada à API; as linhas seguintes sobem no cache.
+
+        Returns:
+            A ferramenta removida, ou None se não existir
+        """
+        with self._lock:
+            ferramenta = self._localizar(registro_id)
+            if ferramenta is None:
+                return None
+            self._enviar([
+                {'deleteDimension': {'range': {
+                    'sheetId': self._aba().id, 'dimension': 'ROWS',
+                    'startIndex': ferramenta.linha - 1, 'endIndex': ferramenta.linha,
+                }}},
+                self._pedido_historico(ferramenta.nome or 'Desconhecida', 'Exclusão', usuario, 'Ferramenta excluída'),
+            ])
+            self._ferramentas.remove(ferramenta)
+            self._mapa.remover(ferramenta.id)
+            return ferramenta
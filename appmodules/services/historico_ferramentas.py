@@ -0,0 +1,195 @@
+"""
+Histórico de ferramentas em memória, indexado por ferramenta.
+
+A aba "Histórico de Ferramentas" só recebe linhas novas no fim. Ela é lida
+inteira uma vez; depois do TTL só as linhas a partir da última conhecida
+são buscadas (se essa linha mudou, a aba é relida). Cada evento recebe um
+número de sequência (sua posição no log), e um índice nome → sequências
+permite paginar o histórico de uma ferramenta do mais recente para o mais
+antigo sem varrer o log inteiro.
+
+Linhas antigas podem ter sido movidas para um `ArquivoLog` (ver
+`log_archive`). As sequências continuam contando a partir do começo do log:
+os eventos arquivados ocupam 0..A-1 e os da aba seguem a partir de A, então
+um cursor continua válido depois de um arquivamento. O arquivo só é lido
+quando uma página precisa de eventos mais antigos que os da aba.
+"""
+
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from gspread.utils import rowcol_to_a1
+
+from appmodules.services.log_archive import ArquivoLog
+
+logger = logging.getLogger(__name__)
+
+COLUNA_FERRAMENTA = 'Ferramenta'
+
+
+def chave_ferramenta(nome: str) -> str:
+    """Chave do índice: nome sem espaços nas pontas, minúsculo."""
+    return str(nome or '').strip().lower()
+
+
+class HistoricoFerramentas:
+    """Log de eventos das ferramentas com índice por nome e paginação por cursor."""
+
+    def __init__(self, abrir_aba: Callable[[], object], arquivo: Optional[ArquivoLog] = None):
+        """
+        Args:
+            abrir_aba: Função que devolve a worksheet do histórico (aberta sob demanda)
+            arquivo: Partições com as linhas antigas já retiradas da aba (opcional)
+        """
+        self._abrir_aba = abrir_aba
+        self.arquivo = arquivo
+        # Eventos arquivados antes do primeiro da aba (sequência do primeiro evento da aba)
+        self._base = 0
+        self._versao_arquivo = ''
+        self._arquivados: Optional[Tuple[str, List[dict], Dict[str, List[int]]]] = None
+        self._lock = threading.Lock()
+        self._headers: List[str] = []
+        self._linhas_brutas: List[List[str]] = []
+        self._eventos: List[dict] = []
+        self._por_nome: Dict[str, List[int]] = {}
+        self._carregado = False
+        self._expires_at = 0.0
+        self._full_refresh_at = 0.0
+        self._ttl_seconds = max(0, int(os.getenv('HISTORICO_CACHE_TTL_SECONDS', '30')))
+        self._full_refresh_seconds = max(60, int(os.getenv('HISTORICO_FULL_REFRESH_SECONDS', '3600')))
+
+    def marcar_desatualizado(self, completo: bool = False) -> None:
+        """
+        Força a busca das linhas novas na próxima consulta (após gravar um
+        evento); com `completo`, a releitura da aba inteira (após arquivar).
+        """
+        self._expires_at = 0.0
+        if completo:
+            self._carregado = False
+
+    def _completar(self, linha: Sequence[str]) -> List[str]:
+        linha = [str(v) for v in linha]
+        return linha + [''] * (len(self._headers) - len(linha))
+
+    def _anexar(self, linhas: Sequence[Sequence[str]]) -> int:
+        """Anexa linhas lidas logo após a última conhecida e indexa os eventos."""
+        novos = 0
+        for linha in linhas:
+            completa = self._completar(linha)
+            self._linhas_brutas.append(completa)
+            if not any(v.strip() for v in completa):
+                continue
+            evento = dict(zip(self._headers, completa))
+            sequencia = self._base + len(self._eventos)
+            self._eventos.append(evento)
+            self._por_nome.setdefault(chave_ferramenta(evento.get(COLUNA_FERRAMENTA, '')), []).append(sequencia)
+            novos += 1
+        return novos
+
+    def _carregar_completo(self) -> None:
+        if self.arquivo is not None:
+            self._base, self._versao_arquivo = self.arquivo.total, self.arquivo.versao
+        data = self._abrir_aba().get_all_values()
+        self._headers = [str(h or '').strip() for h in data[0]] if data else []
+        self._linhas_brutas = []
+        self._eventos = []
+        self._por_nome = {}
+        self._anexar(data[1:])
+        self._carregado = True
+        self._full_refresh_at = time.time() + self._full_refresh_seconds
+
+    def _sincronizar(self, force_refresh: bool = False) -> None:
+        """
+        Dentro do TTL não acessa a planilha. Depois dele, lê apenas a partir
+        da última linha conhecida; se ela mudou, relê a aba inteira.
+        """
+        agora = time.time()
+        if not force_refresh and self._carregado and agora < self._expires_at:
+            return
+
+        if force_refresh or not self._carregado or agora >= self._full_refresh_at or not self._headers:
+            self._carregar_completo()
+        else:
+            ultima = 1 + len(self._linhas_brutas)
+            ultima_coluna = re.sub(r'\d', '', rowcol_to_a1(1, len(self._headers)))
+            valores = self._abrir_aba().get_values(f'A{ultima}:{ultima_coluna}')
+            anterior = self._linhas_brutas[-1] if self._linhas_brutas else self._headers
+            if not valores or self._completar(valores[0])[:len(self._headers)] != anterior[:len(self._headers)]:
+                logger.info("Histórico de ferramentas alterado fora do fim da aba; relendo")
+                self._carregar_completo()
+            else:
+                self._anexar(valores[1:])
+        self._expires_at = agora + self._ttl_seconds
+
+    def _eventos_arquivados(self) -> Tuple[List[dict], Dict[str, List[int]]]:
+        """Eventos do arquivo e o índice por nome (lidos uma vez por versão do arquivo)."""
+        if self._arquivados is not None and self._arquivados[0] == self._versao_arquivo:
+            return self._arquivados[1], self._arquivados[2]
+        versao = self.arquivo.versao
+        eventos: List[dict] = []
+        por_nome: Dict[str, List[int]] = {}
+        for evento in self.arquivo.ler().to_dict('records'):
+            por_nome.setdefault(chave_ferramenta(evento.get(COLUNA_FERRAMENTA, '')), []).append(len(eventos))
+            eventos.append(evento)
+        if versao == self._versao_arquivo:
+            self._arquivados = (versao, eventos, por_nome)
+        else:
+            # Arquivado durante esta consulta: a base só é movida no início da próxima
+            self.marcar_desatualizado(completo=True)
+        return eventos, por_nome
+
+    @staticmethod
+    def _fatia(sequencias: Sequence[int], cursor: Optional[int], limit: int) -> Tuple[Sequence[int], int]:
+        """Últimas `limit` sequências menores que o cursor e a posição da primeira delas."""
+        fim = len(sequencias) if cursor is None else bisect.bisect_left(sequencias, cursor)
+        inicio = max(0, fim - limit)
+        return sequencias[inicio:fim], inicio
+
+    def consultar(self, nome: str = '', limit: int = 50,
+                  cursor: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+        """
+        Eventos do mais recente para o mais antigo.
+
+        Args:
+            nome: Ferramenta (sem diferenciar maiúsculas); vazio para todas
+            limit: Tamanho da página
+            cursor: `proximo_cursor` da página anterior (None na primeira)
+
+        Returns:
+            (eventos, proximo_cursor); proximo_cursor é None na última página
+        """
+        limit = max(1, int(limit))
+        with self._lock:
+            if self.arquivo is not None and self.arquivo.versao != self._versao_arquivo:
+                # Arquivamento novo: a aba também mudou; base e eventos são relidos antes de fatiar
+                self._carregado = False
+            self._sincronizar()
+            if nome:
+                sequencias = self._por_nome.get(chave_ferramenta(nome), [])
+            else:
+                sequencias = range(self._base, self._base + len(self._eventos))
+            # Sequências menores que o cursor (eventos mais antigos que a página anterior)
+            fatia, inicio = self._fatia(sequencias, cursor, limit)
+            pagina = [dict(self._eventos[s - self._base]) for s in reversed(fatia)]
+            proximo = sequencias[inicio] if inicio > 0 else None
+
+            if inicio == 0 and self._base > 0:
+                if len(pagina) < limit:
+                    eventos, por_nome = self._eventos_arquivados()
+                    arquivadas = por_nome.get(chave_ferramenta(nome), []) if nome else range(len(eventos))
+                    limite_arquivo = self._base if cursor is None else min(cursor, self._base)
+                    fatia, inicio = self._fatia(arquivadas, limite_arquivo, limit - len(pagina))
+                    pagina.extend(dict(eventos[s]) for s in reversed(fatia))
+                    proximo = arquivadas[inicio] if inicio > 0 else None
+                elif fatia:
+                    # Página cheia com a aba: a próxima continua no arquivo
+                    proximo = fatia[0]
+        return pagina, proximo
+
+    def __len__(self) -> int:
+        return len(self._eventos)
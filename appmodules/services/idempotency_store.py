@@ -0,0 +1,149 @@
+"""
+Armazenamento de idempotência para webhooks.
+
+Guarda as chaves (ex.: id da mensagem do WhatsApp) já processadas por um
+tempo limitado, para descartar reentregas do provedor antes de qualquer
+processamento.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyStore:
+    """
+    Registro de chaves já vistas com expiração por tempo.
+
+    Mantém um LRU limitado em memória e, opcionalmente, um arquivo SQLite
+    compartilhado entre os workers do gunicorn. Quando o SQLite está
+    configurado, ele é a fonte da verdade; o LRU evita ir ao disco para
+    duplicatas recentes do próprio worker.
+    """
+
+    def __init__(self, ttl_seconds: int = 86400, max_entries: int = 10000,
+                 db_path: Optional[str] = None):
+        """
+        Args:
+            ttl_seconds: Tempo que uma chave permanece registrada
+            max_entries: Tamanho máximo do LRU em memória
+            db_path: Caminho do arquivo SQLite compartilhado (opcional)
+        """
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self.max_entries = max(1, int(max_entries))
+        self.db_path = db_path or None
+        self._memoria: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._ultima_limpeza_db = 0.0
+
+        if self.db_path:
+            try:
+                self._init_db()
+            except Exception as e:
+                logger.error("Falha ao inicializar SQLite de idempotência (%s): %s; usando apenas memória",
+                             self.db_path, e)
+                self.db_path = None
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre conexão curta com o SQLite (segura entre processos)."""
+        return sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+
+    def _init_db(self) -> None:
+        """Cria a tabela de chaves, se necessário."""
+        with closing(self._conectar()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS idempotencia ('
+                'chave TEXT PRIMARY KEY, expira_em REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_idempotencia_expira ON idempotencia(expira_em)')
+
+    def _registrar_memoria(self, chave: str, agora: float) -> bool:
+        """Registra a chave no LRU. Retorna False se já estava presente e válida."""
+        with self._lock:
+            expira_em = self._memoria.get(chave)
+            if expira_em is not None and expira_em > agora:
+                self._memoria.move_to_end(chave)
+                return False
+
+            self._memoria[chave] = agora + self.ttl_seconds
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.max_entries:
+                self._memoria.popitem(last=False)
+            return True
+
+    def _registrar_db(self, chave: str, agora: float) -> bool:
+        """Registra a chave no SQLite de forma atômica entre processos."""
+        with closing(self._conectar()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM idempotencia WHERE chave = ? AND expira_em <= ?', (chave, agora))
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO idempotencia (chave, expira_em) VALUES (?, ?)',
+                    (chave, agora + self.ttl_seconds)
+                )
+                nova = cursor.rowcount == 1
+
+                # Limpeza periódica das chaves expiradas
+                if agora - self._ultima_limpeza_db > self.ttl_seconds / 10:
+                    conn.execute('DELETE FROM idempotencia WHERE expira_em <= ?', (agora,))
+                    self._ultima_limpeza_db = agora
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return nova
+
+    def registrar(self, chave: str) -> bool:
+        """
+        Registra uma chave processada.
+
+        Returns:
+            True se a chave é nova (deve ser processada),
+            False se é duplicata dentro do TTL.
+        """
+        chave = str(chave or '').strip()
+        if not chave:
+            return True
+
+        agora = time.time()
+        nova_local = self._registrar_memoria(chave, agora)
+        if not nova_local:
+            return False
+
+        if not self.db_path:
+            return True
+
+        try:
+            return self._registrar_db(chave, agora)
+        except Exception as e:
+            # Falha no SQLite não deve derrubar o webhook; vale o registro em memória
+            logger.warning("Falha ao registrar chave de idempotência no SQLite: %s", e)
+            return True
+
+    def remover(self, chave: str) -> None:
+        """Esquece uma chave (ex.: processamento falhou e a reentrega deve ser aceita)."""
+        chave = str(chave or '').strip()
+        if not chave:
+            return
+
+        with self._lock:
+            self._memoria.pop(chave, None)
+
+        if not self.db_path:
+            return
+
+        try:
+            with closing(self._conectar()) as conn:
+                conn.execute('DELETE FROM idempotencia WHERE chave = ?', (chave,))
+        except Exception as e:
+            logger.warning("Falha ao remover chave de idempotência do SQLite: %s", e)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._memoria)
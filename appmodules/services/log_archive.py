@@ -0,0 +1,236 @@
+"""
+Arquivamento local das abas que só crescem (histórico de ferramentas e
+controle de horário).
+
+Linhas mais antigas que o horizonte configurado saem da planilha e vão para
+partições mensais comprimidas em disco (`<diretório>/<nome>/AAAA-MM.parquet`,
+ou `.csv.gz` quando não há engine Parquet instalada). Um `manifesto.json`
+guarda o cabeçalho e a quantidade de linhas de cada partição, de modo que o
+total arquivado é conhecido sem abrir os arquivos.
+
+O arquivamento grava as partições antes de apagar as linhas da aba; se o
+processo cair entre as duas etapas, a próxima execução arquiva as mesmas
+linhas de novo (linhas repetidas na partição, nenhuma perdida).
+
+pandas só é importado quando uma partição é lida ou gravada.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from gspread.utils import rowcol_to_a1
+
+from appmodules.utils.text import encontrar_coluna
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFESTO = 'manifesto.json'
+
+
+def parquet_disponivel() -> bool:
+    """True se o pandas tem uma engine Parquet (pyarrow ou fastparquet)."""
+    for modulo in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(modulo)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+class ArquivoLog:
+    """Partições mensais de um log arquivado."""
+
+    def __init__(self, diretorio: str, nome: str, formato: Optional[str] = None):
+        """
+        Args:
+            diretorio: Diretório base do arquivo (LOG_ARCHIVE_DIR)
+            nome: Subdiretório deste log
+            formato: 'parquet', 'csv' ou 'auto' (padrão em LOG_ARCHIVE_FORMAT)
+        """
+        self.diretorio = Path(diretorio) / nome
+        self._formato_pedido = (formato or os.getenv('LOG_ARCHIVE_FORMAT', 'auto')).strip().lower()
+        self._formato: Optional[str] = None
+        self._lock = threading.Lock()
+        self._manifesto_cache: Optional[tuple] = None
+
+    @property
+    def formato(self) -> str:
+        """'parquet' ou 'csv' (resolvido na primeira gravação: a engine Parquet é pesada de importar)."""
+        if self._formato is None:
+            formato = self._formato_pedido
+            if formato in ('auto', 'parquet'):
+                if parquet_disponivel():
+                    formato = 'parquet'
+                else:
+                    if formato == 'parquet':
+                        logger.warning("Engine Parquet não instalada; arquivando em CSV.gz")
+                    formato = 'csv'
+            self._formato = formato
+        return self._formato
+
+    def _caminho(self, arquivo: str) -> Path:
+        return self.diretorio / arquivo
+
+    def manifesto(self) -> dict:
+        """Manifesto atual ({'headers': [...], 'meses': {mes: {'arquivo', 'linhas'}}})."""
+        caminho = self._caminho(MANIFESTO)
+        try:
+            mtime = caminho.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {'headers': [], 'meses': {}}
+        if self._manifesto_cache and self._manifesto_cache[0] == mtime:
+            return self._manifesto_cache[1]
+        with open(caminho, encoding='utf-8') as f:
+            manifesto = json.load(f)
+        self._manifesto_cache = (mtime, manifesto)
+        return manifesto
+
+    @property
+    def total(self) -> int:
+        """Quantidade de linhas arquivadas (pelo manifesto)."""
+        return sum(int(p.get('linhas', 0)) for p in self.manifesto().get('meses', {}).values())
+
+    @property
+    def versao(self) -> str:
+        """Muda sempre que alguma partição muda."""
+        conteudo = json.dumps(self.manifesto().get('meses', {}), sort_keys=True)
+        return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()[:12]
+
+    def meses(self) -> List[str]:
+        """Meses arquivados (AAAA-MM), em ordem."""
+        return sorted(self.manifesto().get('meses', {}))
+
+    def _ler_arquivo(self, arquivo: str) -> pd.DataFrame:
+        import pandas as pd
+
+        caminho = self._caminho(arquivo)
+        if arquivo.endswith('.parquet'):
+            return pd.read_parquet(caminho).astype(str)
+        return pd.read_csv(caminho, dtype=str, keep_default_na=False, compression='gzip')
+
+    def _gravar_arquivo(self, df: pd.DataFrame, arquivo: str) -> None:
+        caminho = self._caminho(arquivo)
+        temporario = caminho.with_name(caminho.name + '.tmp')
+        if arquivo.endswith('.parquet'):
+            df.to_parquet(temporario, index=False)
+        else:
+            df.to_csv(temporario, index=False, compression='gzip')
+        os.replace(temporario, caminho)
+
+    def gravar(self, headers: Sequence[str], linhas_por_mes: Dict[str, List[List[str]]]) -> None:
+        """Acrescenta linhas às partições dos meses informados (criando as que faltam)."""
+        import pandas as pd
+
+        with self._lock:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            manifesto = json.loads(json.dumps(self.manifesto()))
+            headers = list(manifesto.get('headers') or headers)
+            for mes, linhas in sorted(linhas_por_mes.items()):
+                novas = pd.DataFrame([list(l)[:len(headers)] for l in linhas], columns=headers, dtype=str)
+                particao = manifesto['meses'].get(mes)
+                if particao:
+                    df = pd.concat([self._ler_arquivo(particao['arquivo']), novas], ignore_index=True)
+                else:
+                    particao = {'arquivo': f"{mes}.parquet" if self.formato == 'parquet' else f"{mes}.csv.gz"}
+                    df = novas
+                self._gravar_arquivo(df, particao['arquivo'])
+                particao['linhas'] = len(df)
+                manifesto['meses'][mes] = particao
+            manifesto['headers'] = headers
+
+            caminho = self._caminho(MANIFESTO)
+            temporario = caminho.with_name(caminho.name + '.tmp')
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(manifesto, f, ensure_ascii=False, indent=2)
+            os.replace(temporario, caminho)
+
+    def ler(self, desde_mes: Optional[str] = None) -> pd.DataFrame:
+        """Linhas arquivadas (todas as colunas como texto), em ordem de arquivamento."""
+        import pandas as pd
+
+        manifesto = self.manifesto()
+        partes = [
+            self._ler_arquivo(manifesto['meses'][mes]['arquivo'])
+            for mes in self.meses() if desde_mes is None or mes >= desde_mes
+        ]
+        if not partes:
+            return pd.DataFrame(columns=manifesto.get('headers') or [], dtype=str)
+        return pd.concat(partes, ignore_index=True)
+
+
+def _data(valor: str, formatos: Sequence[str]) -> Optional[datetime]:
+    valor = str(valor or '').strip()
+    for formato in formatos:
+        try:
+            return datetime.strptime(valor, formato)
+        except ValueError:
+            continue
+    return None
+
+
+def arquivar_aba(worksheet, arquivo: ArquivoLog, coluna_data: str, formatos: Sequence[str],
+                 horizonte_dias: int, agora: Optional[datetime] = None) -> int:
+    """
+    Move para o arquivo as linhas do início da aba mais antigas que o horizonte.
+
+    Só o bloco contínuo de linhas antigas logo abaixo do cabeçalho é movido
+    (a aba é um log em ordem de chegada); a primeira linha recente ou com
+    data ilegível encerra o bloco. Antes de apagar, o bloco é relido para
+    confirmar que não mudou.
+
+    Returns:
+        Quantidade de linhas arquivadas
+    """
+    data = worksheet.get_all_values()
+    if len(data) < 2:
+        return 0
+    headers = [str(h or '').strip() for h in data[0]]
+    nome_coluna = encontrar_coluna(headers, coluna_data)
+    if nome_coluna is None:
+        raise ValueError(f"Coluna '{coluna_data}' não encontrada em '{getattr(worksheet, 'title', '')}'")
+    idx = headers.index(nome_coluna)
+    limite = (agora or datetime.now()) - timedelta(days=max(0, int(horizonte_dias)))
+
+    def completar(linha):
+        linha = [str(v) for v in linha][:len(headers)]
+        return linha + [''] * (len(headers) - len(linha))
+
+    por_mes: Dict[str, List[List[str]]] = {}
+    bloco = 0  # linhas do bloco até a última arquivada (inclui vazias no meio)
+    for numero, linha in enumerate(data[1:], start=1):
+        linha = completar(linha)
+        if not any(v.strip() for v in linha):
+            continue
+        quando = _data(linha[idx], formatos)
+        if quando is None or quando >= limite:
+            break
+        por_mes.setdefault(quando.strftime('%Y-%m'), []).append(linha)
+        bloco = numero
+    if not bloco:
+        return 0
+
+    ultima_coluna = re.sub(r'\d', '', rowcol_to_a1(1, len(headers)))
+    atual = worksheet.get_values(f'A2:{ultima_coluna}{bloco + 1}')
+    atual = [completar(l) for l in atual] + [[''] * len(headers)] * (bloco - len(atual))
+    if atual != [completar(l) for l in data[1:bloco + 1]]:
+        logger.warning(f"Aba '{getattr(worksheet, 'title', '')}' mudou durante o arquivamento; nada foi movido")
+        return 0
+
+    arquivo.gravar(headers, por_mes)
+    worksheet.delete_rows(2, bloco + 1)
+    quantidade = sum(len(linhas) for linhas in por_mes.values())
+    logger.info(f"{quantidade} linha(s) de '{getattr(worksheet, 'title', '')}' arquivadas em {arquivo.diretorio}")
+    return quantidade
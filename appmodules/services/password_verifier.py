@@ -0,0 +1,177 @@
+"""
+Verificação de senhas com custo limitado.
+
+O hash de senha (pbkdf2/scrypt) é caro por design. Em picos de login
+(troca de turno) a verificação roda em um pool de threads de tamanho fixo
+com fila limitada: quando a fila enche, o login é recusado imediatamente
+(HTTP 429) em vez de ocupar os workers do gunicorn. O limite é por
+processo: o gunicorn roda com workers gthread (ver Procfile) para que logins
+simultâneos cheguem ao mesmo pool. Verificações bem sucedidas ficam em cache
+por alguns minutos e hashes com algoritmo/custo antigos são refeitos em
+background após um login válido.
+"""
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Optional
+
+from appmodules.models import Usuario
+
+logger = logging.getLogger(__name__)
+
+
+class VerificadorSaturadoError(Exception):
+    """Fila de verificação de senhas cheia; o cliente deve tentar novamente."""
+
+
+class PasswordVerifier:
+    """Pool limitado para verificação de senhas, com cache de resultados e rehash."""
+
+    def __init__(self, max_workers: int = 0, max_fila: int = 0, timeout_seconds: float = 10.0,
+                 cache_ttl_seconds: int = 300, cache_max_entries: int = 1000, user_service=None):
+        """
+        Args:
+            max_workers: Threads de hash (0 = número de CPUs)
+            max_fila: Verificações aguardando além das em execução (0 = 4x workers)
+            timeout_seconds: Tempo máximo de espera por uma verificação
+            cache_ttl_seconds: Validade de uma verificação bem sucedida (0 desativa)
+            cache_max_entries: Tamanho máximo do cache de verificações
+            user_service: UserService usado para gravar o rehash
+        """
+        self.max_workers = max(1, int(max_workers) or (os.cpu_count() or 1))
+        self.max_fila = max(0, int(max_fila)) or self.max_workers * 4
+        self.timeout_seconds = max(0.1, float(timeout_seconds))
+        self.cache_ttl_seconds = max(0, int(cache_ttl_seconds))
+        self.cache_max_entries = max(1, int(cache_max_entries))
+        self.user_service = user_service
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='verificacao-senha')
+        self._lock = threading.Lock()
+        self._em_andamento = 0
+        # Chave aleatória por processo: o cache nunca guarda a senha nem um hash reutilizável fora dele
+        self._chave_cache = secrets.token_bytes(32)
+        self._cache: 'OrderedDict[bytes, float]' = OrderedDict()
+        self._rehash_pendentes = set()
+
+    @classmethod
+    def from_env(cls, user_service=None) -> 'PasswordVerifier':
+        """Cria o verificador a partir das variáveis LOGIN_VERIFY_*."""
+        return cls(
+            max_workers=int(os.getenv('LOGIN_VERIFY_WORKERS', '0')),
+            max_fila=int(os.getenv('LOGIN_VERIFY_MAX_QUEUE', '0')),
+            timeout_seconds=float(os.getenv('LOGIN_VERIFY_TIMEOUT_SECONDS', '10')),
+            cache_ttl_seconds=int(os.getenv('LOGIN_VERIFY_CACHE_TTL_SECONDS', '300')),
+            cache_max_entries=int(os.getenv('LOGIN_VERIFY_CACHE_MAX_ENTRIES', '1000')),
+            user_service=user_service,
+        )
+
+    @property
+    def capacidade(self) -> int:
+        """Total de verificações aceitas simultaneamente (em execução + fila)."""
+        return self.max_workers + self.max_fila
+
+    def _reservar(self) -> bool:
+        """Reserva uma vaga no pool; False se saturado."""
+        with self._lock:
+            if self._em_andamento >= self.capacidade:
+                return False
+            self._em_andamento += 1
+            return True
+
+    def _liberar(self, _future=None) -> None:
+        with self._lock:
+            self._em_andamento -= 1
+
+    def _chave(self, usuario: Usuario, senha: str) -> bytes:
+        # Inclui o hash atual: troca de senha invalida o cache automaticamente
+        mensagem = f"{usuario.senha_hash}\0{senha}".encode('utf-8')
+        return hmac.new(self._chave_cache, mensagem, hashlib.sha256).digest()
+
+    def _cache_valido(self, chave: bytes) -> bool:
+        if not self.cache_ttl_seconds:
+            return False
+        with self._lock:
+            expira_em = self._cache.get(chave)
+            if expira_em is None:
+                return False
+            if expira_em < time.monotonic():
+                del self._cache[chave]
+                return False
+            self._cache.move_to_end(chave)
+            return True
+
+    def _cache_registrar(self, chave: bytes) -> None:
+        if not self.cache_ttl_seconds:
+            return
+        with self._lock:
+            self._cache[chave] = time.monotonic() + self.cache_ttl_seconds
+            self._cache.move_to_end(chave)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def verificar(self, usuario: Usuario, senha: str) -> bool:
+        """
+        Verifica a senha do usuário.
+
+        Raises:
+            VerificadorSaturadoError: fila cheia ou verificação não concluída a tempo
+        """
+        if not senha:
+            return False
+        if usuario.migracao_pendente:
+            # Comparação direta (barata) até a migração em background concluir
+            return usuario.verificar_senha(senha)
+
+        chave = self._chave(usuario, senha)
+        if self._cache_valido(chave):
+            return True
+
+        if not self._reservar():
+            raise VerificadorSaturadoError("Fila de verificação de senhas cheia")
+        future = self._executor.submit(usuario.verificar_senha, senha)
+        future.add_done_callback(self._liberar)
+        try:
+            valida = future.result(timeout=self.timeout_seconds)
+        except FuturesTimeoutError:
+            raise VerificadorSaturadoError("Verificação de senha excedeu o tempo limite")
+
+        if valida:
+            self._cache_registrar(self._chave(usuario, senha))
+            self.agendar_rehash(usuario, senha)
+        return valida
+
+    def agendar_rehash(self, usuario: Usuario, senha: str) -> bool:
+        """Refaz o hash com o algoritmo/custo configurado, em background (melhor esforço)."""
+        if not self.user_service or not usuario.precisa_rehash():
+            return False
+        with self._lock:
+            if usuario.username in self._rehash_pendentes:
+                return False
+            self._rehash_pendentes.add(usuario.username)
+        if not self._reservar():
+            # Pool ocupado com logins: tenta de novo no próximo login
+            with self._lock:
+                self._rehash_pendentes.discard(usuario.username)
+            return False
+        future = self._executor.submit(self._rehash, usuario.username, senha)
+        future.add_done_callback(self._liberar)
+        return True
+
+    def _rehash(self, username: str, senha: str) -> None:
+        try:
+            if self.user_service.atualizar_usuario(username, senha=senha):
+                logger.info(f"Hash de senha do usuário {username} atualizado para o método configurado")
+            else:
+                logger.warning(f"Falha ao atualizar hash de senha do usuário {username}")
+        except Exception as e:
+            logger.error(f"Erro ao atualizar hash de senha: {e}")
+        finally:
+            with self._lock:
+                self._rehash_pendentes.discard(username)
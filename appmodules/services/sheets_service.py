@@ -1,21 +1,62 @@
-"""Serviço para gerenciar Google Sheets."""
+"""
+Serviço para gerenciar Google Sheets.
+
+pandas (e os registros tipados do Controle de Horário) só é importado quando
+os registros de horário são lidos pela primeira vez.
+"""
+
+from __future__ import annotations
 
 import gspread
 import logging
 import datetime
 import json
 import os
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Tuple
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple
 from google.oauth2.service_account import Credentials
+from gspread.utils import rowcol_to_a1
+
+from appmodules.services.log_archive import ArquivoLog, arquivar_aba
+from appmodules.utils.text import limpar_cabecalhos
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from appmodules.services.time_records import RegistrosHorario
 
 logger = logging.getLogger(__name__)
 
 
+class _AposConexao:
+    """
+    Atributo preenchido pela conexão com a planilha: lido antes do fim da
+    conexão em segundo plano, espera por ela (exceto nas threads da própria
+    conexão).
+    """
+
+    def __set_name__(self, owner, nome):
+        self.nome = '_' + nome
+
+    def __get__(self, obj, tipo=None):
+        if obj is None:
+            return self
+        if not obj._pronto.is_set() and not getattr(obj._local, 'conectando', False):
+            obj.aguardar_conexao()
+        return obj.__dict__.get(self.nome)
+
+    def __set__(self, obj, valor):
+        obj.__dict__[self.nome] = valor
+
+
 class SheetsService:
     """Gerencia conexão e operações com Google Sheets."""
     WHATSAPP_HEADER = 'WhatsApp do solicitante'
+    USUARIO_TOMBSTONE = '#removido'
     PRODUCAO_HEADERS = [
         'ID',
         'Carimbo de data/hora',
@@ -36,9 +77,28 @@ class SheetsService:
         'https://www.googleapis.com/auth/drive.file'
     ]
     
+    # Preenchidos pela conexão; a leitura espera a conexão em segundo plano terminar
+    client = _AposConexao()
+    sheet = _AposConexao()
+    sheet_horario = _AposConexao()
+    sheet_usuarios = _AposConexao()
+    sheet_producao = _AposConexao()
+    
     def __init__(self, creds_file: str, sheet_id: str, sheet_tab: str, 
-                 horario_tab: str, usuarios_tab: str, producao_tab: str):
-        """Inicializa o serviço de Sheets."""
+                 horario_tab: str, usuarios_tab: str, producao_tab: str,
+                 arquivo_horario: Optional[ArquivoLog] = None, em_segundo_plano: bool = False):
+        """
+        Inicializa o serviço de Sheets.
+
+        Args:
+            arquivo_horario: Linhas antigas do Controle de Horário (opcional)
+            em_segundo_plano: Conecta em uma thread e retorna na hora; quem
+                usar as abas antes do fim espera a conexão (ver `aguardar_conexao`)
+        """
+        self._pronto = threading.Event()
+        self._local = threading.local()
+        self._init_timeout_seconds = max(1.0, float(os.getenv('SHEETS_INIT_TIMEOUT_SECONDS', '30')))
+        self._init_workers = max(1, int(os.getenv('SHEETS_INIT_WORKERS', '4')))
         self.sheet_id = sheet_id
         self.sheet_tab = sheet_tab
         self.horario_tab = horario_tab
@@ -52,16 +112,42 @@ class SheetsService:
         self.error = None
         self.usuarios_error = None
         self._os_cache: List[dict] = []
+        # Índice ID da OS -> OS, reconstruído junto com o cache
+        self._os_index: Dict[str, dict] = {}
         self._os_cache_expires_at = 0.0
         self._os_cache_ttl_seconds = max(5, int(os.getenv('OS_CACHE_TTL_SECONDS', '120')))
         self._producao_cache: List[dict] = []
         self._producao_cache_expires_at = 0.0
         self._producao_cache_ttl_seconds = max(5, int(os.getenv('PRODUCAO_CACHE_TTL_SECONDS', '30')))
+        # Controle de Horário: cache tipado com sincronização incremental (só linhas novas)
+        self._horario: Optional[RegistrosHorario] = None
+        self._horario_versao = 0
+        self._horario_lock = threading.Lock()
+        self._horario_expires_at = 0.0
+        self._horario_full_refresh_at = 0.0
+        self._horario_cache_ttl_seconds = max(1, int(os.getenv('HORARIO_CACHE_TTL_SECONDS', '30')))
+        self._horario_full_refresh_seconds = max(
+            self._horario_cache_ttl_seconds, int(os.getenv('HORARIO_FULL_REFRESH_SECONDS', '900'))
+        )
+        self.arquivo_horario = arquivo_horario
+        # (versão do arquivo, mês inicial) -> registros arquivados tipados
+        self._horario_arquivado: Optional[Tuple[Tuple[str, str], RegistrosHorario]] = None
         
-        self._init_connection(creds_file)
+        if em_segundo_plano:
+            threading.Thread(
+                target=self._init_connection, args=(creds_file,), name='sheets-conexao', daemon=True,
+            ).start()
+        else:
+            self._init_connection(creds_file)
     
     def _init_connection(self, creds_file: str) -> None:
-        """Inicializa conexão com Google Sheets."""
+        """
+        Inicializa conexão com Google Sheets.
+
+        Depois de autorizar e abrir a planilha, as abas são abertas (ou
+        criadas) em paralelo, cada uma em uma thread do pool.
+        """
+        self._local.conectando = True
         try:
             self._validate_credentials_file(creds_file)
             creds = Credentials.from_service_account_file(creds_file, scopes=self.SCOPES)
@@ -69,61 +155,16 @@ class SheetsService:
             
             self.client = gspread.authorize(creds)
             spreadsheet = self.client.open_by_key(self.sheet_id)
-            
-            # Conecta à aba principal
-            try:
-                self.sheet = spreadsheet.worksheet(self.sheet_tab)
-                logger.info(f"Conectado à aba '{self.sheet_tab}'")
-            except Exception:
-                self.sheet = spreadsheet.add_worksheet(title=self.sheet_tab, rows=2000, cols=20)
-                self.sheet.append_row([
-                    'ID', 'Carimbo de data/hora', 'Nome do solicitante', 'Setor',
-                    'Data da Solicitação', 'Descrição', 'Equipamento/Local', 'Prioridade',
-                    'Status da OS', 'Informações adicionais', 'Serviço realizado',
-                    'Horario de Inicio', 'Horario de Andamento', 'Horario de Término', 'Horas trabalhadas',
-                    self.WHATSAPP_HEADER
-                ])
-                logger.info(f"Aba '{self.sheet_tab}' criada com cabeçalho")
-
-            self._ensure_whatsapp_column()
-            
-            # Conecta à aba de horário
-            try:
-                self.sheet_horario = spreadsheet.worksheet(self.horario_tab)
-                logger.info(f"Conectado à aba '{self.horario_tab}'")
-            except Exception:
-                self.sheet_horario = spreadsheet.add_worksheet(title=self.horario_tab, rows=1000, cols=10)
-                self.sheet_horario.append_row(['Data', 'Funcionário', 'Pedido/OS', 'Tipo', 'Horário', 'Observação'])
-                logger.info(f"Aba '{self.horario_tab}' criada")
-            
-            # Conecta à aba de usuários
-            try:
-                self.sheet_usuarios = spreadsheet.worksheet(self.usuarios_tab)
-                logger.info(f"Conectado à aba '{self.usuarios_tab}'")
-            except Exception:
-                try:
-                    self.sheet_usuarios = spreadsheet.add_worksheet(title=self.usuarios_tab, rows=1000, cols=10)
-                    self.sheet_usuarios.append_row(['Username', 'Senha', 'Role', 'Data de Cadastro'])
-                    logger.info(f"Aba '{self.usuarios_tab}' criada")
-                except Exception as e:
-                    self.sheet_usuarios = None
-                    self.usuarios_error = str(e)
-                    logger.warning(f"Não foi possível inicializar a aba '{self.usuarios_tab}': {e}")
-
-                # Conecta à aba de produção
-                try:
-                    self.sheet_producao = spreadsheet.worksheet(self.producao_tab)
-                    logger.info(f"Conectado à aba '{self.producao_tab}'")
-                except Exception:
-                    try:
-                        self.sheet_producao = spreadsheet.add_worksheet(title=self.producao_tab, rows=2000, cols=20)
-                        self.sheet_producao.append_row(self.PRODUCAO_HEADERS)
-                        logger.info(f"Aba '{self.producao_tab}' criada com cabeçalho")
-                    except Exception as e:
-                        self.sheet_producao = None
-                        logger.warning(f"Não foi possível inicializar a aba '{self.producao_tab}': {e}")
-                else:
-                    self._ensure_producao_headers()
+
+            handshakes = (
+                self._conectar_aba_principal, self._conectar_aba_horario,
+                self._conectar_aba_usuarios, self._conectar_aba_producao,
+            )
+            with ThreadPoolExecutor(max_workers=self._init_workers, thread_name_prefix='sheets-init') as pool:
+                futuros = [pool.submit(self._em_conexao, handshake, spreadsheet) for handshake in handshakes]
+                # Falha na aba principal ou na de horário vira erro do serviço
+                for futuro in futuros:
+                    futuro.result()
         
         except FileNotFoundError:
             logger.error("Arquivo 'credentials.json' não encontrado")
@@ -134,6 +175,81 @@ class SheetsService:
         except Exception as e:
             logger.error(f"Erro ao conectar à planilha: {e}")
             self.error = str(e)
+        finally:
+            self._local.conectando = False
+            self._pronto.set()
+
+    def _em_conexao(self, handshake, spreadsheet) -> None:
+        """Executa um handshake em thread do pool (sem esperar pela própria conexão)."""
+        self._local.conectando = True
+        try:
+            handshake(spreadsheet)
+        finally:
+            self._local.conectando = False
+
+    def _conectar_aba_principal(self, spreadsheet) -> None:
+        try:
+            self.sheet = spreadsheet.worksheet(self.sheet_tab)
+            logger.info(f"Conectado à aba '{self.sheet_tab}'")
+        except Exception:
+            self.sheet = spreadsheet.add_worksheet(title=self.sheet_tab, rows=2000, cols=20)
+            self.sheet.append_row([
+                'ID', 'Carimbo de data/hora', 'Nome do solicitante', 'Setor',
+                'Data da Solicitação', 'Descrição', 'Equipamento/Local', 'Prioridade',
+                'Status da OS', 'Informações adicionais', 'Serviço realizado',
+                'Horario de Inicio', 'Horario de Andamento', 'Horario de Término', 'Horas trabalhadas',
+                self.WHATSAPP_HEADER
+            ])
+            logger.info(f"Aba '{self.sheet_tab}' criada com cabeçalho")
+
+        self._ensure_whatsapp_column()
+
+    def _conectar_aba_horario(self, spreadsheet) -> None:
+        try:
+            self.sheet_horario = spreadsheet.worksheet(self.horario_tab)
+            logger.info(f"Conectado à aba '{self.horario_tab}'")
+        except Exception:
+            self.sheet_horario = spreadsheet.add_worksheet(title=self.horario_tab, rows=1000, cols=10)
+            self.sheet_horario.append_row(['Data', 'Funcionário', 'Pedido/OS', 'Tipo', 'Horário', 'Observação'])
+            logger.info(f"Aba '{self.horario_tab}' criada")
+
+    def _conectar_aba_usuarios(self, spreadsheet) -> None:
+        try:
+            self.sheet_usuarios = spreadsheet.worksheet(self.usuarios_tab)
+            logger.info(f"Conectado à aba '{self.usuarios_tab}'")
+        except Exception:
+            try:
+                self.sheet_usuarios = spreadsheet.add_worksheet(title=self.usuarios_tab, rows=1000, cols=10)
+                self.sheet_usuarios.append_row(['Username', 'Senha', 'Role', 'Data de Cadastro'])
+                logger.info(f"Aba '{self.usuarios_tab}' criada")
+            except Exception as e:
+                self.sheet_usuarios = None
+                self.usuarios_error = str(e)
+                logger.warning(f"Não foi possível inicializar a aba '{self.usuarios_tab}': {e}")
+
+    def _conectar_aba_producao(self, spreadsheet) -> None:
+        try:
+            self.sheet_producao = spreadsheet.worksheet(self.producao_tab)
+            logger.info(f"Conectado à aba '{self.producao_tab}'")
+        except Exception:
+            try:
+                self.sheet_producao = spreadsheet.add_worksheet(title=self.producao_tab, rows=2000, cols=20)
+                self.sheet_producao.append_row(self.PRODUCAO_HEADERS)
+                logger.info(f"Aba '{self.producao_tab}' criada com cabeçalho")
+            except Exception as e:
+                self.sheet_producao = None
+                logger.warning(f"Não foi possível inicializar a aba '{self.producao_tab}': {e}")
+        else:
+            self._ensure_producao_headers()
+
+    @property
+    def pronto(self) -> bool:
+        """True quando a conexão terminou (com sucesso ou erro); não bloqueia."""
+        return self._pronto.is_set()
+
+    def aguardar_conexao(self, timeout: Optional[float] = None) -> bool:
+        """Espera a conexão em segundo plano terminar (até SHEETS_INIT_TIMEOUT_SECONDS)."""
+        return self._pronto.wait(self._init_timeout_seconds if timeout is None else timeout)
 
     def _validate_credentials_file(self, creds_file: str) -> None:
         """Valida formato mínimo do credentials.json antes de autenticar."""
@@ -174,7 +290,9 @@ class SheetsService:
             )
     
     def is_available(self) -> Tuple[bool, Optional[str]]:
-        """Verifica se a conexão está disponível."""
+        """Verifica se a conexão está disponível (esperando a inicialização, se preciso)."""
+        if not self.aguardar_conexao():
+            return False, "Conexão com o Google Sheets ainda em andamento"
         if self.sheet is None:
             return False, self.error or "Sheets não disponível"
         return True, None
@@ -216,6 +334,7 @@ class SheetsService:
     def _invalidate_os_cache(self) -> None:
         """Invalida cache local de OS após qualquer mutação."""
         self._os_cache = []
+        self._os_index = {}
         self._os_cache_expires_at = 0.0
 
     def _invalidate_producao_cache(self) -> None:
@@ -226,13 +345,7 @@ class SheetsService:
     @staticmethod
     def _normalize_headers(headers: List[Any]) -> List[str]:
         """Normaliza cabeçalhos da planilha mantendo compatibilidade com legado."""
-        normalized_headers = []
-        for idx, header in enumerate(headers):
-            header_text = str(header or '').strip()
-            if idx == 0 and header_text in ('', '/'):
-                header_text = 'ID'
-            normalized_headers.append(header_text)
-        return normalized_headers
+        return limpar_cabecalhos(headers)
 
     def _build_os_list_from_values(self, data: List[List[str]]) -> List[dict]:
         """Converte matriz da planilha em lista de dicionários de OS."""
@@ -346,13 +459,7 @@ class SheetsService:
     @staticmethod
     def _normalize_producao_headers(headers: List[Any]) -> List[str]:
         """Normaliza cabeçalhos da aba de produção."""
-        normalized = []
-        for idx, header in enumerate(headers):
-            header_text = str(header or '').strip()
-            if idx == 0 and header_text in ('', '/'):
-                header_text = 'ID'
-            normalized.append(header_text)
-        return normalized
+        return limpar_cabecalhos(headers)
 
     def _build_producao_list_from_values(self, data: List[List[str]]) -> List[dict]:
         """Converte matriz da planilha em lista de itens de produção."""
@@ -493,12 +600,21 @@ class SheetsService:
             data = self.sheet.get_all_values()
             os_list = self._build_os_list_from_values(data)
             self._os_cache = os_list
+            self._os_index = {
+                str(os_item.get('ID', '')).strip(): os_item
+                for os_item in os_list if str(os_item.get('ID', '')).strip()
+            }
             self._os_cache_expires_at = now + self._os_cache_ttl_seconds
             return os_list
         except Exception as e:
             logger.error(f"Erro ao obter OS: {e}")
             return []
 
+    def get_os_indexada(self, os_id: str) -> Optional[dict]:
+        """Busca uma OS (não cancelada) pelo ID no índice em memória."""
+        self.get_all_os(use_cache=True)
+        return self._os_index.get(str(os_id or '').strip())
+
     def get_open_os(self, use_cache: bool = True) -> List[dict]:
         """Obtém somente OS em aberto ou em andamento."""
         status_validos = {'aberto', 'em andamento'}
@@ -549,14 +665,14 @@ class SheetsService:
             if not self.sheet:
                 return None
 
-            for os_item in self.get_all_os(use_cache=True):
-                if str(os_item.get('ID', '')).strip() == str(os_id).strip():
-                    return {
-                        'id': os_item.get('ID', ''),
-                        'timestamp': os_item.get('Carimbo de data/hora', ''),
-                        'status': os_item.get('Status da OS', ''),
-                        'descricao': os_item.get('Descrição', '') or os_item.get('Descrição do Problema ou Serviço Solicitado', '')
-                    }
+            os_item = self.get_os_indexada(os_id)
+            if os_item:
+                return {
+                    'id': os_item.get('ID', ''),
+                    'timestamp': os_item.get('Carimbo de data/hora', ''),
+                    'status': os_item.get('Status da OS', ''),
+                    'descricao': os_item.get('Descrição', '') or os_item.get('Descrição do Problema ou Serviço Solicitado', '')
+                }
             
             cell = self.sheet.find(str(os_id), in_column=1)
             if cell:
@@ -580,36 +696,158 @@ class SheetsService:
                 return False
             
             self.sheet_horario.append_row([data, funcionario, pedido_os, tipo, horario, observacao])
+            # A próxima leitura busca só as linhas novas
+            self._horario_expires_at = 0.0
             logger.info(f"Registro de {tipo} adicionado para {funcionario}")
             return True
         except Exception as e:
             logger.error(f"Erro ao adicionar registro de horário: {e}")
             return False
-    
-    def get_time_records(self) -> List[dict]:
+
+    @property
+    def time_records_versao(self) -> int:
+        """Versão dos registros de horário (muda a cada alteração detectada)."""
+        return self._horario_versao
+
+    def _mes_arquivado(self, desde) -> Optional[str]:
+        """Mês (AAAA-MM) a partir do qual o arquivo entra na consulta, ou None se não entra."""
+        if desde is None or self.arquivo_horario is None:
+            return None
+        meses = self.arquivo_horario.meses()
+        mes = desde.strftime('%Y-%m')
+        return mes if meses and mes <= meses[-1] else None
+
+    def time_records_versao_desde(self, desde=None) -> str:
+        """Versão de `get_time_records_df(desde=...)`: inclui o arquivo quando ele entra na consulta."""
+        mes = self._mes_arquivado(desde)
+        if mes is None:
+            return str(self._horario_versao)
+        return f"{self._horario_versao}-{self.arquivo_horario.versao}-{mes}"
+
+    def _time_records_arquivados(self, mes: str) -> Optional[RegistrosHorario]:
+        """Registros arquivados a partir de `mes`, tipados (cache por versão do arquivo)."""
+        from appmodules.services.time_records import RegistrosHorario
+
+        chave = (self.arquivo_horario.versao, mes)
+        if self._horario_arquivado is None or self._horario_arquivado[0] != chave:
+            df = self.arquivo_horario.ler(mes)
+            registros = RegistrosHorario.de_valores([list(df.columns)] + df.values.tolist())
+            self._horario_arquivado = (chave, registros)
+        return self._horario_arquivado[1]
+
+    def arquivar_time_records(self, horizonte_dias: int) -> int:
+        """
+        Move para o arquivo local os registros de horário mais antigos que
+        `horizonte_dias` (ver `log_archive.arquivar_aba`).
+
+        Returns:
+            Quantidade de registros arquivados (0 sem arquivo configurado)
+        """
+        if not self.sheet_horario or self.arquivo_horario is None:
+            return 0
+        with self._horario_lock:
+            quantidade = arquivar_aba(
+                self.sheet_horario, self.arquivo_horario, 'Data', ('%d/%m/%Y',), horizonte_dias)
+            if quantidade:
+                self._horario_full_refresh_at = 0.0
+                self._horario_expires_at = 0.0
+        return quantidade
+
+    def _carregar_horario_completo(self) -> None:
+        """Relê a aba inteira; só muda a versão se o conteúdo mudou."""
+        from appmodules.services.time_records import RegistrosHorario
+
+        data = self.sheet_horario.get_all_values()
+        anterior = self._horario
+        self._horario = RegistrosHorario.de_valores(data)
+        self._horario_full_refresh_at = time.time() + self._horario_full_refresh_seconds
+        if (anterior is None or self._horario is None
+                or anterior.headers != self._horario.headers
+                or anterior.linhas_brutas != self._horario.linhas_brutas):
+            self._horario_versao += 1
+
+    def _sincronizar_horario(self, force_refresh: bool = False) -> Optional[RegistrosHorario]:
+        """
+        Atualiza o cache do Controle de Horário.
+
+        Dentro do TTL não acessa a planilha. Depois dele, lê apenas a partir
+        da última linha conhecida: se essa linha mudou (edição ou remoção),
+        relê a aba inteira; senão anexa as linhas novas. Uma releitura
+        completa também acontece a cada HORARIO_FULL_REFRESH_SECONDS.
+        """
+        with self._horario_lock:
+            now = time.time()
+            if not force_refresh and self._horario is not None and now < self._horario_expires_at:
+                return self._horario
+
+            if force_refresh or self._horario is None or now >= self._horario_full_refresh_at:
+                self._carregar_horario_completo()
+            else:
+                ultima = self._horario.ultima_linha
+                ultima_coluna = re.sub(r'\d', '', rowcol_to_a1(1, max(1, len(self._horario.headers))))
+                valores = self.sheet_horario.get_values(f'A{ultima}:{ultima_coluna}')
+                if not valores or not self._horario.confere_ultima_linha(valores[0]):
+                    self._carregar_horario_completo()
+                elif self._horario.anexar(valores[1:]):
+                    self._horario_versao += 1
+
+            self._horario_expires_at = now + self._horario_cache_ttl_seconds
+            return self._horario
+
+    def get_time_records(self, use_cache: bool = True, force_refresh: bool = False) -> List[dict]:
         """Obtém todos os registros de controle de horário."""
         try:
             if not self.sheet_horario:
                 return []
-            
-            data = self.sheet_horario.get_all_values()
-            if len(data) < 2:
-                return []
-            
-            headers = data[0]
-            records = []
-            
-            for row in data[1:]:
-                if not any(row):
-                    continue
-                
-                full_row = row + [''] * (len(headers) - len(row))
-                records.append(dict(zip(headers, full_row)))
-            
-            return records
+
+            if not use_cache:
+                force_refresh = True
+            registros = self._sincronizar_horario(force_refresh)
+            return list(registros.registros) if registros else []
         except Exception as e:
             logger.error(f"Erro ao obter registros de horário: {e}")
             return []
+
+    def get_time_records_df(self, force_refresh: bool = False, desde=None) -> pd.DataFrame:
+        """
+        Registros de horário tipados (`Data`/`Horário` datetimes, `Tipo` categórico).
+
+        Com `desde` (data), inclui antes dos registros da aba os arquivados a
+        partir do mês dessa data; sem ela, só a aba (a janela recente).
+        """
+        import pandas as pd
+
+        from appmodules.services.time_records import RegistrosHorario
+
+        try:
+            if self.sheet_horario:
+                registros = self._sincronizar_horario(force_refresh)
+                mes = self._mes_arquivado(desde)
+                if mes is not None:
+                    arquivados = self._time_records_arquivados(mes)
+                    partes = [r.df for r in (arquivados, registros) if r is not None and not r.df.empty]
+                    if len(partes) > 1:
+                        df = pd.concat(partes, ignore_index=True)
+                        if 'Tipo' in df:
+                            df['Tipo'] = df['Tipo'].astype(str).replace('nan', '').astype('category')
+                        return df
+                    if partes:
+                        return partes[0]
+                if registros:
+                    return registros.df
+        except Exception as e:
+            logger.error(f"Erro ao obter registros de horário: {e}")
+        return RegistrosHorario(['Data', 'Funcionário', 'Pedido/OS', 'Tipo', 'Horário', 'Observação']).df
+
+    def get_time_records_por_funcionario(self, funcionario: str) -> pd.DataFrame:
+        """Registros de um funcionário, pelo índice (sem varrer a aba)."""
+        df = self.get_time_records_df()
+        return self._horario.por_funcionario(funcionario) if self._horario is not None else df
+
+    def get_time_records_por_os(self, pedido_os: str) -> pd.DataFrame:
+        """Registros de uma OS, pelo índice (sem varrer a aba)."""
+        df = self.get_time_records_df()
+        return self._horario.por_os(pedido_os) if self._horario is not None else df
     
     def get_usuarios_raw(self) -> List[dict]:
         """Obtém todos os usuários do Sheets."""
@@ -623,26 +861,72 @@ class SheetsService:
             logger.error(f"Erro ao obter usuários: {e}")
             return []
     
-    def update_usuario(self, row_id: int, username: str, senha: str, role: str) -> bool:
+    def get_usuario_row(self, row_id: int) -> Optional[dict]:
+        """Lê uma única linha da aba de usuários (None se vazia ou indisponível)."""
+        try:
+            if not self._ensure_usuarios_sheet():
+                return None
+            valores = self.sheet_usuarios.get_values(f'A{row_id}:D{row_id}')
+            linha = [str(v) for v in (valores[0] if valores else [])] + [''] * 4
+            if not any(linha[:4]):
+                return None
+            return dict(zip(('Username', 'Senha', 'Role', 'Data de Cadastro'), linha[:4]))
+        except Exception as e:
+            logger.error(f"Erro ao obter linha {row_id} de usuários: {e}")
+            return None
+
+    def update_usuario(self, row_id: int, username: str, senha: str, role: str,
+                       data_cadastro: str = '') -> bool:
         """Atualiza um usuário."""
         try:
             if not self._ensure_usuarios_sheet():
                 return False
-            # Atualiza Username, Senha, Role e preserva/insere Data de Cadastro como vazia
-            self.sheet_usuarios.update(f'A{row_id}:D{row_id}', [[username, senha, role, '']])
+            # Atualiza Username, Senha, Role e Data de Cadastro em uma única escrita
+            self.sheet_usuarios.update(f'A{row_id}:D{row_id}', [[username, senha, role, data_cadastro or '']])
             logger.info(f"Usuário {username} atualizado")
             return True
         except Exception as e:
             logger.error(f"Erro ao atualizar usuário: {e}")
             return False
     
+    def update_usuarios_senhas(self, senhas_por_linha: Dict[int, str]) -> bool:
+        """Atualiza a coluna de senha de várias linhas em uma única chamada (batch_update)."""
+        try:
+            if not senhas_por_linha:
+                return True
+            if not self._ensure_usuarios_sheet():
+                return False
+            self.sheet_usuarios.batch_update([
+                {'range': f'B{row_id}', 'values': [[senha]]}
+                for row_id, senha in sorted(senhas_por_linha.items())
+            ])
+            logger.info(f"{len(senhas_por_linha)} senhas de usuários atualizadas em lote")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao atualizar senhas de usuários em lote: {e}")
+            return False
+    
+    @property
+    def usuarios_last_row(self) -> Optional[int]:
+        """Linha gravada pelo último `add_usuario` desta thread.
+
+        Fica por thread: requisições concorrentes criando usuários nunca leem
+        a linha do append uma da outra.
+        """
+        return getattr(self._local, 'usuarios_last_row', None)
+
     def add_usuario(self, username: str, senha: str, role: str) -> bool:
         """Adiciona novo usuário."""
+        self._local.usuarios_last_row = None
         try:
             if not self._ensure_usuarios_sheet():
                 return False
             ts = datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')
-            self.sheet_usuarios.append_row([username, senha, role, ts])
+            resposta = self.sheet_usuarios.append_row([username, senha, role, ts])
+            # Linha gravada, lida da resposta do append (ex.: "'Usuários'!A5:D5")
+            self._local.usuarios_last_row = self._parse_linha_range(
+                (resposta or {}).get('updates', {}).get('updatedRange', '')
+            )
             logger.info(f"Novo usuário {username} adicionado")
             return True
         except Exception as e:
@@ -650,6 +934,40 @@ class SheetsService:
             logger.error(f"Erro ao adicionar usuário: {e}", exc_info=True)
             return False
     
+    @staticmethod
+    def _parse_linha_range(range_a1: str) -> Optional[int]:
+        """Extrai o número da primeira linha de um range A1 (ex.: "'Aba'!A5:D5" -> 5)."""
+        match = re.search(r'![A-Z]+(\d+)', str(range_a1 or ''))
+        return int(match.group(1)) if match else None
+
+    def tombstone_usuario_row(self, row_id: int) -> bool:
+        """Marca a linha de um usuário como removida sem deslocar as demais linhas.
+
+        A linha não fica totalmente vazia (a coluna Role recebe o marcador),
+        para que o append de novos usuários continue indo para o fim da tabela.
+        """
+        try:
+            if not self._ensure_usuarios_sheet():
+                return False
+            self.sheet_usuarios.update(f'A{row_id}:D{row_id}', [['', '', self.USUARIO_TOMBSTONE, '']])
+            logger.info(f"Usuário da linha {row_id} removido (tombstone)")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao remover usuário da linha {row_id}: {e}")
+            return False
+
+    def delete_usuario_row(self, row_id: int) -> bool:
+        """Remove fisicamente a linha de um usuário (desloca as linhas abaixo)."""
+        try:
+            if not self._ensure_usuarios_sheet():
+                return False
+            self.sheet_usuarios.delete_rows(row_id)
+            logger.info(f"Linha {row_id} de usuários deletada")
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao deletar linha {row_id} de usuários: {e}")
+            return False
+
     def delete_usuario(self, username: str) -> bool:
         """Deleta um usuário."""
         try:
@@ -0,0 +1,139 @@
+"""
+IDs estáveis para linhas de planilha.
+
+Abas editadas pela aplicação (centrais, ferramentas) ganham uma coluna `ID`
+oculta no fim do cabeçalho. Cada registro recebe um ID aleatório curto ao
+ser criado (ou na primeira leitura, para linhas antigas), e os repositórios
+mantêm um mapa ID → registro cuja linha é ajustada a cada exclusão. Assim a
+página endereça registros pelo ID, e não pela posição, que muda quando
+alguém apaga uma linha.
+
+Antes de gravar, o repositório confere com uma leitura de uma célula se a
+linha ainda pertence ao ID; se outra instância mexeu na aba, o mapa é
+reconstruído antes de seguir.
+"""
+
+import logging
+import uuid
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, TypeVar
+
+from gspread.utils import rowcol_to_a1
+
+from appmodules.utils.text import normalizar_cabecalho
+
+logger = logging.getLogger(__name__)
+
+COLUNA_ID = 'ID'
+
+T = TypeVar('T')
+
+
+def novo_id() -> str:
+    """ID aleatório curto (sem coordenação entre workers)."""
+    return uuid.uuid4().hex[:12]
+
+
+def indice_coluna_id(headers: Sequence[str]) -> Optional[int]:
+    """Índice (0-based) da ÚLTIMA coluna `ID` do cabeçalho."""
+    for idx in range(len(headers) - 1, -1, -1):
+        if normalizar_cabecalho(str(headers[idx] or '')) == 'id':
+            return idx
+    return None
+
+
+def garantir_coluna_id(worksheet, headers: List[str]) -> int:
+    """
+    Garante a coluna `ID` (oculta) no fim do cabeçalho.
+
+    Returns:
+        Índice 0-based da coluna
+    """
+    idx = indice_coluna_id(headers)
+    if idx is not None:
+        return idx
+
+    idx = len(headers)
+    worksheet.update_cell(1, idx + 1, COLUNA_ID)
+    headers.append(COLUNA_ID)
+    try:
+        worksheet.hide_columns(idx, idx + 1)
+    except Exception as e:
+        logger.warning(f"Não foi possível ocultar a coluna de ID: {e}")
+    return idx
+
+
+def preencher_ids_faltantes(worksheet, linhas: List[List[str]], idx_id: int, primeira_linha: int = 2) -> int:
+    """
+    Atribui IDs às linhas que ainda não têm, em uma única chamada à API.
+
+    As linhas (`linhas`, sem o cabeçalho) são completadas no lugar.
+
+    Returns:
+        Quantidade de IDs gravados
+    """
+    atualizacoes = []
+    for numero, linha in enumerate(linhas, start=primeira_linha):
+        if not any(str(c or '').strip() for c in linha):
+            continue
+        linha.extend([''] * (idx_id + 1 - len(linha)))
+        if str(linha[idx_id] or '').strip():
+            continue
+        linha[idx_id] = novo_id()
+        atualizacoes.append({'range': rowcol_to_a1(numero, idx_id + 1), 'values': [[linha[idx_id]]]})
+
+    if atualizacoes:
+        worksheet.batch_update(atualizacoes)
+        logger.info(f"{len(atualizacoes)} ID(s) atribuído(s) na aba '{getattr(worksheet, 'title', '')}'")
+    return len(atualizacoes)
+
+
+def linha_confere(worksheet, linha: int, idx_id: int, registro_id: str) -> bool:
+    """True se a célula de ID da linha ainda contém o ID esperado."""
+    valor = worksheet.cell(linha, idx_id + 1).value
+    return str(valor or '').strip() == registro_id
+
+
+def linhas_conferem(worksheet, registros: Iterable[T], idx_id: int) -> bool:
+    """True se cada registro (`id`, `linha`) ainda está na sua linha; lê a coluna de ID uma vez."""
+    coluna = worksheet.col_values(idx_id + 1)
+    return all(
+        registro.linha <= len(coluna) and str(coluna[registro.linha - 1] or '').strip() == registro.id
+        for registro in registros
+    )
+
+
+class MapaIds(Generic[T]):
+    """ID → registro, com a linha atual de cada registro em `registro.linha`."""
+
+    def __init__(self):
+        self._registros: Dict[str, T] = {}
+
+    def carregar(self, registros: Iterable[T]) -> None:
+        """Substitui o mapa pelos registros informados (atributos `id` e `linha`)."""
+        self._registros = {}
+        for registro in registros:
+            if registro.id in self._registros:
+                logger.warning(f"ID duplicado na planilha: {registro.id}")
+                continue
+            self._registros[registro.id] = registro
+
+    def obter(self, registro_id: str) -> Optional[T]:
+        return self._registros.get(str(registro_id or '').strip())
+
+    def adicionar(self, registro: T) -> None:
+        self._registros[registro.id] = registro
+
+    def remover(self, registro_id: str) -> Optional[T]:
+        """Remove o registro e sobe uma linha todos os que estavam abaixo dele."""
+        registro = self._registros.pop(registro_id, None)
+        if registro is not None:
+            for outro in self._registros.values():
+                if outro.linha > registro.linha:
+                    outro.linha -= 1
+        return registro
+
+    def __len__(self) -> int:
+        return len(self._registros)
+
+    def __contains__(self, registro_id: str) -> bool:
+        return registro_id in self._registros
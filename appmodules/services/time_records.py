@@ -0,0 +1,150 @@
+"""
+Registros do "Controle de Horário" em memória, tipados e indexados.
+
+Mantém as linhas brutas da planilha (para `get_time_records`) e um
+DataFrame com colunas tipadas: `Data` e `Horário` como datetimes (o
+horário já combinado com a data) e `Tipo` categórico. Índices por
+funcionário e por OS guardam as posições das linhas, de modo que consultas
+por um deles não varrem a tabela inteira. Novas linhas podem ser anexadas
+(sincronização incremental) sem reprocessar as já carregadas.
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUNA_FUNCIONARIO = 'Funcionário'
+COLUNA_OS = 'Pedido/OS'
+
+
+def chave_os(pedido_os: str) -> str:
+    """Normaliza o número do pedido usado no índice por OS."""
+    return str(pedido_os or '').strip().lstrip('#').strip()
+
+
+class RegistrosHorario:
+    """Linhas do Controle de Horário com colunas tipadas e índices."""
+
+    def __init__(self, headers: Sequence[str]):
+        self.headers = [str(h or '').strip() for h in headers]
+        self.linhas_brutas: List[List[str]] = []
+        self.registros: List[dict] = []
+        self.df = self._tipar([], [])
+        self._por_funcionario: Dict[str, np.ndarray] = {}
+        self._por_os: Dict[str, np.ndarray] = {}
+
+    @property
+    def ultima_linha(self) -> int:
+        """Número (na planilha) da última linha lida; 1 é o cabeçalho."""
+        return 1 + len(self.linhas_brutas)
+
+    def _completar(self, linha: Sequence[str]) -> List[str]:
+        linha = [str(v) for v in linha]
+        return linha + [''] * (len(self.headers) - len(linha))
+
+    def ultima_linha_bruta(self) -> List[str]:
+        """Conteúdo da última linha lida (o cabeçalho, se não houver dados)."""
+        return self.linhas_brutas[-1] if self.linhas_brutas else list(self.headers)
+
+    def confere_ultima_linha(self, linha: Sequence[str]) -> bool:
+        """True se `linha` é igual à última linha carregada (detecta edição/remoção no fim)."""
+        return self._completar(linha)[:len(self.headers)] == self.ultima_linha_bruta()[:len(self.headers)]
+
+    def _tipar(self, linhas: List[List[str]], numeros: List[int]) -> pd.DataFrame:
+        """Monta o DataFrame tipado das linhas informadas."""
+        colunas = {
+            header: pd.Series([linha[i] for linha in linhas], dtype=object).str.strip()
+            for i, header in enumerate(self.headers) if header
+        }
+        df = pd.DataFrame(colunas, index=pd.RangeIndex(len(linhas)))
+        df['linha'] = np.asarray(numeros, dtype=np.int64)
+
+        data = df['Data'] if 'Data' in df else pd.Series('', index=df.index, dtype=object)
+        df['Data'] = pd.to_datetime(data, format='%d/%m/%Y', errors='coerce')
+        if 'Horário' in df:
+            completo = data + ' ' + df['Horário']
+            horario = pd.to_datetime(completo, format='%d/%m/%Y %H:%M:%S', errors='coerce')
+            faltantes = horario.isna()
+            if faltantes.any():
+                horario.loc[faltantes] = pd.to_datetime(
+                    completo.loc[faltantes], format='%d/%m/%Y %H:%M', errors='coerce')
+            df['Horário'] = horario
+        if 'Tipo' in df:
+            df['Tipo'] = df['Tipo'].astype('category')
+        return df
+
+    def _indexar(self, df: pd.DataFrame, deslocamento: int) -> None:
+        """Acrescenta as posições de `df` (deslocadas) aos índices."""
+        for coluna, indice, normalizar in (
+            (COLUNA_FUNCIONARIO, self._por_funcionario, str.strip),
+            (COLUNA_OS, self._por_os, chave_os),
+        ):
+            if coluna not in df or df.empty:
+                continue
+            chaves = df[coluna].map(normalizar)
+            for chave, posicoes in chaves.groupby(chaves, sort=False).indices.items():
+                if not chave:
+                    continue
+                posicoes = np.asarray(posicoes, dtype=np.int64) + deslocamento
+                atual = indice.get(chave)
+                indice[chave] = posicoes if atual is None else np.concatenate([atual, posicoes])
+
+    def anexar(self, linhas: Sequence[Sequence[str]]) -> int:
+        """
+        Anexa linhas lidas da planilha logo após a última carregada.
+
+        Linhas vazias contam para a numeração, mas não viram registros.
+
+        Returns:
+            Quantidade de registros adicionados
+        """
+        primeira = self.ultima_linha + 1
+        novas, numeros = [], []
+        for i, linha in enumerate(linhas):
+            completa = self._completar(linha)
+            self.linhas_brutas.append(completa)
+            if not any(completa):
+                continue
+            novas.append(completa)
+            numeros.append(primeira + i)
+        if not novas:
+            return 0
+
+        self.registros.extend(dict(zip(self.headers, linha)) for linha in novas)
+        parte = self._tipar(novas, numeros)
+        deslocamento = len(self.df)
+        if self.df.empty:
+            self.df = parte
+        else:
+            parte.index = pd.RangeIndex(deslocamento, deslocamento + len(parte))
+            df = pd.concat([self.df, parte])
+            if 'Tipo' in df:
+                df['Tipo'] = df['Tipo'].astype(str).replace('nan', '').astype('category')
+            self.df = df
+        self._indexar(parte, deslocamento)
+        return len(novas)
+
+    def por_funcionario(self, funcionario: str) -> pd.DataFrame:
+        """Registros de um funcionário (nome exato, sem espaços nas pontas)."""
+        return self.df.iloc[self._por_funcionario.get(str(funcionario or '').strip(), [])]
+
+    def por_os(self, pedido_os: str) -> pd.DataFrame:
+        """Registros de uma OS (aceita `#123` ou `123`)."""
+        return self.df.iloc[self._por_os.get(chave_os(pedido_os), [])]
+
+    def funcionarios(self) -> List[str]:
+        """Funcionários com registros, em ordem alfabética."""
+        return sorted(self._por_funcionario)
+
+    @classmethod
+    def de_valores(cls, data: List[List[str]]) -> Optional['RegistrosHorario']:
+        """Cria a partir de `get_all_values()` (cabeçalho na primeira linha)."""
+        if not data:
+            return None
+        registros = cls(data[0])
+        registros.anexar(data[1:])
+        return registros
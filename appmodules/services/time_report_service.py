@@ -0,0 +1,262 @@
+"""
+Relatório de tempo trabalhado a partir do "Controle de Horário".
+
+Cada registro é uma batida (Entrada/Saída) de um funcionário em uma OS. As
+batidas são pareadas de forma vetorizada: ordenadas por funcionário, OS e
+horário, cada Saída fecha a Entrada imediatamente anterior do mesmo par
+(funcionário, OS). Sobre as sessões pareadas são calculados os totais por
+funcionário/OS, por dia e por semana.
+
+As sessões pareadas ficam em cache por versão dos dados; os agregados
+filtrados ficam em um LRU pequeno chaveado por (versão, filtros).
+
+pandas só é importado no primeiro relatório calculado.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from appmodules.utils.text import encontrar_coluna, normalizar_texto
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUNAS_SESSAO = ['funcionario', 'pedido_os', 'inicio', 'fim', 'horas']
+
+_TIPOS_ENTRADA = {'entrada', 'inicio', 'retorno'}
+_TIPOS_SAIDA = {'saida', 'fim', 'pausa', 'termino'}
+
+
+def formatar_horas(horas: float) -> str:
+    """Formata horas decimais como `HHhMM`."""
+    minutos = int(round(float(horas) * 60))
+    return f"{minutos // 60}h{minutos % 60:02d}"
+
+
+@dataclass
+class RelatorioTempo:
+    """Agregados do tempo trabalhado (já filtrados)."""
+
+    resumo: List[Dict[str, Any]] = field(default_factory=list)
+    diario: List[Dict[str, Any]] = field(default_factory=list)
+    semanal: List[Dict[str, Any]] = field(default_factory=list)
+    total_horas: float = 0.0
+    sessoes: int = 0
+    registros_sem_par: int = 0
+
+
+class TimeReportService:
+    """Pareamento de batidas e agregação de horas, com cache por versão dos dados."""
+
+    def __init__(self, max_horas_sessao: Optional[float] = None, max_relatorios: int = 32):
+        """
+        Args:
+            max_horas_sessao: Sessões mais longas que isto são descartadas
+                (saída esquecida); padrão em TEMPO_MAX_HORAS_SESSAO
+            max_relatorios: Quantidade de relatórios filtrados mantidos em cache
+        """
+        if max_horas_sessao is None:
+            max_horas_sessao = float(os.getenv('TEMPO_MAX_HORAS_SESSAO', '16'))
+        self.max_horas_sessao = max(0.1, float(max_horas_sessao))
+        self.max_relatorios = max(1, int(max_relatorios))
+        self._lock = threading.Lock()
+        self._versao: Optional[str] = None
+        self._sessoes: Optional[pd.DataFrame] = None
+        self._sem_par = 0
+        self._relatorios: 'OrderedDict[Tuple, RelatorioTempo]' = OrderedDict()
+
+    @staticmethod
+    def versao_registros(registros: Union[Sequence[dict], pd.DataFrame]) -> str:
+        """Impressão digital do conteúdo dos registros (muda quando qualquer batida muda)."""
+        import pandas as pd
+
+        hasher = hashlib.sha1()
+        if isinstance(registros, pd.DataFrame):
+            hasher.update(pd.util.hash_pandas_object(registros, index=False).values.tobytes())
+            return f"{len(registros)}:{hasher.hexdigest()}"
+        for registro in registros:
+            hasher.update('\x1f'.join(str(v) for v in registro.values()).encode('utf-8'))
+            hasher.update(b'\x1e')
+        return f"{len(registros)}:{hasher.hexdigest()}"
+
+    @staticmethod
+    def _coluna(df: pd.DataFrame, *candidatos: str) -> pd.Series:
+        import pandas as pd
+
+        nome = encontrar_coluna(df.columns, *candidatos)
+        if nome is not None:
+            return df[nome].astype(object).fillna('').astype(str).str.strip()
+        return pd.Series('', index=df.index, dtype=object)
+
+    def parear_sessoes(self, registros: Union[Sequence[dict], pd.DataFrame]) -> Tuple[pd.DataFrame, int]:
+        """
+        Pareia Entrada/Saída por (funcionário, OS).
+
+        Aceita os registros brutos da planilha ou o DataFrame tipado de
+        `SheetsService.get_time_records_df()` (com `Horário` já em datetime).
+
+        Returns:
+            (sessões, registros_sem_par): DataFrame com COLUNAS_SESSAO e a
+            quantidade de batidas válidas que não formaram sessão
+        """
+        import pandas as pd
+
+        if len(registros) == 0:
+            return pd.DataFrame(columns=COLUNAS_SESSAO), 0
+
+        bruto = registros if isinstance(registros, pd.DataFrame) else pd.DataFrame(list(registros))
+        df = pd.DataFrame({
+            'funcionario': self._coluna(bruto, 'Funcionário', 'Funcionario'),
+            'pedido_os': self._coluna(bruto, 'Pedido/OS', 'OS').str.lstrip('#'),
+        })
+        tipo = self._coluna(bruto, 'Tipo').map(normalizar_texto)
+        df['tipo'] = 0
+        df.loc[tipo.isin(_TIPOS_ENTRADA), 'tipo'] = 1
+        df.loc[tipo.isin(_TIPOS_SAIDA), 'tipo'] = 2
+
+        if 'Horário' in bruto and pd.api.types.is_datetime64_any_dtype(bruto['Horário']):
+            df['ts'] = bruto['Horário']
+        else:
+            completo = self._coluna(bruto, 'Data') + ' ' + self._coluna(bruto, 'Horário', 'Horario')
+            ts = pd.to_datetime(completo, format='%d/%m/%Y %H:%M:%S', errors='coerce')
+            faltantes = ts.isna()
+            if faltantes.any():
+                ts.loc[faltantes] = pd.to_datetime(completo.loc[faltantes], format='%d/%m/%Y %H:%M', errors='coerce')
+            df['ts'] = ts
+
+        df = df[(df['tipo'] > 0) & df['ts'].notna() & df['funcionario'].ne('')]
+        validos = len(df)
+        if df.empty:
+            return pd.DataFrame(columns=COLUNAS_SESSAO), 0
+
+        df = df.sort_values(['funcionario', 'pedido_os', 'ts'], kind='mergesort').reset_index(drop=True)
+        anterior = df.shift(1)
+        fecha = (
+            df['tipo'].eq(2)
+            & anterior['tipo'].eq(1)
+            & df['funcionario'].eq(anterior['funcionario'])
+            & df['pedido_os'].eq(anterior['pedido_os'])
+        )
+
+        sessoes = pd.DataFrame({
+            'funcionario': df.loc[fecha, 'funcionario'],
+            'pedido_os': df.loc[fecha, 'pedido_os'],
+            'inicio': anterior.loc[fecha, 'ts'].astype('datetime64[ns]'),
+            'fim': df.loc[fecha, 'ts'],
+        })
+        sessoes['horas'] = (sessoes['fim'] - sessoes['inicio']).dt.total_seconds() / 3600
+        sessoes = sessoes[(sessoes['horas'] > 0) & (sessoes['horas'] <= self.max_horas_sessao)]
+        sessoes = sessoes.reset_index(drop=True)
+
+        return sessoes, validos - 2 * len(sessoes)
+
+    def _sessoes_da_versao(self, registros: Union[Sequence[dict], pd.DataFrame],
+                           versao: Optional[str]) -> Tuple[str, pd.DataFrame, int]:
+        versao = versao or self.versao_registros(registros)
+        with self._lock:
+            if versao == self._versao:
+                return versao, self._sessoes, self._sem_par
+
+        sessoes, sem_par = self.parear_sessoes(registros)
+        with self._lock:
+            self._versao = versao
+            self._sessoes = sessoes
+            self._sem_par = sem_par
+            self._relatorios.clear()
+        logger.info("Tempo por funcionário recalculado: %s sessões (versão %s)", len(sessoes), versao[:16])
+        return versao, sessoes, sem_par
+
+    def relatorio(self, registros: Union[Sequence[dict], pd.DataFrame], versao: Optional[str] = None,
+                  funcionario: str = '', pedido_os: str = '',
+                  data_inicio: Optional[pd.Timestamp] = None,
+                  data_fim: Optional[pd.Timestamp] = None) -> RelatorioTempo:
+        """
+        Agrega as horas trabalhadas, aplicando os filtros.
+
+        Args:
+            registros: Registros do Controle de Horário (brutos ou DataFrame tipado)
+            versao: Versão dos dados; sem ela é calculada pelo conteúdo
+            funcionario: Trecho do nome (sem diferenciar maiúsculas/acentos)
+            pedido_os: Número do pedido (exato)
+            data_inicio, data_fim: Intervalo de datas (inclusive) pelo início da sessão
+        """
+        versao, sessoes, sem_par = self._sessoes_da_versao(registros, versao)
+        chave = (versao, normalizar_texto(funcionario), str(pedido_os or '').strip().lstrip('#'),
+                 data_inicio, data_fim)
+        with self._lock:
+            if chave in self._relatorios:
+                self._relatorios.move_to_end(chave)
+                return self._relatorios[chave]
+
+        relatorio = self._agregar(sessoes, chave[1], chave[2], data_inicio, data_fim)
+        relatorio.registros_sem_par = sem_par
+        with self._lock:
+            self._relatorios[chave] = relatorio
+            while len(self._relatorios) > self.max_relatorios:
+                self._relatorios.popitem(last=False)
+        return relatorio
+
+    @staticmethod
+    def _agregar(sessoes: pd.DataFrame, funcionario: str, pedido_os: str,
+                 data_inicio: Optional[pd.Timestamp], data_fim: Optional[pd.Timestamp]) -> RelatorioTempo:
+        import pandas as pd
+
+        df = sessoes
+        if funcionario:
+            df = df[df['funcionario'].map(normalizar_texto).str.contains(funcionario, regex=False)]
+        if pedido_os:
+            df = df[df['pedido_os'].eq(pedido_os)]
+        if data_inicio is not None:
+            df = df[df['inicio'] >= pd.Timestamp(data_inicio).normalize()]
+        if data_fim is not None:
+            df = df[df['inicio'] < pd.Timestamp(data_fim).normalize() + pd.Timedelta(days=1)]
+        if df.empty:
+            return RelatorioTempo()
+
+        df = df.assign(
+            dia=df['inicio'].dt.normalize(),
+            semana=df['inicio'].dt.to_period('W-SUN').dt.start_time,
+        )
+
+        resumo = (
+            df.groupby(['funcionario', 'pedido_os'], sort=False)['horas']
+            .agg(horas='sum', sessoes='count')
+            .reset_index()
+            .sort_values(['horas', 'funcionario'], ascending=[False, True])
+        )
+        diario = (
+            df.groupby(['funcionario', 'dia'])['horas'].sum()
+            .reset_index()
+            .sort_values(['dia', 'funcionario'], ascending=[False, True])
+        )
+        semanal = (
+            df.groupby(['funcionario', 'semana'])['horas'].sum()
+            .reset_index()
+            .sort_values(['semana', 'funcionario'], ascending=[False, True])
+        )
+
+        return RelatorioTempo(
+            resumo=[
+                {'funcionario': f, 'pedido_os': p, 'horas': round(float(h), 2), 'sessoes': int(s)}
+                for f, p, h, s in resumo.itertuples(index=False, name=None)
+            ],
+            diario=[
+                {'funcionario': f, 'data': d.strftime('%d/%m/%Y'), 'horas': round(float(h), 2)}
+                for f, d, h in diario.itertuples(index=False, name=None)
+            ],
+            semanal=[
+                {'funcionario': f, 'semana': s.strftime('%d/%m/%Y'), 'horas': round(float(h), 2)}
+                for f, s, h in semanal.itertuples(index=False, name=None)
+            ],
+            total_horas=round(float(df['horas'].sum()), 2),
+            sessoes=len(df),
+        )
@@ -0,0 +1,154 @@
+"""
+Sincronização do diretório de usuários entre processos.
+
+Cada worker do gunicorn mantém seu próprio cache de usuários. Mutações
+(criar/atualizar/deletar) são publicadas em um changelog SQLite
+compartilhado; os demais workers consultam apenas o último número de
+sequência a cada requisição e aplicam somente os registros alterados.
+
+O changelog guarda só a operação, o username e a linha na planilha; nenhum
+dado de credencial sai do Google Sheets. Quem aplica um evento relê aquela
+linha da aba de usuários.
+
+O mesmo arquivo guarda leases com expiração, usadas para que só um worker
+execute tarefas de manutenção (ex.: migração de senhas legadas).
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UserDirectorySync:
+    """Changelog compartilhado de mutações de usuários."""
+
+    OPERACAO_UPSERT = 'upsert'
+    OPERACAO_DELETE = 'delete'
+    OPERACAO_RECARREGAR = 'recarregar'
+
+    def __init__(self, db_path: str, max_eventos: int = 1000):
+        """
+        Args:
+            db_path: Caminho do arquivo SQLite compartilhado entre workers
+            max_eventos: Quantidade de eventos mantidos no changelog
+        """
+        self.db_path = db_path
+        self.max_eventos = max(10, int(max_eventos))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão persistente por processo (reaberta após fork)."""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _init_db(self) -> None:
+        """Cria a tabela do changelog, se necessário."""
+        with self._lock:
+            conn = self._conexao()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS usuarios_changelog ('
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'operacao TEXT NOT NULL, '
+                'username TEXT, '
+                'linha INTEGER, '
+                'criado_em REAL NOT NULL)'
+            )
+            colunas = {row[1] for row in conn.execute('PRAGMA table_info(usuarios_changelog)')}
+            # Bancos criados antes da coluna `linha`
+            if 'linha' not in colunas:
+                conn.execute('ALTER TABLE usuarios_changelog ADD COLUMN linha INTEGER')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS usuarios_leases ('
+                'nome TEXT PRIMARY KEY, dono TEXT NOT NULL, expira_em REAL NOT NULL)'
+            )
+            # Bancos de versões que copiavam hash/role para o changelog: apaga os dados
+            legadas = [c for c in ('senha_hash', 'role', 'data_cadastro') if c in colunas]
+            if legadas:
+                conn.execute(
+                    'UPDATE usuarios_changelog SET ' + ', '.join(f'{c} = NULL' for c in legadas)
+                    + ' WHERE ' + ' OR '.join(f'{c} IS NOT NULL' for c in legadas)
+                )
+
+    def versao_atual(self) -> int:
+        """Último número de sequência publicado (consulta barata, feita por requisição)."""
+        with self._lock:
+            row = self._conexao().execute('SELECT MAX(seq) FROM usuarios_changelog').fetchone()
+        return int(row[0] or 0)
+
+    def publicar(self, operacao: str, username: str = '', linha: int = 0) -> int:
+        """Publica uma mutação no changelog e retorna sua sequência."""
+        with self._lock:
+            conn = self._conexao()
+            cursor = conn.execute(
+                'INSERT INTO usuarios_changelog (operacao, username, linha, criado_em) VALUES (?, ?, ?, ?)',
+                (operacao, username, linha or None, time.time())
+            )
+            seq = int(cursor.lastrowid)
+            if seq % 100 == 0:
+                conn.execute('DELETE FROM usuarios_changelog WHERE seq <= ?', (seq - self.max_eventos,))
+        return seq
+
+    def adquirir_lease(self, nome: str, dono: str, ttl_seconds: float) -> bool:
+        """
+        Tenta ficar com a lease `nome` por `ttl_seconds` (atômico entre processos).
+
+        Returns:
+            True se `dono` ficou com a lease (nova, expirada ou já sua)
+        """
+        agora = time.time()
+        with self._lock:
+            conn = self._conexao()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM usuarios_leases WHERE nome = ? AND expira_em <= ?', (nome, agora))
+                conn.execute('INSERT OR IGNORE INTO usuarios_leases (nome, dono, expira_em) VALUES (?, ?, ?)',
+                             (nome, dono, agora + ttl_seconds))
+                atual = conn.execute('SELECT dono FROM usuarios_leases WHERE nome = ?', (nome,)).fetchone()
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return bool(atual) and atual[0] == dono
+
+    def liberar_lease(self, nome: str, dono: str) -> None:
+        """Libera a lease, se ainda pertencer a `dono`."""
+        with self._lock:
+            self._conexao().execute('DELETE FROM usuarios_leases WHERE nome = ? AND dono = ?', (nome, dono))
+
+    def eventos_desde(self, seq: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Retorna os eventos publicados após `seq`, em ordem.
+
+        Retorna None quando parte dos eventos já foi podada do changelog;
+        nesse caso o chamador precisa recarregar o diretório inteiro.
+        """
+        with self._lock:
+            conn = self._conexao()
+            menor = conn.execute('SELECT MIN(seq) FROM usuarios_changelog').fetchone()[0]
+            if menor is not None and seq < menor - 1:
+                return None
+            rows = conn.execute(
+                'SELECT seq, operacao, username, linha FROM usuarios_changelog WHERE seq > ? ORDER BY seq',
+                (seq,)
+            ).fetchall()
+
+        return [
+            {
+                'seq': row[0],
+                'operacao': row[1],
+                'username': row[2] or '',
+                'linha': int(row[3] or 0),
+            }
+            for row in rows
+        ]
@@ -1,58 +1,165 @@
 """Serviço de gerenciamento de usuários."""
 
+import hashlib
 import logging
 import os
-from typing import Dict, Optional, List
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Dict, Optional, List
 from appmodules.models import Usuario
-from appmodules.models.usuario import Role
+from appmodules.models.usuario import Role, gerar_hash_senha
 from appmodules.services.sheets_service import SheetsService
+from appmodules.services.user_directory_sync import UserDirectorySync
 
 logger = logging.getLogger(__name__)
 
 
 class UserService:
     """Gerencia usuários do sistema."""
+
+    # Lease no changelog compartilhado: um único worker migra as senhas legadas
+    LEASE_MIGRACAO = 'migracao-senhas'
     
-    def __init__(self, sheets_service: SheetsService):
-        """Inicializa serviço de usuários."""
+    def __init__(self, sheets_service: SheetsService,
+                 directory_sync: Optional[UserDirectorySync] = None,
+                 em_segundo_plano: bool = False):
+        """Inicializa serviço de usuários.
+
+        Args:
+            sheets_service: Serviço do Google Sheets
+            directory_sync: Changelog compartilhado entre workers (opcional)
+            em_segundo_plano: Carrega os usuários em uma thread; consultas
+                feitas antes do fim esperam a carga (até SHEETS_INIT_TIMEOUT_SECONDS)
+        """
         self.sheets_service = sheets_service
+        self.directory_sync = directory_sync
+        self._sync_seq = 0
+        self._sync_lock = threading.Lock()
+        # Sequências publicadas por este worker (já aplicadas; sincronizar as pula)
+        self._sync_proprios: set = set()
+        self._migracao_thread: Optional[threading.Thread] = None
+        self._migracao_lease_seconds = max(30, int(os.getenv('PASSWORD_MIGRATION_LEASE_SECONDS', '600')))
         self._usuarios_cache: Dict[str, Usuario] = {}
+        # Índice username normalizado -> usuário (lookup O(1) sem diferenciar maiúsculas)
+        self._usuarios_index: Dict[str, Usuario] = {}
+        # Mapa username normalizado -> linha na aba de usuários (evita reler a aba a cada mutação)
+        self._linhas_usuarios: Dict[str, int] = {}
+        # 'tombstone' (padrão) marca a linha como removida sem deslocar as demais;
+        # 'delete_rows' remove a linha fisicamente e desloca o mapa em memória
+        self.modo_exclusao = os.getenv('USUARIOS_DELETE_MODE', 'tombstone').strip().lower()
         self.last_error: Optional[str] = None
-        self._load_usuarios()
+        # Versão do diretório de usuários; muda quando roles mudam ou usuários saem
+        self._versao = 0
+        # Carimbo de sessão calculado para a versão atual: (versão, carimbo)
+        self._carimbo: Optional[tuple] = None
+        # Identifica esta instância (dono de leases no changelog compartilhado)
+        self._instancia = secrets.token_hex(8)
+        self._carregado = threading.Event()
+        self._carga_timeout_seconds = max(1.0, float(os.getenv('SHEETS_INIT_TIMEOUT_SECONDS', '30')))
+        if em_segundo_plano:
+            threading.Thread(target=self._carregar_inicial, name='usuarios-carga', daemon=True).start()
+        else:
+            self._carregar_inicial()
+
+    def _carregar_inicial(self) -> None:
+        try:
+            # Lê a sequência antes de carregar: eventos concorrentes serão reaplicados
+            self._sync_seq = self._sync_versao_atual()
+            self._load_usuarios()
+        finally:
+            self._carregado.set()
+
+    @property
+    def pronto(self) -> bool:
+        """True quando a carga inicial dos usuários terminou; não bloqueia."""
+        return self._carregado.is_set()
+
+    @property
+    def versao(self) -> int:
+        """Versão atual do diretório de usuários (para snapshots de autorização)."""
+        return self._versao
+
+    @property
+    def carimbo_sessao(self) -> str:
+        """Carimbo gravado nos snapshots de autorização da sessão.
+
+        É um digest dos pares username → role do diretório, e não o contador
+        local `versao` (que recomeça a cada restart e difere entre workers):
+        todos os workers com o mesmo diretório produzem o mesmo carimbo, e
+        qualquer mudança de role ou exclusão, inclusive feita antes de um
+        restart, o altera. Recalculado só quando a versão muda.
+        """
+        versao = self._versao
+        carimbo = self._carimbo
+        if carimbo is None or carimbo[0] != versao:
+            roles = sorted(
+                (chave, usuario.role) for chave, usuario in list(self._usuarios_index.items())
+            )
+            digest = hashlib.sha256(
+                '\n'.join(f"{chave}\0{role}" for chave, role in roles).encode('utf-8')
+            ).hexdigest()[:24]
+            carimbo = (versao, digest)
+            self._carimbo = carimbo
+        return carimbo[1]
+
+    def _incrementar_versao(self) -> None:
+        """Invalida snapshots de autorização emitidos com versões anteriores."""
+        self._versao += 1
+
+    @staticmethod
+    def _normalizar_username(username: str) -> str:
+        """Normaliza username para comparação sem diferenciar maiúsculas."""
+        return str(username or '').strip().lower()
+
+    def _cache_adicionar(self, usuario: Usuario) -> None:
+        """Adiciona/atualiza usuário no cache e no índice normalizado."""
+        self._usuarios_cache[usuario.username] = usuario
+        self._usuarios_index[self._normalizar_username(usuario.username)] = usuario
+
+    def _cache_remover(self, usuario: Usuario) -> None:
+        """Remove usuário do cache e do índice normalizado."""
+        self._usuarios_cache.pop(usuario.username, None)
+        chave = self._normalizar_username(usuario.username)
+        if self._usuarios_index.get(chave) is usuario:
+            self._usuarios_index.pop(chave, None)
+
+    def _cache_substituir(self, usuarios: Dict[str, Usuario]) -> None:
+        """Troca o cache inteiro de uma vez, reconstruindo o índice."""
+        index: Dict[str, Usuario] = {}
+        for usuario in usuarios.values():
+            index.setdefault(self._normalizar_username(usuario.username), usuario)
+        self._usuarios_cache = usuarios
+        self._usuarios_index = index
     
     def _load_usuarios(self) -> None:
         """Carrega usuários do Sheets ou memória."""
         try:
             if not self.sheets_service:
                 logger.warning("Sheets service indisponível; cache de usuários vazio")
-                self._usuarios_cache = {}
+                self._cache_substituir({})
                 self._load_local_fallback_user()
                 return
             
             records = self.sheets_service.get_usuarios_raw()
-            self._usuarios_cache = {}
+            usuarios: Dict[str, Usuario] = {}
+            linhas: Dict[str, int] = {}
+            pendentes: List[Usuario] = []
             
-            roles_validos = {r.value for r in Role}
             for i, record in enumerate(records, start=2):
-                username = str(record.get('Username', '')).strip()
-                senha = str(record.get('Senha', '')).strip()
-                role = str(record.get('Role', Role.ADMIN.value)).strip().lower()
-                if role not in roles_validos:
-                    role = Role.ADMIN.value
-                
-                if username and senha:
-                    if not Usuario.is_hash_valido(senha):
-                        senha = Usuario.criar(username, senha, role).senha_hash
-                        if not self.sheets_service.update_usuario(i, username, senha, role):
-                            logger.warning("Falha ao migrar senha legada do usuário %s", username)
-                    # Tenta ler coluna de data de cadastro se existir (compatibilidade com planilhas antigas)
-                    data_cadastro = str(record.get('Data de Cadastro') or record.get('DataCadastro') or record.get('Data') or '').strip()
-                    self._usuarios_cache[username] = Usuario(
-                        username=username,
-                        senha_hash=senha,
-                        role=role,
-                        data_cadastro=data_cadastro
-                    )
+                usuario = self._usuario_do_registro(record)
+                if usuario:
+                    usuarios[usuario.username] = usuario
+                    linhas.setdefault(self._normalizar_username(usuario.username), i)
+                    if usuario.migracao_pendente:
+                        pendentes.append(usuario)
+            
+            # Troca atômica: leitores concorrentes nunca veem o cache pela metade
+            self._cache_substituir(usuarios)
+            self._linhas_usuarios = linhas
+            self._incrementar_versao()
+            self._agendar_migracao_senhas(pendentes)
             
             if not self._usuarios_cache:
                 logger.warning("Nenhum usuário cadastrado no Sheets. Cadastre pelo menos um administrador.")
@@ -63,6 +170,126 @@ class UserService:
             logger.warning(f"Erro ao carregar usuários: {e}; cache de usuários permanecerá vazio")
             self._load_local_fallback_user()
 
+    @staticmethod
+    def _usuario_do_registro(record: Dict[str, Any]) -> Optional[Usuario]:
+        """Monta o usuário de uma linha da aba (None para linhas vazias/removidas)."""
+        username = str(record.get('Username', '')).strip()
+        senha = str(record.get('Senha', '')).strip()
+        if not username or not senha:
+            return None
+
+        role = str(record.get('Role', Role.ADMIN.value)).strip().lower()
+        if role not in {r.value for r in Role}:
+            role = Role.ADMIN.value
+        # Tenta ler coluna de data de cadastro se existir (compatibilidade com planilhas antigas)
+        data_cadastro = str(record.get('Data de Cadastro') or record.get('DataCadastro') or record.get('Data') or '').strip()
+        return Usuario(
+            username=username,
+            senha_hash=senha,
+            role=role,
+            data_cadastro=data_cadastro,
+            # Senha legada em texto plano: migrada em background
+            migracao_pendente=not Usuario.is_hash_valido(senha)
+        )
+
+    def _agendar_migracao_senhas(self, pendentes: List[Usuario]) -> None:
+        """Agenda a migração de senhas legadas sem bloquear o boot do worker."""
+        if not pendentes:
+            return
+
+        logger.info("%s usuário(s) com senha legada marcados como migração pendente", len(pendentes))
+        async_enabled = os.getenv('PASSWORD_MIGRATION_ASYNC', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+        if not async_enabled:
+            self._migrar_senhas_legadas(pendentes)
+            return
+
+        self._migracao_thread = threading.Thread(
+            target=self._migrar_senhas_legadas,
+            args=(pendentes,),
+            name='migracao-senhas-legadas',
+            daemon=True,
+        )
+        self._migracao_thread.start()
+
+    def _gerar_hashes(self, senhas: List[str]) -> List[str]:
+        """Gera hashes em paralelo.
+
+        O pbkdf2 do hashlib roda em C e libera o GIL, então um pool de threads
+        já usa vários núcleos. (As etiquetas QR usam processos porque o qrcode
+        é Python puro e segura o GIL.)
+        """
+        workers = int(os.getenv('PASSWORD_MIGRATION_WORKERS', '0') or 0) or (os.cpu_count() or 1)
+        workers = max(1, min(workers, len(senhas)))
+        if workers == 1:
+            return [gerar_hash_senha(senha) for senha in senhas]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash-senha') as pool:
+            return list(pool.map(gerar_hash_senha, senhas))
+
+    def _migrar_senhas_legadas(self, pendentes: List[Usuario]) -> None:
+        """Converte senhas legadas para hash e grava todas em um único batch_update.
+
+        Com changelog compartilhado, só o worker que obtém a lease de migração
+        executa; os demais recebem os usuários migrados pelos eventos publicados.
+        """
+        dono = f"{os.getpid()}:{self._instancia}"
+        lease = False
+        try:
+            if self.directory_sync:
+                lease = self.directory_sync.adquirir_lease(self.LEASE_MIGRACAO, dono, self._migracao_lease_seconds)
+                if not lease:
+                    logger.info("Migração de senhas legadas em andamento em outro worker")
+                    return
+
+            # Ignora quem foi alterado/removido desde o carregamento
+            pendentes = [
+                usuario for usuario in pendentes
+                if usuario.migracao_pendente and self.get_usuario(usuario.username) is usuario
+            ]
+            if not pendentes:
+                return
+
+            hashes = self._gerar_hashes([usuario.senha_hash for usuario in pendentes])
+
+            # Confere cada linha na planilha logo antes de escrever: só migra quem
+            # ainda tem a mesma senha legada (outro worker pode ter trocado a senha)
+            linhas_atuais = {}
+            for i, record in enumerate(self.sheets_service.get_usuarios_raw(), start=2):
+                linhas_atuais.setdefault(self._normalizar_username(record.get('Username', '')),
+                                         (i, str(record.get('Senha', '')).strip()))
+            migrados = []
+            for usuario, senha_hash in zip(pendentes, hashes):
+                linha, senha_atual = linhas_atuais.get(self._normalizar_username(usuario.username), (None, None))
+                if linha and senha_atual == usuario.senha_hash:
+                    migrados.append((usuario, senha_hash, linha))
+            if not migrados:
+                return
+
+            if not self.sheets_service.update_usuarios_senhas({linha: senha_hash for _, senha_hash, linha in migrados}):
+                logger.warning("Falha ao gravar senhas migradas; usuários permanecem com migração pendente")
+                return
+
+            for usuario, senha_hash, linha in migrados:
+                self._linhas_usuarios[self._normalizar_username(usuario.username)] = linha
+                self._publicar(UserDirectorySync.OPERACAO_UPSERT, usuario.username, linha)
+                if self.get_usuario(usuario.username) is not usuario or not usuario.migracao_pendente:
+                    continue
+                # Substitui o objeto inteiro para que leitores nunca vejam estado intermediário
+                self._cache_adicionar(Usuario(
+                    username=usuario.username,
+                    senha_hash=senha_hash,
+                    role=usuario.role,
+                    data_cadastro=usuario.data_cadastro,
+                ))
+            logger.info("Migração de senhas legadas concluída: %s usuário(s)", len(migrados))
+        except Exception as e:
+            logger.error(f"Erro na migração de senhas legadas: {e}", exc_info=True)
+        finally:
+            if lease:
+                try:
+                    self.directory_sync.liberar_lease(self.LEASE_MIGRACAO, dono)
+                except Exception as e:
+                    logger.warning(f"Falha ao liberar lease de migração de senhas: {e}")
+
     def _load_local_fallback_user(self) -> None:
         """Cria usuário admin local para ambiente de desenvolvimento."""
         # Exigir configuração explícita para permitir fallback (nunca usar padrões inseguros)
@@ -88,8 +315,8 @@ class UserService:
         if not username or not password:
             return
 
-        if username not in self._usuarios_cache:
-            self._usuarios_cache[username] = Usuario.criar(username, password, role)
+        if self._normalizar_username(username) not in self._usuarios_index:
+            self._cache_adicionar(Usuario.criar(username, password, role))
             logger.warning(
                 "Usuário local de fallback carregado para login (dev): %s. "
                 "Defina LOCAL_ADMIN_USER/LOCAL_ADMIN_PASSWORD para alterar.",
@@ -98,17 +325,16 @@ class UserService:
     
     def get_usuario(self, username: str) -> Optional[Usuario]:
         """Obtém um usuário pelo username."""
-        username_normalizado = str(username or '').strip().lower()
+        username_normalizado = self._normalizar_username(username)
         if not username_normalizado:
             return None
 
-        for usuario in self._usuarios_cache.values():
-            if str(usuario.username or '').strip().lower() == username_normalizado:
-                return usuario
-        return None
+        self._carregado.wait(self._carga_timeout_seconds)
+        return self._usuarios_index.get(username_normalizado)
     
     def get_todos_usuarios(self) -> List[Usuario]:
         """Obtém todos os usuários."""
+        self._carregado.wait(self._carga_timeout_seconds)
         return list(self._usuarios_cache.values())
     
     def criar_usuario(self, username: str, senha: str, role: str = 'admin') -> bool:
@@ -144,8 +370,12 @@ class UserService:
                     logger.error(f"Falha ao salvar usuário {username} no Sheets")
                 return False
             
-            # Salva em cache
-            self._usuarios_cache[username] = usuario
+            # Salva em cache (linha informada pela resposta do append)
+            self._cache_adicionar(usuario)
+            linha = getattr(self.sheets_service, 'usuarios_last_row', None)
+            if linha:
+                self._linhas_usuarios[self._normalizar_username(username)] = linha
+            self._publicar(UserDirectorySync.OPERACAO_UPSERT, username, linha)
             self.last_error = None
             logger.info(f"Usuário {username} criado com sucesso")
             return True
@@ -167,24 +397,35 @@ class UserService:
                 logger.warning(f"Usuário {username} não encontrado")
                 return False
             
-            if senha:
-                usuario.atualizar_senha(senha)
             if role:
                 role = str(role).strip().lower()
                 if role not in {r.value for r in Role}:
                     logger.warning("Role inválida ao atualizar usuário: %s", role)
                     return False
-                usuario.role = role
+            # As mudanças vão numa cópia: o cache só a recebe depois que o Sheets aceitar a gravação
+            atualizado = replace(usuario)
+            if senha:
+                atualizado.atualizar_senha(senha)
+            elif atualizado.migracao_pendente:
+                # A linha inteira é regravada: a senha legada sai já convertida em hash
+                atualizado.atualizar_senha(atualizado.senha_hash)
+            if role:
+                atualizado.role = role
             
-            # Atualiza no Sheets (busca por row_id)
-            records = self.sheets_service.get_usuarios_raw()
-            for i, record in enumerate(records, start=2):
-                if str(record.get('Username', '')).strip().lower() == str(username or '').strip().lower():
-                    if not self.sheets_service.update_usuario(i, username, usuario.senha_hash, usuario.role):
-                        logger.error(f"Falha ao atualizar usuário {username} no Sheets")
-                        return False
-                    break
+            # Atualiza no Sheets (linha pelo mapa; releitura só se desconhecida)
+            linha = self._linha_usuario(atualizado.username)
+            if not linha:
+                logger.warning(f"Linha do usuário {username} não encontrada no Sheets")
+                return False
+            if not self.sheets_service.update_usuario(linha, atualizado.username, atualizado.senha_hash,
+                                                      atualizado.role, atualizado.data_cadastro or ''):
+                logger.error(f"Falha ao atualizar usuário {username} no Sheets")
+                return False
             
+            self._cache_adicionar(atualizado)
+            if atualizado.role != usuario.role:
+                self._incrementar_versao()
+            self._publicar(UserDirectorySync.OPERACAO_UPSERT, atualizado.username, linha)
             logger.info(f"Usuário {username} atualizado")
             return True
         except Exception as e:
@@ -204,18 +445,168 @@ class UserService:
                 return False
             
             # Deleta do Sheets
-            if not self.sheets_service.delete_usuario(usuario.username):
+            linha = self._linha_usuario(usuario.username)
+            if not linha:
+                logger.error(f"Linha do usuário {username} não encontrada no Sheets")
+                return False
+            if self.modo_exclusao == 'delete_rows':
+                removido = self.sheets_service.delete_usuario_row(linha)
+            else:
+                removido = self.sheets_service.tombstone_usuario_row(linha)
+            if not removido:
                 logger.error(f"Falha ao deletar usuário {username} do Sheets")
                 return False
             
             # Remove do cache
-            self._usuarios_cache.pop(usuario.username, None)
+            self._cache_remover(usuario)
+            self._remover_linha(usuario.username, deslocar=self.modo_exclusao == 'delete_rows')
+            self._incrementar_versao()
+            self._publicar(UserDirectorySync.OPERACAO_DELETE, usuario.username, linha)
             logger.info(f"Usuário {username} deletado")
             return True
         except Exception as e:
             logger.error(f"Erro ao deletar usuário: {e}")
             return False
     
+    def _linha_usuario(self, username: str) -> Optional[int]:
+        """Linha do usuário na planilha; relê a aba apenas se o mapa não a conhecer."""
+        chave = self._normalizar_username(username)
+        linha = self._linhas_usuarios.get(chave)
+        if linha:
+            return linha
+
+        records = self.sheets_service.get_usuarios_raw()
+        for i, record in enumerate(records, start=2):
+            if self._normalizar_username(record.get('Username', '')) == chave:
+                self._linhas_usuarios[chave] = i
+                return i
+        return None
+
+    def _remover_linha(self, username: str, deslocar: bool = False) -> None:
+        """Remove o usuário do mapa de linhas; com `deslocar`, sobe as linhas abaixo."""
+        linha = self._linhas_usuarios.pop(self._normalizar_username(username), None)
+        if deslocar and linha:
+            self._linhas_usuarios = {
+                chave: (i - 1 if i > linha else i)
+                for chave, i in self._linhas_usuarios.items()
+            }
+
     def recarregar(self) -> None:
         """Recarrega usuários do Sheets."""
+        seq = self._sync_versao_atual()
         self._load_usuarios()
+        publicado = self._publicar(UserDirectorySync.OPERACAO_RECARREGAR)
+        self._sync_proprios.discard(publicado)
+        self._sync_seq = max(seq, publicado)
+
+    def _sync_versao_atual(self) -> int:
+        """Sequência atual do changelog compartilhado (0 se desativado/indisponível)."""
+        if not self.directory_sync:
+            return 0
+        try:
+            return self.directory_sync.versao_atual()
+        except Exception as e:
+            logger.warning(f"Falha ao consultar sincronização de usuários: {e}")
+            return 0
+
+    def _publicar(self, operacao: str, username: str = '', linha: Optional[int] = None) -> int:
+        """Publica uma mutação para os demais workers (só username e linha; nunca a senha)."""
+        if not self.directory_sync:
+            return 0
+        try:
+            seq = self.directory_sync.publicar(operacao, username=username, linha=linha or 0)
+            self._sync_proprios.add(seq)
+            return seq
+        except Exception as e:
+            logger.warning(f"Falha ao publicar alteração de usuário ({operacao}): {e}")
+            return 0
+
+    def sincronizar(self) -> None:
+        """Aplica alterações feitas por outros workers, se houver.
+
+        A verificação é uma consulta à última sequência do changelog; apenas
+        os registros alterados são aplicados ao cache local.
+        """
+        if not self.directory_sync or not self._carregado.is_set():
+            return
+
+        seq_remota = self._sync_versao_atual()
+        if seq_remota <= self._sync_seq:
+            return
+
+        with self._sync_lock:
+            if seq_remota <= self._sync_seq:
+                return
+            try:
+                eventos = self.directory_sync.eventos_desde(self._sync_seq)
+            except Exception as e:
+                logger.warning(f"Falha ao ler alterações de usuários: {e}")
+                return
+
+            if eventos is None:
+                logger.info("Changelog de usuários podado; recarregando diretório completo")
+                self._load_usuarios()
+                self._sync_seq = seq_remota
+                self._sync_proprios.clear()
+                return
+
+            for evento in eventos:
+                if evento['seq'] in self._sync_proprios:
+                    self._sync_proprios.discard(evento['seq'])
+                else:
+                    self._aplicar_evento(evento)
+                self._sync_seq = evento['seq']
+
+    def _aplicar_evento(self, evento: Dict[str, Any]) -> None:
+        """Aplica um evento do changelog ao cache local."""
+        operacao = evento['operacao']
+        if operacao == UserDirectorySync.OPERACAO_RECARREGAR:
+            self._load_usuarios()
+            return
+
+        existente = self.get_usuario(evento['username'])
+        linha = evento.get('linha') or 0
+        if operacao == UserDirectorySync.OPERACAO_DELETE:
+            if not existente:
+                # Já aplicado localmente (evento publicado por este worker)
+                return
+            if self.modo_exclusao == 'delete_rows' and \
+                    self._linhas_usuarios.get(self._normalizar_username(evento['username'])) != linha:
+                # Mapa local divergente: não dá para deslocar as linhas com segurança
+                self._load_usuarios()
+                self._incrementar_versao()
+                return
+            self._remover_linha(evento['username'], deslocar=self.modo_exclusao == 'delete_rows')
+            self._cache_remover(existente)
+            self._incrementar_versao()
+            return
+
+        if operacao == UserDirectorySync.OPERACAO_UPSERT and evento['username']:
+            usuario = self._reler_usuario(evento['username'], linha)
+            if not usuario:
+                logger.warning(f"Usuário {evento['username']} do changelog não encontrado na planilha")
+                return
+            if existente:
+                self._cache_remover(existente)
+            self._cache_adicionar(usuario)
+            if existente and existente.role != usuario.role:
+                self._incrementar_versao()
+
+    def _reler_usuario(self, username: str, linha: int) -> Optional[Usuario]:
+        """Relê da planilha a linha de um usuário alterado por outro worker.
+
+        Lê só a linha informada no evento; se ela não for mais do usuário
+        (linhas deslocadas depois do evento), procura-o na aba inteira.
+        """
+        chave = self._normalizar_username(username)
+        record = self.sheets_service.get_usuario_row(linha) if linha else None
+        if not record or self._normalizar_username(record.get('Username', '')) != chave:
+            record, linha = None, 0
+            for i, candidato in enumerate(self.sheets_service.get_usuarios_raw(), start=2):
+                if self._normalizar_username(candidato.get('Username', '')) == chave:
+                    record, linha = candidato, i
+                    break
+            if not record:
+                return None
+        self._linhas_usuarios[chave] = linha
+        return self._usuario_do_registro(record)
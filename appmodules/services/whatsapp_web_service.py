@@ -1,20 +1,30 @@
 """
 WhatsApp Web Service usando pywhatkit
 Envia mensagens via WhatsApp Web automático (requer WhatsApp Web logado)
+
+O pywhatkit importa bibliotecas de automação de interface (pyautogui) e só é
+carregado quando um serviço habilitado é criado, nunca na inicialização.
 """
 import os
 import logging
 from datetime import datetime
+from functools import lru_cache
 from .whatsapp_utils import normalizar_numero_whatsapp, montar_mensagem_os
 
-try:
-    import pywhatkit as kit
-except ImportError:
-    kit = None
-
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def _pywhatkit():
+    """Importa o pywhatkit no primeiro uso; None se indisponível."""
+    try:
+        import pywhatkit
+        return pywhatkit
+    except Exception as e:  # ImportError, ou pyautogui sem display
+        logger.warning(f"pywhatkit indisponível: {e}")
+        return None
+
+
 class WhatsAppWebNotificationService:
     """
     Serviço de notificação WhatsApp Web automatizado com pywhatkit
@@ -36,7 +46,7 @@ class WhatsAppWebNotificationService:
             return
         self.enabled = os.getenv('WHATSAPP_WEB_ENABLED', 'true').lower() == 'true'
 
-        if not kit:
+        if not _pywhatkit():
             logger.warning("pywhatkit não instalado - WhatsApp Web service desabilitado")
             self.enabled = False
 
@@ -72,7 +82,7 @@ class WhatsAppWebNotificationService:
             
             # wait_time increased to 15 seconds for reliable auto-sending
             # pywhatkit needs time to: open browser, load WhatsApp, navigate to chat, type, and send
-            kit.sendwhatmsg_instantly(
+            _pywhatkit().sendwhatmsg_instantly(
                 phone_normalized, 
                 message, 
                 wait_time=15,       # 15 segundos para processamento completo
@@ -113,7 +123,7 @@ class WhatsAppWebNotificationService:
             
             # wait_time increased to 15 seconds for reliable auto-sending
             # pywhatkit needs time to: open browser, load WhatsApp, navigate to chat, type, and send
-            kit.sendwhatmsg_instantly(
+            _pywhatkit().sendwhatmsg_instantly(
                 phone_normalized, 
                 message, 
                 wait_time=15,      # 15 segundos para processamento completo
@@ -6,12 +6,35 @@ import os
 import logging
 import json
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Pattern, Tuple
 from datetime import datetime
 
+from appmodules.services.idempotency_store import IdempotencyStore
+
 logger = logging.getLogger(__name__)
 
 
+def _compilar_comandos(comandos: Dict[str, str]) -> Tuple[Pattern[str], Dict[str, Optional[int]]]:
+    """
+    Compila todos os comandos em uma única regex de alternação.
+
+    Cada padrão vira um grupo nomeado com o tipo do comando; o retorno traz
+    também o índice do grupo que captura o número da OS em cada comando
+    (None quando o comando não recebe argumento). A alternação fica dentro
+    de um lookahead para que `finditer` teste todas as posições sem consumir
+    texto: um comando de menor prioridade nunca esconde outro sobreposto.
+    """
+    partes = []
+    grupos_os: Dict[str, Optional[int]] = {}
+    proximo_grupo = 1
+    for tipo, padrao in comandos.items():
+        partes.append(f'(?P<{tipo}>{padrao})')
+        grupos_internos = re.compile(padrao).groups
+        grupos_os[tipo] = proximo_grupo + 1 if grupos_internos else None
+        proximo_grupo += 1 + grupos_internos
+    return re.compile('(?=' + '|'.join(partes) + ')'), grupos_os
+
+
 class WhatsAppWebhookService:
     """
     Serviço para receber e processar mensagens WhatsApp.
@@ -28,6 +51,11 @@ class WhatsAppWebhookService:
         'ajuda': r'(?:ajuda|help|\?)',  # ajuda / help
     }
 
+    # Regex combinada compilada uma única vez no carregamento da classe
+    _COMANDOS_REGEX, _COMANDOS_GRUPO_OS = _compilar_comandos(COMANDOS)
+    # Prioridade de cada comando (ordem de COMANDOS; menor vence)
+    _COMANDOS_PRIORIDADE = {tipo: i for i, tipo in enumerate(COMANDOS)}
+
     def __init__(self, sheets_service=None, whatsapp_phone: str = None):
         """
         Inicializa o serviço de webhook.
@@ -54,10 +82,30 @@ class WhatsAppWebhookService:
             and bool(self.webhook_token)
         )
 
+        # Deduplicação de reentregas do provedor (por id da mensagem)
+        self.idempotencia = IdempotencyStore(
+            ttl_seconds=int(os.getenv('WHATSAPP_WEBHOOK_DEDUP_TTL_SECONDS', '86400')),
+            max_entries=int(os.getenv('WHATSAPP_WEBHOOK_DEDUP_MAX_ENTRIES', '10000')),
+            db_path=os.getenv('WHATSAPP_WEBHOOK_DEDUP_DB', '').strip() or None,
+        )
+
     def validar_token(self, token: str) -> bool:
         """Valida token do webhook para segurança"""
         return token == self.webhook_token and self.enabled
 
+    def registrar_mensagem(self, message_id: str) -> bool:
+        """
+        Registra o id de uma mensagem recebida.
+
+        Returns:
+            True se a mensagem é nova, False se for reentrega já processada
+        """
+        return self.idempotencia.registrar(message_id)
+
+    def liberar_mensagem(self, message_id: str) -> None:
+        """Desfaz o registro de uma mensagem cujo processamento falhou, para aceitar a reentrega."""
+        self.idempotencia.remover(message_id)
+
     def extrair_numero_whatsapp(self, telefone: str) -> str:
         """Extrai apenas dígitos do número de WhatsApp"""
         return ''.join(filter(str.isdigit, telefone))
@@ -81,25 +129,44 @@ class WhatsAppWebhookService:
     def extrair_comando(self, mensagem: str) -> Optional[Dict[str, Any]]:
         """
         Extrai comando e parâmetros da mensagem.
+
+        Usa a regex combinada de todos os comandos em uma única varredura;
+        quando a mensagem contém mais de um comando, vale o de maior
+        prioridade em COMANDOS (e, dele, a primeira ocorrência).
         
         Returns:
             Dict com {'tipo': str, 'numero_os': str} ou None se não encontrar
         """
-        mensagem = mensagem.strip().lower()
-        
-        for tipo_comando, padrao in self.COMANDOS.items():
-            match = re.search(padrao, mensagem)
-            if match:
-                if tipo_comando == 'ajuda':
-                    return {'tipo': 'ajuda', 'numero_os': None}
-                
-                numero_os = match.group(1).upper() if match.groups() else None
-                return {
-                    'tipo': tipo_comando,
-                    'numero_os': numero_os
-                }
-        
-        return None
+        match = None
+        prioridade = len(self._COMANDOS_PRIORIDADE)
+        for candidato in self._COMANDOS_REGEX.finditer(mensagem.strip().lower()):
+            prioridade_candidato = self._COMANDOS_PRIORIDADE[candidato.lastgroup]
+            if prioridade_candidato < prioridade:
+                match, prioridade = candidato, prioridade_candidato
+                if prioridade == 0:
+                    break
+        if not match:
+            return None
+
+        tipo_comando = match.lastgroup
+        grupo_os = self._COMANDOS_GRUPO_OS.get(tipo_comando)
+        numero_os = match.group(grupo_os).upper() if grupo_os else None
+        return {
+            'tipo': tipo_comando,
+            'numero_os': numero_os
+        }
+
+    def _gerar_mensagem_ajuda(self) -> str:
+        """Monta a lista de comandos disponíveis."""
+        return (
+            '📋 Comandos disponíveis:\n'
+            '  • status OS-123 → Ver status da OS\n'
+            '  • cheguei OS-123 → Notificar chegada\n'
+            '  • concluir OS-123 → Finalizar OS\n'
+            '  • pausa OS-123 → Pausar OS\n'
+            '  • retomar OS-123 → Retomar OS\n'
+            '  • ajuda → Mostrar esta mensagem'
+        )
 
     def processar_mensagem(self, dados: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -131,13 +198,12 @@ class WhatsAppWebhookService:
             comando = self.extrair_comando(texto)
             
             if not comando:
+                # Mensagem livre não é erro: responde com a lista de comandos
+                resultado['sucesso'] = True
+                resultado['tipo'] = 'mensagem_livre'
                 resultado['resposta'] = (
-                    '❓ Comando não reconhecido. Envie:\n'
-                    '  • status OS-123\n'
-                    '  • cheguei OS-123\n'
-                    '  • concluído OS-123\n'
-                    '  • pausa OS-123\n'
-                    '  • ajuda'
+                    '❓ Comando não reconhecido. Envie "ajuda" para ver os comandos.\n\n'
+                    + self._gerar_mensagem_ajuda()
                 )
                 return resultado
             
@@ -147,15 +213,7 @@ class WhatsAppWebhookService:
             
             # Montar resposta conforme tipo de comando
             if comando['tipo'] == 'ajuda':
-                resultado['resposta'] = (
-                    '📋 Comandos disponíveis:\n'
-                    '  • status OS-123 → Ver status da OS\n'
-                    '  • cheguei OS-123 → Notificar chegada\n'
-                    '  • concluído OS-123 → Finalizar OS\n'
-                    '  • pausa OS-123 → Pausar OS\n'
-                    '  • retomar OS-123 → Retomar OS\n'
-                    '  • ajuda → Mostrar esta mensagem'
-                )
+                resultado['resposta'] = self._gerar_mensagem_ajuda()
             else:
                 os_num = comando.get('numero_os', '???')
                 respostas = {
@@ -1,5 +1,5 @@
 """Utilitários do sistema."""
 
-from .decorators import login_required, admin_required
+from .decorators import login_required, admin_required, get_current_user_role, save_auth_snapshot
 
-__all__ = ['login_required', 'admin_required']
+__all__ = ['login_required', 'admin_required', 'get_current_user_role', 'save_auth_snapshot']
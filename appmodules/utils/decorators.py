@@ -1,9 +1,45 @@
 """Decoradores de segurança e utilidades."""
 
 from functools import wraps
+from typing import Optional
 from flask import session, redirect, url_for, flash, current_app, request
 
 
+def save_auth_snapshot(usuario, user_service) -> None:
+    """Grava na sessão (assinada) a role resolvida e o carimbo do diretório de usuários."""
+    session['role'] = usuario.role
+    session['auth_versao'] = user_service.carimbo_sessao
+
+
+def get_current_user_role() -> Optional[str]:
+    """Retorna a role do usuário logado.
+
+    Enquanto o carimbo do diretório de usuários não muda, a role vem direto
+    do snapshot da sessão. Quando muda (role alterada, usuário removido,
+    recarga, restart ou requisição atendida por outro worker), a role é
+    resolvida novamente no UserService.
+    """
+    username = session.get('usuario')
+    if not username:
+        return None
+
+    user_service = current_app.config.get('user_service')
+    if not user_service:
+        return None
+
+    if session.get('auth_versao') == user_service.carimbo_sessao and session.get('role'):
+        return session['role']
+
+    user_data = user_service.get_usuario(username)
+    if not user_data:
+        session.pop('role', None)
+        session.pop('auth_versao', None)
+        return None
+
+    save_auth_snapshot(user_data, user_service)
+    return user_data.role
+
+
 def login_required(f):
     """Decorador para proteger rotas que requerem autenticação."""
     @wraps(f)
@@ -22,18 +58,16 @@ def admin_required(f):
         if 'usuario' not in session:
             flash('Por favor, faça login para acessar esta página.', 'warning')
             return redirect(url_for('auth.login'))
-        
-        usuario = session.get('usuario')
+
         user_service = current_app.config.get('user_service')
-        
+
         if not user_service:
             flash('Serviço de usuários não disponível.', 'danger')
             return redirect(url_for('os.homepage'))
-        
-        user_data = user_service.get_usuario(usuario)
-        if not user_data or user_data.role != 'admin':
+
+        if get_current_user_role() != 'admin':
             flash('Acesso negado. Apenas administradores podem acessar.', 'danger')
             return redirect(url_for('os.homepage'))
-        
+
         return f(*args, **kwargs)
     return decorated_function
@@ -0,0 +1,179 @@
+"""
+Codec da programação de centrais (matriz porta × porta).
+
+A programação é gravada na planilha como JSON em um de três formatos:
+`{"selecoes": [...]}`, lista de listas (números 1-based ou marcadores `X`
+por coluna) ou lista de números (uma coluna por linha). Aqui ela vira uma
+matriz booleana NumPy `n × n`: a linha `i` tem `True` nas colunas
+programadas para a porta `i + 1`.
+
+Junto do JSON fica uma forma binária compacta (`n:<base64 do bitset>`),
+que é decodificada direto para a matriz sem interpretar o JSON.
+
+O NumPy só é importado na primeira decodificação (fora da inicialização).
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _numero(valor: Any) -> bool:
+    """True para números e textos numéricos (`'3'`, `'-1'`).
+
+    A checagem é a mesma do formato original e aceita textos que `float()`
+    recusa (`'--3'`, `'²'`); a conversão fica com `_coluna`.
+    """
+    if isinstance(valor, (int, float)):
+        return True
+    return isinstance(valor, str) and valor.strip().lstrip('-').isdigit()
+
+
+def _coluna(valor: Any) -> float:
+    """Coluna 1-based como float; NaN (descartado depois) se não converter."""
+    try:
+        return float(valor)
+    except (TypeError, ValueError, OverflowError):
+        return float('nan')
+
+
+def _colunas_item(item: list) -> np.ndarray:
+    """Colunas (1-based, float) de uma linha em formato lista."""
+    import numpy as np
+
+    if item:
+        # Caso comum: só números JSON; a conversão fica toda no NumPy
+        try:
+            arr = np.asarray(item)
+        except ValueError:
+            arr = None  # listas aninhadas de tamanhos diferentes
+        if arr is not None and arr.ndim == 1 and arr.dtype.kind in 'biuf':
+            return arr.astype(np.float64)
+    if all(_numero(x) for x in item):
+        return np.asarray([_coluna(x) for x in item], dtype=np.float64)
+    # Marcadores 'X' na posição da coluna
+    return np.asarray(
+        [j + 1 for j, v in enumerate(item) if str(v or '').strip().upper() == 'X'], dtype=np.float64)
+
+
+def _linhas_programacao(parsed: Any) -> List[Any]:
+    if isinstance(parsed, dict) and isinstance(parsed.get('selecoes'), list):
+        return parsed['selecoes']
+    if isinstance(parsed, list):
+        return parsed
+    return []
+
+
+def matriz_vazia(total_portas: int) -> np.ndarray:
+    import numpy as np
+
+    n = max(0, int(total_portas or 0))
+    return np.zeros((n, n), dtype=bool)
+
+
+def decodificar_json(programacao_raw: str, total_portas: int) -> np.ndarray:
+    """
+    Matriz da programação a partir do JSON (qualquer um dos três formatos).
+
+    As coordenadas de todas as linhas são coletadas em uma passada e
+    marcadas na matriz de uma vez; colunas fora de `1..total_portas` são
+    ignoradas.
+    """
+    import numpy as np
+
+    matriz = matriz_vazia(total_portas)
+    n = matriz.shape[0]
+    if not programacao_raw or not n:
+        return matriz
+    try:
+        parsed = json.loads(programacao_raw)
+    except Exception:
+        return matriz
+
+    # Colunas coletadas 1-based, como no JSON
+    indices: List[int] = []
+    colunas: List[np.ndarray] = []
+    for i, item in enumerate(_linhas_programacao(parsed)[:n]):
+        if isinstance(item, list):
+            cols = _colunas_item(item)
+        elif _numero(item):
+            cols = np.asarray([_coluna(item)], dtype=np.float64)
+        else:
+            continue
+        indices.append(i)
+        colunas.append(cols)
+
+    if indices:
+        contagens = np.fromiter((len(c) for c in colunas), dtype=np.int64, count=len(colunas))
+        linhas_arr = np.repeat(np.asarray(indices, dtype=np.int64), contagens)
+        colunas_arr = np.trunc(np.concatenate(colunas)) - 1
+        validas = np.isfinite(colunas_arr) & (colunas_arr >= 0) & (colunas_arr < n)
+        matriz[linhas_arr[validas], colunas_arr[validas].astype(np.int64)] = True
+    return matriz
+
+
+@lru_cache(maxsize=16)
+def _rotulos(n: int) -> Tuple[str, ...]:
+    return tuple(str(i + 1) for i in range(n))
+
+
+def resumo_matriz(matriz: np.ndarray) -> str:
+    """Resumo legível da matriz: `'1→2,3; 2→1'` (portas 1-based, linhas vazias omitidas)."""
+    import numpy as np
+
+    linhas, colunas = np.nonzero(matriz)
+    if not len(linhas):
+        return ''
+    rotulos = _rotulos(matriz.shape[1])
+    textos = [rotulos[c] for c in colunas.tolist()]
+    # np.nonzero devolve em ordem de linha: basta cortar onde a linha muda
+    limites = [0] + (np.flatnonzero(np.diff(linhas)) + 1).tolist() + [len(linhas)]
+    return '; '.join(
+        f"{rotulos[linhas[inicio]]}→{','.join(textos[inicio:fim])}"
+        for inicio, fim in zip(limites, limites[1:])
+    )
+
+
+def codificar_bitset(matriz: np.ndarray) -> str:
+    """Forma compacta da matriz: `'<n>:<base64 dos bits>'` (vazio se não houver nada marcado)."""
+    import numpy as np
+
+    if not matriz.size or not matriz.any():
+        return ''
+    bits = np.packbits(matriz.ravel())
+    return f"{matriz.shape[0]}:{base64.b64encode(bits.tobytes()).decode('ascii')}"
+
+
+def decodificar_bitset(texto: str, total_portas: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    Matriz a partir da forma compacta.
+
+    Returns:
+        A matriz, ou None se o texto for inválido ou (quando informado) não
+        corresponder a `total_portas`
+    """
+    import numpy as np
+
+    try:
+        tamanho, dados = str(texto or '').strip().split(':', 1)
+        n = int(tamanho)
+        bits = np.frombuffer(base64.b64decode(dados, validate=True), dtype=np.uint8)
+    except (ValueError, binascii.Error):
+        return None
+    if n <= 0 or len(bits) != (n * n + 7) // 8:
+        return None
+    if total_portas is not None and n != int(total_portas or 0):
+        return None
+    return np.unpackbits(bits, count=n * n).astype(bool).reshape(n, n)
+
+
+def resumo_programacao(programacao_raw: str, total_portas: int) -> str:
+    """Converte JSON de programação em resumo legível: '1→2,3; 2→1'."""
+    return resumo_matriz(decodificar_json(programacao_raw, total_portas))
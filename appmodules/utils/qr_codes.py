@@ -0,0 +1,62 @@
+"""
+Geração de QR codes com cache dos bytes renderizados.
+
+`qrcode` (e o Pillow, usado para renderizar) só é importado no primeiro QR
+gerado, fora do caminho de inicialização da aplicação.
+"""
+
+import hashlib
+import io
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    import qrcode
+
+FORMATOS_QR = {'PNG': 'image/png', 'PDF': 'application/pdf'}
+BOX_SIZE_PADRAO = 10
+BOX_SIZE_MIN = 2
+BOX_SIZE_MAX = 20
+# Data fixa nos metadados do PDF: mesmo QR gera os mesmos bytes (e a mesma ETag) em todos os workers
+_DATA_PDF = time.gmtime(0)
+
+
+def criar_qr(dados: str) -> 'qrcode.QRCode':
+    """Monta a matriz do QR code (sem renderizar imagem)."""
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=BOX_SIZE_PADRAO,
+        border=4,
+    )
+    qr.add_data(dados)
+    qr.make(fit=True)
+    return qr
+
+
+@lru_cache(maxsize=256)
+def renderizar_qr(dados: str, formato: str = 'PNG', box_size: int = BOX_SIZE_PADRAO) -> Tuple[bytes, str]:
+    """
+    Renderiza o QR code e retorna `(bytes, etag)`.
+
+    O resultado é memorizado por (dados, formato, tamanho): a matriz e a
+    codificação PNG/PDF só são refeitas quando um desses valores muda. A
+    ETag é o SHA-256 do conteúdo (forte).
+    """
+    formato = formato.upper()
+    if formato not in FORMATOS_QR:
+        raise ValueError(f"Formato de QR não suportado: {formato}")
+
+    qr = criar_qr(dados)
+    qr.box_size = max(BOX_SIZE_MIN, min(BOX_SIZE_MAX, int(box_size)))
+    img = qr.make_image(fill_color='black', back_color='white')
+    buffer = io.BytesIO()
+    if formato == 'PDF':
+        img.save(buffer, format=formato, creationDate=_DATA_PDF, modDate=_DATA_PDF)
+    else:
+        img.save(buffer, format=formato)
+    conteudo = buffer.getvalue()
+    return conteudo, hashlib.sha256(conteudo).hexdigest()
@@ -0,0 +1,187 @@
+"""
+Folhas de etiquetas QR em PDF (várias etiquetas por página).
+
+As matrizes QR são calculadas em um pool de processos (para lotes grandes)
+e o PDF é gerado página a página como um gerador de bytes, para ser enviado
+em streaming sem montar o documento inteiro em memória.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from appmodules.utils.qr_codes import criar_qr
+
+logger = logging.getLogger(__name__)
+
+# A4 em pontos
+LARGURA_PAGINA = 595.0
+ALTURA_PAGINA = 842.0
+MARGEM = 28.0
+TAMANHO_FONTE = 8.0
+
+# Lotes menores que isto são gerados no próprio processo (o pool não compensa)
+MIN_ETIQUETAS_POOL = 50
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def matriz_qr(dados: str) -> List[List[bool]]:
+    """Matriz de módulos do QR (inclui a borda). Função de módulo para uso no pool."""
+    return criar_qr(dados).get_matrix()
+
+
+def _workers_configurados() -> int:
+    valor = int(os.getenv('QR_LABEL_WORKERS', '2'))
+    return max(0, valor)
+
+
+def _obter_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de processos reutilizado entre requisições (recriado após fork).
+
+    Os processos filhos são criados com `spawn`: um fork a partir de um worker
+    com threads (gthread, verificador de senhas, sincronização) herdaria locks
+    possivelmente travados.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def gerar_matrizes(dados: Sequence[str], workers: Optional[int] = None) -> Iterator[List[List[bool]]]:
+    """Gera as matrizes na ordem de `dados`, no pool de processos quando o lote é grande."""
+    workers = _workers_configurados() if workers is None else workers
+    if workers and len(dados) >= MIN_ETIQUETAS_POOL:
+        try:
+            chunksize = max(1, len(dados) // (workers * 4))
+            yield from _obter_pool(workers).map(matriz_qr, dados, chunksize=chunksize)
+            return
+        except Exception as e:
+            logger.warning(f"Pool de QR indisponível, gerando no processo atual: {e}")
+    for item in dados:
+        yield matriz_qr(item)
+
+
+def _escapar_texto_pdf(texto: str) -> bytes:
+    bruto = texto.encode('cp1252', errors='replace')
+    return bruto.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _ajustar_legenda(texto: str, largura: float) -> str:
+    """Corta a legenda para caber na largura (estimativa de largura média da Helvetica)."""
+    max_chars = max(4, int(largura / (TAMANHO_FONTE * 0.5)))
+    texto = ' '.join(str(texto or '').split())
+    return texto if len(texto) <= max_chars else texto[:max_chars - 1] + '…'
+
+
+def _desenhar_matriz(matriz: List[List[bool]], x: float, y_topo: float, lado: float) -> List[bytes]:
+    """Comandos PDF dos módulos escuros, agrupando módulos consecutivos da mesma linha."""
+    n = len(matriz)
+    modulo = lado / n
+    comandos = []
+    for i, linha in enumerate(matriz):
+        y = y_topo - (i + 1) * modulo
+        j = 0
+        while j < n:
+            if not linha[j]:
+                j += 1
+                continue
+            inicio = j
+            while j < n and linha[j]:
+                j += 1
+            comandos.append(
+                b'%.3f %.3f %.3f %.3f re' % (x + inicio * modulo, y, (j - inicio) * modulo, modulo)
+            )
+    comandos.append(b'f')
+    return comandos
+
+
+def _conteudo_pagina(etiquetas: List[Tuple[List[List[bool]], str]], colunas: int, linhas: int) -> bytes:
+    largura_celula = (LARGURA_PAGINA - 2 * MARGEM) / colunas
+    altura_celula = (ALTURA_PAGINA - 2 * MARGEM) / linhas
+    lado_qr = min(largura_celula, altura_celula - TAMANHO_FONTE * 2.5) * 0.9
+
+    comandos = [b'0 g']
+    for indice, (matriz, legenda) in enumerate(etiquetas):
+        coluna, linha = indice % colunas, indice // colunas
+        x_celula = MARGEM + coluna * largura_celula
+        y_topo = ALTURA_PAGINA - MARGEM - linha * altura_celula
+        x_qr = x_celula + (largura_celula - lado_qr) / 2
+        comandos.extend(_desenhar_matriz(matriz, x_qr, y_topo, lado_qr))
+
+        texto = _ajustar_legenda(legenda, largura_celula - 4)
+        x_texto = x_celula + max(2.0, (largura_celula - len(texto) * TAMANHO_FONTE * 0.5) / 2)
+        y_texto = y_topo - lado_qr - TAMANHO_FONTE * 1.3
+        comandos.append(
+            b'BT /F1 %.1f Tf %.2f %.2f Td (%s) Tj ET' % (TAMANHO_FONTE, x_texto, y_texto, _escapar_texto_pdf(texto))
+        )
+    return b'\n'.join(comandos)
+
+
+def gerar_pdf_etiquetas(etiquetas: Iterable[Tuple[str, str]], colunas: int = 3, linhas: int = 7,
+                        workers: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Gera um PDF A4 com `colunas` x `linhas` etiquetas por página.
+
+    Args:
+        etiquetas: Pares (conteúdo do QR, legenda impressa abaixo)
+
+    Yields:
+        Blocos de bytes do PDF, uma página por vez.
+    """
+    etiquetas = list(etiquetas)
+    por_pagina = max(1, colunas * linhas)
+    matrizes = gerar_matrizes([dados for dados, _ in etiquetas], workers)
+
+    offsets = {}
+    posicao = 0
+
+    def _objeto(numero: int, corpo: bytes) -> bytes:
+        nonlocal posicao
+        offsets[numero] = posicao
+        bloco = b'%d 0 obj\n' % numero + corpo + b'\nendobj\n'
+        posicao += len(bloco)
+        return bloco
+
+    # 1 = catálogo, 2 = árvore de páginas (escrita no final), 3 = fonte
+    cabecalho = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    posicao = len(cabecalho)
+    yield (
+        cabecalho
+        + _objeto(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        + _objeto(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    )
+
+    paginas = []
+    proximo = 4
+    for inicio in range(0, max(1, len(etiquetas)), por_pagina):
+        lote = [(next(matrizes), legenda) for _, legenda in etiquetas[inicio:inicio + por_pagina]]
+        conteudo = _conteudo_pagina(lote, colunas, linhas)
+        numero_pagina, numero_conteudo = proximo, proximo + 1
+        proximo += 2
+        paginas.append(numero_pagina)
+        yield (
+            _objeto(numero_conteudo, b'<< /Length %d >>\nstream\n' % len(conteudo) + conteudo + b'\nendstream')
+            + _objeto(numero_pagina, (
+                b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+            ) % (LARGURA_PAGINA, ALTURA_PAGINA, numero_conteudo))
+        )
+
+    kids = b' '.join(b'%d 0 R' % numero for numero in paginas)
+    final = _objeto(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(paginas)))
+    inicio_xref = posicao
+    xref = [b'xref\n0 %d\n' % proximo, b'0000000000 65535 f \n']
+    xref.extend(b'%010d 00000 n \n' % offsets[numero] for numero in range(1, proximo))
+    yield final + b''.join(xref) + (
+        b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (proximo, inicio_xref)
+    )
@@ -0,0 +1,66 @@
+"""
+Normalização de textos para comparação (cabeçalhos, aliases, status).
+
+`normalizar_texto` remove espaços nas pontas, passa para minúsculas e tira
+acentos pela decomposição NFKD (textos ASCII, a maioria dos cabeçalhos, nem
+chegam a ser decompostos). `normalizar_cabecalho` é a mesma função com memo
+LRU, para os cabeçalhos e aliases que se repetem a cada leitura.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Qualquer caractere que não seja ASCII nem acento combinante (U+0300–U+036F)
+_OUTROS_CARACTERES = re.compile('[^\x00-\x7f\u0300-\u036f]')
+
+
+def normalizar_texto(texto: Any) -> str:
+    """Texto sem espaços nas pontas, minúsculo e sem acentos (`' Código '` → `'codigo'`)."""
+    resultado = str(texto or '').strip().lower()
+    if resultado.isascii():
+        return resultado
+    decomposto = unicodedata.normalize('NFKD', resultado)
+    # Caso comum (letras latinas acentuadas): só ASCII e acentos combinantes após a decomposição
+    if not _OUTROS_CARACTERES.search(decomposto):
+        return decomposto.encode('ascii', 'ignore').decode('ascii')
+    # Demais caracteres (ex.: 'ß', '→') são mantidos; só as marcas de acento saem
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=2048)
+def normalizar_cabecalho(texto: str) -> str:
+    """`normalizar_texto` com memo, para cabeçalhos e aliases (strings repetidas)."""
+    return normalizar_texto(texto)
+
+
+def limpar_cabecalhos(headers: Iterable[Any]) -> List[str]:
+    """Cabeçalhos sem espaços nas pontas; primeira coluna vazia ou `/` vira `ID` (legado)."""
+    limpos = []
+    for idx, header in enumerate(headers):
+        header_text = str(header or '').strip()
+        if idx == 0 and header_text in ('', '/'):
+            header_text = 'ID'
+        limpos.append(header_text)
+    return limpos
+
+
+def mapa_cabecalhos(headers: Iterable[Any]) -> Dict[str, int]:
+    """Cabeçalho normalizado → índice, preservando a PRIMEIRA ocorrência."""
+    mapa: Dict[str, int] = {}
+    for idx, header in enumerate(headers):
+        chave = normalizar_cabecalho(str(header or ''))
+        if chave and chave not in mapa:
+            mapa[chave] = idx
+    return mapa
+
+
+def encontrar_coluna(colunas: Sequence[Any], *aliases: str) -> Optional[Any]:
+    """Primeira coluna (nome original) que corresponde a algum dos aliases."""
+    mapa = mapa_cabecalhos(colunas)
+    for alias in aliases:
+        idx = mapa.get(normalizar_cabecalho(alias))
+        if idx is not None:
+            return colunas[idx]
+    return None
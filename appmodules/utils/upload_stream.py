@@ -0,0 +1,195 @@
+"""Recebimento de uploads multipart em streaming (memória constante por upload)."""
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, IO, Iterable, Optional
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE_BYTES = 64 * 1024
+MAX_CAMPO_BYTES = 64 * 1024
+BYTES_ASSINATURA = 16
+
+# Assinaturas (magic bytes) aceitas por extensão
+_ASSINATURAS = {
+    'pdf': (b'%PDF-',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'docx': (b'PK\x03\x04',),
+    'xlsx': (b'PK\x03\x04',),
+    'doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    'xls': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+}
+
+
+class UploadError(Exception):
+    """Upload recusado; a mensagem pode ser exibida ao usuário."""
+
+    status_code = 400
+
+
+class UploadMuitoGrandeError(UploadError):
+    """Upload excedeu o tamanho máximo permitido."""
+
+    status_code = 413
+
+
+class UploadFormatoError(UploadError):
+    """Extensão não permitida."""
+
+
+@dataclass
+class UploadRecebido:
+    """Arquivo gravado em disco durante o streaming."""
+
+    nome_original: str
+    extensao: str
+    caminho: Path
+    tamanho: int
+    sha256: str
+    campos: Dict[str, str] = field(default_factory=dict)
+
+
+def extensao_arquivo(filename: str) -> str:
+    """Extensão em minúsculas (sem o ponto) ou string vazia."""
+    if '.' not in filename:
+        return ''
+    return filename.rsplit('.', 1)[1].lower()
+
+
+def conteudo_compativel(extensao: str, inicio: bytes) -> bool:
+    """Confere os primeiros bytes do conteúdo com a extensão declarada."""
+    if extensao == 'webp':
+        return inicio[:4] == b'RIFF' and inicio[8:12] == b'WEBP'
+    if extensao == 'txt':
+        return b'\x00' not in inicio
+    assinaturas = _ASSINATURAS.get(extensao)
+    if assinaturas is None:
+        return False
+    return inicio.startswith(assinaturas)
+
+
+def _chunks(stream: IO[bytes], chunk_size: int) -> Iterable[Optional[bytes]]:
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            yield None
+            return
+        yield chunk
+
+
+def receber_upload_stream(stream: IO[bytes], boundary: bytes, destino: Path,
+                          campo_arquivo: str = 'arquivo',
+                          extensoes_permitidas: Optional[Iterable[str]] = None,
+                          max_bytes: int = 10 * 1024 * 1024,
+                          chunk_size: int = CHUNK_SIZE_BYTES,
+                          validar_campos: Optional[Callable[[Dict[str, str]], None]] = None) -> UploadRecebido:
+    """
+    Lê o corpo multipart em blocos de tamanho fixo e grava o arquivo direto em `destino`.
+
+    O SHA-256 é calculado durante a escrita e o limite de tamanho é conferido
+    a cada bloco: o upload é abortado assim que o limite é ultrapassado, sem
+    ler o restante do corpo. O arquivo fica com um nome temporário
+    (`.<uuid>.parcial`); cabe ao chamador renomeá-lo ou descartá-lo.
+
+    Args:
+        validar_campos: Chamado com os campos de texto recebidos antes do
+            arquivo (ex.: token CSRF); deve lançar UploadError para recusar.
+
+    Raises:
+        UploadError: requisição inválida ou conteúdo incompatível com a extensão
+        UploadFormatoError: extensão não permitida
+        UploadMuitoGrandeError: arquivo maior que `max_bytes`
+    """
+    permitidas = {e.lower() for e in (extensoes_permitidas or _ASSINATURAS.keys())}
+    destino.mkdir(parents=True, exist_ok=True)
+
+    decoder = MultipartDecoder(boundary, max_form_memory_size=MAX_CAMPO_BYTES)
+    campos: Dict[str, str] = {}
+    recebido: Optional[UploadRecebido] = None
+    parte_atual = None
+    buffer_campo = []
+    arquivo = None
+    hasher = None
+    inicio = b''
+    tamanho = 0
+    caminho_tmp = destino / f".{uuid.uuid4().hex}.parcial"
+    concluido = False
+
+    def _verificar_inicio():
+        if not conteudo_compativel(extensao, inicio):
+            raise UploadError('O conteúdo do arquivo não corresponde ao formato informado.')
+
+    try:
+        for chunk in _chunks(stream, chunk_size):
+            decoder.receive_data(chunk)
+            evento = decoder.next_event()
+
+            while not isinstance(evento, (NeedData, Epilogue)):
+                if isinstance(evento, File) and evento.name == campo_arquivo and evento.filename \
+                        and recebido is None and arquivo is None:
+                    if validar_campos:
+                        validar_campos(campos)
+                    nome_original = secure_filename(evento.filename)
+                    extensao = extensao_arquivo(nome_original)
+                    if not nome_original or extensao not in permitidas:
+                        raise UploadFormatoError('Formato não permitido.')
+                    parte_atual = evento
+                    arquivo = open(caminho_tmp, 'wb')
+                    hasher = hashlib.sha256()
+                elif isinstance(evento, (Field, File)):
+                    # Campo de texto (ou arquivo extra, descartado)
+                    parte_atual = evento
+                    buffer_campo = []
+                elif isinstance(evento, Data):
+                    if parte_atual is not None and arquivo is not None and parte_atual.name == campo_arquivo:
+                        tamanho += len(evento.data)
+                        if tamanho > max_bytes:
+                            raise UploadMuitoGrandeError('Arquivo muito grande.')
+                        if len(inicio) < BYTES_ASSINATURA:
+                            inicio += evento.data[:BYTES_ASSINATURA - len(inicio)]
+                            if len(inicio) >= BYTES_ASSINATURA:
+                                _verificar_inicio()
+                        hasher.update(evento.data)
+                        arquivo.write(evento.data)
+                        if not evento.more_data:
+                            _verificar_inicio()
+                            arquivo.close()
+                            arquivo = None
+                            recebido = UploadRecebido(
+                                nome_original=nome_original,
+                                extensao=extensao,
+                                caminho=caminho_tmp,
+                                tamanho=tamanho,
+                                sha256=hasher.hexdigest(),
+                                campos=campos,
+                            )
+                    elif isinstance(parte_atual, Field):
+                        buffer_campo.append(evento.data)
+                        if sum(len(b) for b in buffer_campo) > MAX_CAMPO_BYTES:
+                            raise UploadError('Requisição de upload inválida.')
+                        if not evento.more_data:
+                            campos[parte_atual.name] = b''.join(buffer_campo).decode('utf-8', 'replace')
+                evento = decoder.next_event()
+
+            if isinstance(evento, Epilogue):
+                break
+
+        if recebido is None:
+            raise UploadError('Selecione um arquivo para enviar.')
+        concluido = True
+        return recebido
+    except (ValueError, RequestEntityTooLarge):
+        # Corpo multipart malformado ou campo de texto grande demais
+        raise UploadError('Requisição de upload inválida.')
+    finally:
+        if arquivo is not None:
+            arquivo.close()
+        if not concluido and caminho_tmp.exists():
+            os.unlink(caminho_tmp)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Testes do arquivamento das abas que só crescem (histórico e horário).
+"""
+
+import re
+import sys
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from appmodules.services.historico_ferramentas import HistoricoFerramentas
+from appmodules.services.log_archive import ArquivoLog, arquivar_aba
+from appmodules.services.sheets_service import SheetsService
+from test_tempo_funcionario import _FakeAbaHorario
+
+AGORA = datetime(2025, 6, 1)
+
+
+class _FakeAbaLog(_FakeAbaHorario):
+    """Aba em memória com leitura por intervalo (início e fim) e exclusão de linhas."""
+
+    title = 'Log'
+
+    def __init__(self, linhas):
+        super().__init__()
+        self.linhas = [list(l) for l in linhas]
+
+    def get_values(self, intervalo):
+        self.leituras.append(intervalo)
+        inicio, fim = re.match(r'A(\d+):[A-Z]+(\d*)', intervalo).groups()
+        return [list(l) for l in self.linhas[int(inicio) - 1:int(fim) if fim else None]]
+
+    def delete_rows(self, inicio, fim):
+        del self.linhas[inicio - 1:fim]
+
+
+def _aba_historico():
+    linhas = [['Ferramenta', 'Evento', 'Data/Hora', 'Usuário', 'Detalhes']]
+    for i, data in enumerate(['05/01/2024', '20/01/2024', '03/02/2024', '10/02/2024', '01/05/2025', '20/05/2025']):
+        linhas.append(['Serra' if i % 2 else 'Furadeira', 'Edição', f'{data} 10:00:00', 'ana', str(i)])
+    return _FakeAbaLog(linhas)
+
+
+def test_arquivar_aba():
+    """Testa a movida das linhas antigas para partições mensais"""
+    print("\n✅ TESTE 1: Arquivamento da Aba")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        arquivo = ArquivoLog(diretorio, 'historico', formato='csv')
+        aba = _aba_historico()
+        aba.linhas.insert(3, ['', '', '', '', ''])
+        formatos = ('%d/%m/%Y %H:%M:%S',)
+
+        assert arquivar_aba(aba, arquivo, 'data/hora', formatos, 365, agora=AGORA) == 4
+        assert [l[4] for l in aba.linhas[1:]] == ['4', '5']
+        assert arquivo.meses() == ['2024-01', '2024-02'] and arquivo.total == 4
+        assert sorted(p.name for p in arquivo.diretorio.iterdir()) == [
+            '2024-01.csv.gz', '2024-02.csv.gz', 'manifesto.json']
+        assert arquivo.ler()['Detalhes'].tolist() == ['0', '1', '2', '3']
+        assert arquivo.ler('2024-02')['Detalhes'].tolist() == ['2', '3']
+        print("  ✓ Bloco antigo gravado por mês (CSV.gz) e removido da aba")
+
+        versao = arquivo.versao
+        assert arquivar_aba(aba, arquivo, 'Data/Hora', formatos, 365, agora=AGORA) == 0
+        aba.linhas.insert(1, ['Serra', 'Edição', '28/02/2024 10:00:00', 'ana', 'x'])
+        assert arquivar_aba(aba, arquivo, 'Data/Hora', formatos, 365, agora=AGORA) == 1
+        assert arquivo.ler('2024-02')['Detalhes'].tolist() == ['2', '3', 'x'] and arquivo.versao != versao
+        print("  ✓ Nada recente é movido; partição existente recebe as novas linhas")
+
+        aba.linhas.insert(1, ['Serra', 'Edição', '01/01/2023 10:00:00', 'ana', 'y'])
+        aba.get_values = lambda intervalo: [['Serra', 'Edição', '01/01/2023 10:00:00', 'ana', 'alterado']]
+        assert arquivar_aba(aba, arquivo, 'Data/Hora', formatos, 365, agora=AGORA) == 0
+        assert len(aba.linhas) == 4 and arquivo.total == 5
+        print("  ✓ Bloco alterado durante o arquivamento: nada é apagado")
+
+    return True
+
+
+def test_historico_com_arquivo():
+    """Testa a paginação do histórico atravessando a aba e o arquivo"""
+    print("\n✅ TESTE 2: Histórico com Arquivo")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        arquivo = ArquivoLog(diretorio, 'historico', formato='csv')
+        aba = _aba_historico()
+        historico = HistoricoFerramentas(lambda: aba, arquivo)
+        _, cursor_antes = historico.consultar('serra', limit=1)
+        # Outro worker, carregado antes do arquivamento e ainda dentro do TTL
+        outro = HistoricoFerramentas(lambda: aba, ArquivoLog(diretorio, 'historico', formato='csv'))
+        outro.consultar(limit=1)
+
+        arquivar_aba(aba, arquivo, 'Data/Hora', ('%d/%m/%Y %H:%M:%S',), 365, agora=AGORA)
+        historico.marcar_desatualizado(completo=True)
+        pagina, cursor = historico.consultar(limit=3)
+        assert [e['Detalhes'] for e in pagina] == ['5', '4', '3'] and len(historico) == 2
+        pagina, cursor = historico.consultar(limit=3, cursor=cursor)
+        assert [e['Detalhes'] for e in pagina] == ['2', '1', '0'] and cursor is None
+        print("  ✓ Páginas seguem da aba para o arquivo, sem lacunas")
+
+        pagina, cursor = historico.consultar('SERRA', limit=1)
+        assert [e['Detalhes'] for e in pagina] == ['5'] and cursor == cursor_antes
+        pagina, cursor = historico.consultar('serra', limit=5, cursor=cursor)
+        assert [e['Detalhes'] for e in pagina] == ['3', '1'] and cursor is None
+        print("  ✓ Cursor anterior ao arquivamento continua válido")
+
+        pagina, cursor = outro.consultar(limit=3)
+        assert [e['Detalhes'] for e in pagina] == ['5', '4', '3'] and len(outro) == 2
+        pagina, cursor = outro.consultar(limit=3, cursor=cursor)
+        assert [e['Detalhes'] for e in pagina] == ['2', '1', '0'] and cursor is None
+        print("  ✓ Arquivamento de outro worker percebido no início da consulta")
+
+    return True
+
+
+def test_horario_com_arquivo():
+    """Testa o relatório de horário juntando a aba e os meses arquivados"""
+    print("\n✅ TESTE 3: Controle de Horário com Arquivo")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        arquivo = ArquivoLog(diretorio, 'horario', formato='csv')
+        sheets = SheetsService('/nao/existe/credentials.json', 'x', 'OS', 'Horário', 'Usuários', 'Produção',
+                               arquivo_horario=arquivo)
+        aba = _FakeAbaLog([['Data', 'Funcionário', 'Pedido/OS', 'Tipo', 'Horário', 'Observação']])
+        sheets.sheet_horario = aba
+        hoje = datetime.now().strftime('%d/%m/%Y')
+        for data in ('02/01/2020', '03/02/2020', hoje):
+            sheets.add_time_record(data, 'João', '10', 'Entrada', '08:00')
+            sheets.add_time_record(data, 'João', '10', 'Saída', '10:00')
+        versao = sheets.time_records_versao_desde(pd.Timestamp('2020-02-01'))
+
+        assert sheets.arquivar_time_records(365) == 4 and len(aba.linhas) == 3
+        assert len(sheets.get_time_records_df()) == 2
+        assert sheets.time_records_versao_desde(None) == str(sheets.time_records_versao)
+        print("  ✓ Sem data início, só a janela recente da aba")
+
+        df = sheets.get_time_records_df(desde=pd.Timestamp('2020-02-01'))
+        assert len(df) == 4 and str(df['Tipo'].dtype) == 'category'
+        assert df['Horário'].tolist()[0] == pd.Timestamp('2020-02-03 08:00')
+        assert sheets.time_records_versao_desde(pd.Timestamp('2020-02-01')) != versao
+        assert len(sheets.get_time_records_df(desde=pd.Timestamp('2019-01-01'))) == 6
+        print("  ✓ Com data início, meses arquivados desde ela entram antes da aba")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - ARQUIVAMENTO DE LOGS")
+    print("=" * 70)
+
+    testes = [
+        test_arquivar_aba,
+        test_historico_com_arquivo,
+        test_horario_com_arquivo,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Testes do repositório de centrais (aba "Controle de Centrais").
+"""
+
+import re
+import sys
+
+from appmodules.services.centrais_repository import CentraisRepository
+from appmodules.utils.programacao import resumo_programacao
+
+
+class _FakeAba:
+    """Aba em memória que conta as leituras completas."""
+
+    title = 'Centrais'
+
+    def __init__(self, linhas):
+        self.linhas = [list(l) for l in linhas]
+        self.leituras = 0
+        self.ocultas = []
+
+    def get_all_values(self):
+        self.leituras += 1
+        return [list(l) for l in self.linhas]
+
+    def get_all_records(self):
+        return [dict(zip(self.linhas[0], linha)) for linha in self.linhas[1:]]
+
+    def row_values(self, numero):
+        return list(self.linhas[numero - 1])
+
+    def cell(self, numero, coluna):
+        linha = self.linhas[numero - 1] if numero <= len(self.linhas) else []
+        return type('Celula', (), {'value': linha[coluna - 1] if coluna <= len(linha) else ''})()
+
+    def update_cell(self, numero, coluna, valor):
+        linha = self.linhas[numero - 1]
+        linha.extend([''] * (coluna - len(linha)))
+        linha[coluna - 1] = valor
+
+    def hide_columns(self, inicio, fim):
+        self.ocultas.append((inicio, fim))
+
+    def update(self, intervalo, valores):
+        assert intervalo == 'A1'
+        self.linhas[0] = list(valores[0])
+
+    def col_values(self, coluna):
+        self.leituras_coluna = getattr(self, 'leituras_coluna', 0) + 1
+        return [l[coluna - 1] if coluna <= len(l) else '' for l in self.linhas]
+
+    def batch_update(self, dados):
+        self.gravacoes = getattr(self, 'gravacoes', 0) + 1
+        for item in dados:
+            coluna, numero = re.match(r'([A-Z]+)(\d+)', item['range']).groups()
+            idx = ord(coluna) - ord('A')
+            linha = self.linhas[int(numero) - 1]
+            linha.extend([''] * (idx + 1 - len(linha)))
+            linha[idx] = item['values'][0][0]
+
+    def append_row(self, linha):
+        self.linhas.append(list(linha))
+        n = len(self.linhas)
+        return {'updates': {'updatedRange': f"'Centrais'!A{n}:G{n}"}}
+
+    def delete_rows(self, numero):
+        del self.linhas[numero - 1]
+
+
+class _FakePlanilha:
+    def __init__(self, aba):
+        self.aba = aba
+
+    def worksheet(self, nome):
+        return self.aba
+
+
+class _FakeSheets:
+    sheet_id = 'planilha'
+
+    def __init__(self, aba):
+        self.client = self
+        self._planilha = _FakePlanilha(aba)
+
+    def open_by_key(self, chave):
+        return self._planilha
+
+
+def _repositorio():
+    aba = _FakeAba([
+        ['Obra', 'Codigo de Serie', 'Numero de Portas', 'STATUS', 'Data', 'Programacao', 'Programação Resumo'],
+        ['Obra A', 'S-1', '4', 'Em Teste', '01/01/2024', '', ''],
+        ['', '', '', '', '', '', ''],
+        ['Obra B', 'S-2', '2', 'Pronta para Uso', '02/01/2024', '', ''],
+        ['Obra C', 'S-3', '3', 'Utilizada', '03/01/2024', '', ''],
+    ])
+    return CentraisRepository(_FakeSheets(aba), 'Centrais'), aba
+
+
+def test_leitura_em_cache():
+    """Testa a decodificação por cabeçalho e o cache das leituras"""
+    print("\n✅ TESTE 1: Leitura com Cache")
+
+    repo, aba = _repositorio()
+    centrais = repo.listar()
+    assert [c.codigo_serie for c in centrais] == ['S-1', 'S-2', 'S-3']
+    assert [c.linha for c in centrais] == [2, 4, 5]
+    assert centrais[1].como_dict()['Número de Portas'] == '2'
+    assert centrais[0].como_dict()['Obra Utilizada'] == 'Obra A'
+    print("  ✓ Colunas resolvidas pelos aliases, em qualquer ordem")
+
+    assert aba.linhas[0][7] == 'ID' and aba.ocultas == [(7, 8)]
+    assert all(c.id and aba.linhas[c.linha - 1][7] == c.id for c in centrais)
+    assert len({c.id for c in centrais}) == 3 and aba.linhas[2][7:] == []
+    assert centrais[2].como_dict()['ID'] == centrais[2].id
+    print("  ✓ Coluna ID oculta criada e IDs atribuídos às linhas antigas")
+
+    versao = repo.header_versao
+    repo.listar()
+    assert repo.obter(centrais[2].id) is centrais[2]
+    assert aba.leituras == 1
+    repo.listar(force_refresh=True)
+    assert aba.leituras == 2 and repo.header_versao == versao
+    print("  ✓ Leituras seguintes vêm do cache; mapa de cabeçalho reaproveitado")
+
+    return True
+
+
+def test_alteracoes_atualizam_cache():
+    """Testa que status, programação, exclusão e inclusão atualizam o cache"""
+    print("\n✅ TESTE 2: Alterações Sem Reler a Aba")
+
+    repo, aba = _repositorio()
+    id_a, id_b, id_c = [c.id for c in repo.listar()]
+
+    assert repo.atualizar_status(id_b, 'Utilizada', 'Obra Nova')
+    assert aba.linhas[3][:4] == ['Obra Nova', 'S-2', '2', 'Utilizada']
+    assert repo.obter(id_b).status == 'Utilizada'
+    print("  ✓ Status e obra gravados nas colunas certas (linha vazia ignorada)")
+
+    resumo = repo.atualizar_programacao(id_a, '[[2,3],[1]]')
+    assert resumo == resumo_programacao('[[2,3],[1]]', 4) == '1→2,3; 2→1'
+    assert aba.linhas[1][5:7] == ['[[2,3],[1]]', resumo]
+    assert aba.linhas[0][8] == 'Programação Bits' and aba.linhas[1][8].startswith('4:')
+    assert repo.obter(id_a).programacao_resumo == resumo
+    assert repo.obter(id_a).matriz_programacao().sum() == 3
+    print("  ✓ Programação, resumo e forma compacta gravados em uma chamada")
+
+    aba.batch_update = None  # nada mudou: nenhuma gravação
+    assert repo.atualizar_programacao(id_a, '[[2,3],[1]]') == resumo
+    del aba.batch_update
+
+    assert repo.deletar(id_b)
+    assert [c.codigo_serie for c in repo.listar()] == ['S-1', 'S-3']
+    assert repo.obter(id_c).linha == 4 and aba.linhas[3][1] == 'S-3'
+    assert repo.obter(id_b) is None and repo.deletar(id_b) is False
+    print("  ✓ Exclusão desloca as linhas seguintes no mapa de IDs")
+
+    id_d = repo.adicionar('8', 'S-9', 'Em Teste', 'Obra D', '04/01/2024')
+    nova = repo.obter(id_d)
+    assert nova.codigo_serie == 'S-9' and nova.linha == 5
+    assert aba.linhas[4][:5] == ['Obra D', 'S-9', '8', 'Em Teste', '04/01/2024']
+    assert aba.linhas[4][7] == id_d
+    assert repo.atualizar_status('inexistente', 'x', 'y') is False
+    assert aba.leituras == 1
+    print("  ✓ Inclusão entra no cache pela linha retornada pela API")
+
+    return True
+
+
+def test_alteracao_externa_recarrega_mapa():
+    """Testa que linhas deslocadas por outra instância são detectadas antes de gravar"""
+    print("\n✅ TESTE 3: Edição Concorrente")
+
+    repo, aba = _repositorio()
+    id_a, id_b, id_c = [c.id for c in repo.listar()]
+
+    # Outra instância apaga a central S-1: as linhas seguintes sobem
+    del aba.linhas[1]
+    assert repo.atualizar_status(id_c, 'Em Teste', 'Obra X')
+    assert aba.leituras == 2
+    assert aba.linhas[3][:4] == ['Obra X', 'S-3', '3', 'Em Teste']
+    assert aba.linhas[2][:4] == ['Obra B', 'S-2', '2', 'Pronta para Uso']
+    print("  ✓ ID conferido na linha; mapa reconstruído e gravação na linha certa")
+
+    assert repo.deletar(id_a) is False and len(aba.linhas) == 4
+    print("  ✓ Central apagada por outra instância não remove linha alheia")
+
+    return True
+
+
+def test_programacao_em_lote():
+    """Testa a gravação da programação de várias centrais em uma chamada"""
+    print("\n✅ TESTE 4: Programação em Lote")
+
+    repo, aba = _repositorio()
+    id_a, id_b, id_c = [c.id for c in repo.listar()]
+    repo.atualizar_programacao(id_c, '[[2],[1]]')
+    aba.gravacoes = 0
+
+    resultados = repo.atualizar_programacoes({
+        id_a: '[[2,3],[1]]', id_b: '[[2]]', id_c: '[[2],[1]]', 'inexistente': '[]',
+    })
+    assert resultados[id_a] == {'success': True, 'resumo': '1→2,3; 2→1'}
+    assert resultados[id_b] == {'success': True, 'resumo': '1→2'}
+    assert resultados[id_c] == {'success': True, 'resumo': '1→2; 2→1'}
+    assert resultados['inexistente']['success'] is False
+    assert aba.gravacoes == 1 and aba.leituras_coluna == 1 and aba.leituras == 1
+    assert aba.linhas[1][6] == '1→2,3; 2→1' and aba.linhas[3][6] == '1→2'
+    assert repo.obter(id_b).programacao == '[[2]]'
+    print("  ✓ Uma leitura da coluna de ID e uma batch_update; resultado por central")
+
+    del aba.linhas[1]  # outra instância apaga a central A
+    resultados = repo.atualizar_programacoes({id_a: '[]', id_b: '[[1]]'})
+    assert resultados[id_a]['success'] is False and resultados[id_b]['success']
+    assert aba.linhas[2][6] == '1→1' and aba.leituras == 2
+    print("  ✓ Linhas deslocadas por outra instância detectadas antes de gravar")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - CENTRAIS")
+    print("=" * 70)
+
+    testes = [
+        test_leitura_em_cache,
+        test_alteracoes_atualizam_cache,
+        test_alteracao_externa_recarrega_mapa,
+        test_programacao_em_lote,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Testes do repositório de ferramentas (aba "Controle de Ferramentas").
+"""
+
+import sys
+
+from appmodules.services.ferramentas_repository import FerramentasRepository
+from test_centrais import _FakeAba
+
+
+class _FakePlanilha:
+    """Planilha em memória que aplica os pedidos de `batch_update` da API."""
+
+    def __init__(self, abas):
+        self.abas = abas
+        for numero, aba in enumerate(abas.values()):
+            aba.id = numero
+        self.chamadas = 0
+
+    def worksheet(self, nome):
+        return self.abas[nome]
+
+    def batch_update(self, corpo):
+        self.chamadas += 1
+        por_id = {aba.id: aba for aba in self.abas.values()}
+        for pedido in corpo['requests']:
+            tipo, dados = next(iter(pedido.items()))
+            if tipo == 'deleteDimension':
+                intervalo = dados['range']
+                del por_id[intervalo['sheetId']].linhas[intervalo['startIndex']:intervalo['endIndex']]
+                continue
+            valores = [[c['userEnteredValue']['stringValue'] for c in row['values']] for row in dados['rows']]
+            if tipo == 'appendCells':
+                por_id[dados['sheetId']].linhas.extend(valores)
+            else:
+                intervalo = dados['range']
+                linha = por_id[intervalo['sheetId']].linhas[intervalo['startRowIndex']]
+                coluna = intervalo['startColumnIndex']
+                linha.extend([''] * (coluna + 1 - len(linha)))
+                linha[coluna] = valores[0][0]
+
+
+class _FakeSheets:
+    sheet_id = 'planilha'
+
+    def __init__(self, planilha):
+        self.client = self
+        self._planilha = planilha
+
+    def open_by_key(self, chave):
+        return self._planilha
+
+
+def _repositorio():
+    aba = _FakeAba([
+        ['Nome', 'Patrocínio', 'Data de Cadastro', 'Última Manutenção', 'Status', 'Observação', 'Responsável'],
+        ['Furadeira', 'P-01', '01/01/2024', '', 'Disponível', '', 'Ana'],
+        ['Serra', 'P-02', '01/01/2024', '', 'Em Manutenção', 'Lâmina', 'Bruno'],
+        ['Esmeril', 'P-03', '02/01/2024', '', 'Disponível', '', ''],
+    ])
+    historico = _FakeAba([['Ferramenta', 'Evento', 'Data/Hora', 'Usuário', 'Detalhes']])
+    planilha = _FakePlanilha({'Ferramentas': aba, 'Histórico': historico})
+    return FerramentasRepository(_FakeSheets(planilha), 'Ferramentas', 'Histórico'), aba, historico, planilha
+
+
+def test_edicao_e_exclusao_por_id():
+    """Testa edição e exclusão endereçadas pelo ID estável"""
+    print("\n✅ TESTE 1: Edição e Exclusão por ID")
+
+    repo, aba, historico, planilha = _repositorio()
+    furadeira, serra, esmeril = repo.listar()
+    assert aba.linhas[0][7] == 'ID' and serra.id == aba.linhas[2][7]
+    assert serra.como_dict()['Nome'] == 'Serra' and serra.como_dict()['ID'] == serra.id
+    print("  ✓ IDs atribuídos e expostos no dicionário do template")
+
+    anteriores = repo.atualizar(esmeril.id, {'Status': 'Em Manutenção', 'Responsável': 'Carla', 'Nome': 'x'}, 'admin')
+    assert anteriores == {'Status': 'Disponível', 'Responsável': ''}
+    assert aba.linhas[3][:7] == ['Esmeril', 'P-03', '02/01/2024', '', 'Em Manutenção', '', 'Carla']
+    print("  ✓ Só campos editáveis gravados; valores anteriores devolvidos")
+
+    removida = repo.deletar(furadeira.id, 'admin')
+    assert removida.nome == 'Furadeira'
+    assert repo.obter(esmeril.id).linha == 3 and aba.linhas[2][0] == 'Esmeril'
+    assert repo.atualizar(furadeira.id, {'Status': 'x'}, 'admin') is None
+    print("  ✓ Exclusão desloca as linhas seguintes no mapa de IDs")
+
+    novo_id = repo.adicionar({'Nome': 'Lixadeira', 'Patrocínio': 'P-04', 'Status': 'Disponível'}, 'admin')
+    assert repo.obter(novo_id).linha == 4 and aba.linhas[3][7] == novo_id
+    del aba.linhas[1]  # outra instância apaga a Serra
+    assert repo.atualizar(novo_id, {'Observação': 'nova'}, 'admin') == {'Observação': ''}
+    assert aba.linhas[2][0] == 'Lixadeira' and aba.linhas[2][5] == 'nova'
+    assert aba.leituras == 3
+    print("  ✓ Linha deslocada por outra instância detectada antes de gravar")
+
+    return True
+
+
+def test_alteracao_e_historico_em_uma_chamada():
+    """Testa que cada alteração e o seu histórico vão em um único batch_update"""
+    print("\n✅ TESTE 2: Alteração + Histórico")
+
+    repo, aba, historico, planilha = _repositorio()
+    furadeira, serra, _ = repo.listar()
+
+    repo.atualizar(serra.id, {'Status': 'Disponível', 'Observação': 'Lâmina', 'Responsável': ''}, 'maria')
+    assert planilha.chamadas == 1
+    assert aba.linhas[2][4:7] == ['Disponível', 'Lâmina', '']
+    ferramenta, evento, data_hora, usuario, detalhes = historico.linhas[-1]
+    assert (ferramenta, evento, usuario) == ('Serra', 'Edição', 'maria') and len(data_hora) == 19
+    assert detalhes == 'Responsável: Bruno → -, Status: Em Manutenção → Disponível'
+    print("  ✓ Edição: células da ferramenta e linha do histórico juntas")
+
+    repo.deletar(furadeira.id, 'maria')
+    assert planilha.chamadas == 2 and len(aba.linhas) == 3
+    assert historico.linhas[-1][:2] == ['Furadeira', 'Exclusão']
+    print("  ✓ Exclusão: deleteDimension e histórico juntos")
+
+    repo.adicionar({'Nome': 'Lixadeira', 'Patrocínio': 'P-04', 'Status': 'Disponível'}, 'maria')
+    assert planilha.chamadas == 3
+    assert aba.linhas[-1][:5] == ['Lixadeira', 'P-04', '', '', 'Disponível']
+    assert historico.linhas[-1][1] == 'Cadastro' and 'Patrocínio: P-04' in historico.linhas[-1][4]
+    assert [r['Evento'] for r in repo.historico('serra')[0]] == ['Edição']
+    print("  ✓ Cadastro: appendCells nas duas abas em uma chamada")
+
+    return True
+
+
+def test_historico_paginado():
+    """Testa o índice por ferramenta, a paginação e a leitura incremental"""
+    print("\n✅ TESTE 3: Histórico Paginado")
+
+    repo, aba, historico, planilha = _repositorio()
+    for i in range(7):
+        historico.linhas.append(['Serra' if i % 2 else 'Furadeira', 'Edição', f'0{i}/01/2024 10:00:00', 'ana', str(i)])
+    historico.linhas.append(['', '', '', '', ''])
+    historico.get_values = lambda intervalo: (
+        setattr(historico, 'intervalos', getattr(historico, 'intervalos', []) + [intervalo])
+        or [list(l) for l in historico.linhas[int(intervalo[1:intervalo.index(':')]) - 1:]]
+    )
+
+    pagina, cursor = repo.historico(' SERRA ', limit=2)
+    assert [e['Detalhes'] for e in pagina] == ['5', '3'] and cursor is not None
+    pagina, cursor = repo.historico('serra', limit=2, cursor=cursor)
+    assert [e['Detalhes'] for e in pagina] == ['1'] and cursor is None
+    pagina, cursor = repo.historico(limit=3)
+    assert [e['Detalhes'] for e in pagina] == ['6', '5', '4']
+    assert [e['Detalhes'] for e in repo.historico(limit=10, cursor=cursor)[0]] == ['3', '2', '1', '0']
+    assert repo.historico('inexistente') == ([], None)
+    print("  ✓ Mais recente primeiro, por ferramenta, com cursor estável")
+
+    leituras = historico.leituras
+    serra = repo.listar()[1]
+    repo.atualizar(serra.id, {'Status': 'Disponível'}, 'bia')
+    pagina, _ = repo.historico('serra', limit=1)
+    assert pagina[0]['Usuário'] == 'bia' and historico.leituras == leituras
+    assert historico.intervalos == ['A9:E']
+    print("  ✓ Evento novo lido pelo fim da aba, sem reler o histórico")
+
+    historico.linhas[-1][4] = 'editado'
+    repo._historico.marcar_desatualizado()
+    repo.historico()
+    assert historico.leituras == leituras + 1
+    print("  ✓ Última linha alterada: releitura completa")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - FERRAMENTAS")
+    print("=" * 70)
+
+    testes = [
+        test_edicao_e_exclusao_por_id,
+        test_alteracao_e_historico_em_uma_chamada,
+        test_historico_paginado,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
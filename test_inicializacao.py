@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Testes da inicialização em segundo plano (conexão com a planilha e carga
+de usuários) e do /health durante o aquecimento.
+"""
+
+import sys
+import threading
+import time
+
+from flask import Flask
+
+from appmodules.routes.os_routes import os_bp
+from appmodules.services import sheets_service as modulo_sheets
+from appmodules.services.sheets_service import SheetsService
+from appmodules.services.user_service import UserService
+from test_user_service import FakeSheetsUsuarios, _hash
+
+
+class _FakeWorksheet:
+    def __init__(self, titulo):
+        self.title = titulo
+
+    def row_values(self, numero):
+        return [SheetsService.WHATSAPP_HEADER, 'Origem']
+
+
+class _FakeSpreadsheet:
+    """Planilha cujas aberturas de aba demoram, registrando as threads usadas."""
+
+    def __init__(self, liberar):
+        self.liberar = liberar
+        self.threads = set()
+
+    def worksheet(self, titulo):
+        self.threads.add(threading.current_thread().name)
+        self.liberar.wait(5)
+        time.sleep(0.1)
+        return _FakeWorksheet(titulo)
+
+
+class _FakeGspread:
+    def __init__(self, planilha):
+        self.planilha = planilha
+
+    def authorize(self, creds):
+        return self
+
+    def open_by_key(self, chave):
+        return self.planilha
+
+
+class _SheetsSemCredenciais(SheetsService):
+    def _validate_credentials_file(self, creds_file):
+        pass
+
+
+def test_conexao_em_segundo_plano():
+    """Testa a conexão que não bloqueia o construtor e abre as abas em paralelo"""
+    print("\n✅ TESTE 1: Conexão em Segundo Plano")
+
+    liberar = threading.Event()
+    planilha = _FakeSpreadsheet(liberar)
+    originais = modulo_sheets.gspread, modulo_sheets.Credentials
+    modulo_sheets.gspread = _FakeGspread(planilha)
+    modulo_sheets.Credentials = type('Credentials', (), {'from_service_account_file': staticmethod(lambda *a, **k: None)})
+    try:
+        inicio = time.perf_counter()
+        sheets = _SheetsSemCredenciais('creds.json', 'x', 'OS', 'Horário', 'Usuários', 'Produção',
+                                       em_segundo_plano=True)
+        assert time.perf_counter() - inicio < 0.1 and not sheets.pronto
+        print("  ✓ Construtor retorna antes da conexão terminar")
+
+        liberar.set()
+        inicio = time.perf_counter()
+        assert sheets.sheet_horario.title == 'Horário'
+        assert time.perf_counter() - inicio < 0.35 and sheets.pronto
+        assert len(planilha.threads) == 4 and all(t.startswith('sheets-init') for t in planilha.threads)
+        assert sheets.is_available() == (True, None) and sheets.sheet_producao.title == 'Produção'
+        print("  ✓ Leitura de aba espera a conexão; as quatro abas abertas em paralelo")
+    finally:
+        modulo_sheets.gspread, modulo_sheets.Credentials = originais
+
+    sheets = SheetsService('/nao/existe/credentials.json', 'x', 'OS', 'Horário', 'Usuários', 'Produção',
+                           em_segundo_plano=True)
+    assert sheets.is_available() == (False, 'Credenciais não encontradas') and sheets.pronto
+    print("  ✓ Falha na conexão em segundo plano vira erro do serviço")
+
+    return True
+
+
+def test_usuarios_e_health_durante_aquecimento():
+    """Testa a carga de usuários em segundo plano e o /health enquanto inicializa"""
+    print("\n✅ TESTE 2: Usuários e /health no Aquecimento")
+
+    liberar = threading.Event()
+
+    class _SheetsLento(FakeSheetsUsuarios):
+        pronto = False
+
+        def get_usuarios_raw(self):
+            liberar.wait(5)
+            return super().get_usuarios_raw()
+
+    sheets = _SheetsLento([{'Username': 'ana', 'Senha': _hash('senha123'), 'Role': 'admin'}])
+    servico = UserService(sheets, em_segundo_plano=True)
+    assert not servico.pronto
+
+    app = Flask(__name__)
+    app.register_blueprint(os_bp)
+    app.config.update(sheets_service=sheets, user_service=servico)
+    sheets.is_available = lambda: (True, None)
+    cliente = app.test_client()
+
+    resposta = cliente.get('/health')
+    assert resposta.status_code == 503 and resposta.json['status'] == 'starting'
+    sheets.pronto = True
+    assert cliente.get('/health').json['users_ready'] is False
+    print("  ✓ /health responde 503 até a planilha e os usuários estarem prontos")
+
+    threading.Timer(0.1, liberar.set).start()
+    assert servico.get_usuario('ANA').username == 'ana' and servico.pronto
+    resposta = cliente.get('/health')
+    assert resposta.status_code == 200 and resposta.json['ready'] is True
+    print("  ✓ Consulta de usuário espera a carga; depois /health fica pronto")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - INICIALIZAÇÃO")
+    print("=" * 70)
+
+    testes = [
+        test_conexao_em_segundo_plano,
+        test_usuarios_e_health_durante_aquecimento,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Testes da normalização de textos compartilhada (appmodules.utils.text).
+"""
+
+import sys
+
+from appmodules.utils.text import (
+    encontrar_coluna, limpar_cabecalhos, mapa_cabecalhos, normalizar_cabecalho, normalizar_texto
+)
+from benchmark_normalizacao import ALIASES, medir, normalizar_legado
+
+
+def test_normalizacao_compativel():
+    """Testa que a normalização nova cobre a antiga e os casos de cabeçalho"""
+    print("\n✅ TESTE 1: Normalização Compatível")
+
+    for alias in ALIASES + ['  ÁÀÂÃ ÉÊ Í ÓÔÕ Ú Ç  ', 'Observação', 'STATUS']:
+        assert normalizar_texto(alias) == normalizar_legado(alias), alias
+    assert normalizar_texto('Ünïcödé') == 'unicode'
+    assert normalizar_texto('Straße → Ø') == 'straße → ø'
+    assert normalizar_texto(None) == '' and normalizar_texto(7) == '7'
+    print("  ✓ Mesmo resultado da implementação anterior; demais acentos também removidos")
+
+    normalizar_cabecalho.cache_clear()
+    for _ in range(3):
+        assert normalizar_cabecalho('Código de Série') == 'codigo de serie'
+    assert normalizar_cabecalho.cache_info().hits == 2
+    print("  ✓ Cabeçalhos repetidos servidos pelo memo")
+
+    colunas = ['/', ' Nível de prioridade ', 'Status da OS', 'status da os']
+    assert limpar_cabecalhos(colunas) == ['ID', 'Nível de prioridade', 'Status da OS', 'status da os']
+    assert mapa_cabecalhos(colunas)['status da os'] == 2
+    assert encontrar_coluna(colunas, 'Prioridade', 'Nivel de Prioridade') == ' Nível de prioridade '
+    assert encontrar_coluna(colunas, 'Setor') is None
+    print("  ✓ Mapa de cabeçalhos preserva a primeira ocorrência")
+
+    return True
+
+
+def test_benchmark_normalizacao():
+    """Testa que a leitura de aliases com memo é mais rápida que a cadeia de replace"""
+    print("\n✅ TESTE 2: Micro-benchmark")
+
+    legado = medir(normalizar_legado, 500)
+    memo = medir(normalizar_cabecalho, 500)
+    print(f"  ✓ legado {legado * 1000:.2f} ms, memo {memo * 1000:.2f} ms ({legado / memo:.1f}x)")
+    assert memo < legado
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - NORMALIZAÇÃO DE TEXTO")
+    print("=" * 70)
+
+    testes = [
+        test_normalizacao_compativel,
+        test_benchmark_normalizacao,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
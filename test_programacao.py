@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Testes do codec de programação de centrais (matriz porta × porta).
+"""
+
+import sys
+
+from appmodules.utils.programacao import (
+    codificar_bitset, decodificar_bitset, decodificar_json, resumo_matriz, resumo_programacao,
+)
+
+
+def test_formatos_aceitos():
+    """Testa os três formatos de JSON e o resumo"""
+    print("\n✅ TESTE 1: Formatos de Programação")
+
+    assert resumo_programacao('[[2,3],[1]]', 4) == '1→2,3; 2→1'
+    assert resumo_programacao('{"selecoes": [[1, "2"], ["X", "", "x"], 3, "4"]}', 4) == '1→1,2; 2→1,3; 3→3; 4→4'
+    assert resumo_programacao('[2, "3", null, [0.5, 1.9, -1, 99, 2, 2]]', 4) == '1→2; 2→3; 4→1,2'
+    print("  ✓ selecoes, lista de listas (números ou X) e lista de números")
+
+    assert resumo_programacao('[[3,1],[2]]', 2) == '1→1; 2→2'
+    assert resumo_programacao('[[1],[1],[1]]', 2) == '1→1; 2→1'
+    assert resumo_programacao('[[1, [2]], [2]]', 2) == '2→2'
+    for invalido in ('', 'x', '{}', '{"selecoes": 5}', '"1"'):
+        assert resumo_programacao(invalido, 4) == ''
+    print("  ✓ Portas e linhas fora da central e JSON inválido ignorados")
+
+    # Textos que passam na checagem numérica mas que float() recusa: a célula
+    # ruim é ignorada como no formato original, sem derrubar o resumo
+    assert resumo_programacao('[["--3"]]', 4) == ''
+    assert resumo_programacao('["²"]', 4) == ''
+    assert resumo_programacao('[["2", "--3"], ["--1", "X"], "³", [1e400, 4]]', 4) == '1→2; 2→2; 4→4'
+    print("  ✓ Valores numéricos inválidos ignorados, sem exceção")
+
+    matriz = decodificar_json('[[2,3],[1]]', 4)
+    assert matriz.shape == (4, 4) and matriz.sum() == 3 and matriz[0, 1] and matriz[1, 0]
+    assert resumo_matriz(matriz) == '1→2,3; 2→1'
+    print("  ✓ Matriz booleana n × n")
+
+    return True
+
+
+def test_bitset():
+    """Testa a forma compacta (base64 do bitset)"""
+    print("\n✅ TESTE 2: Forma Compacta")
+
+    n = 64
+    raw = '[' + ','.join(str([j + 1 for j in range(n) if (i + j) % 5 == 0]) for i in range(n)) + ']'
+    matriz = decodificar_json(raw, n)
+    compacto = codificar_bitset(matriz)
+    assert compacto.startswith('64:') and len(compacto) < len(raw) / 2
+    assert (decodificar_bitset(compacto, n) == matriz).all()
+    assert resumo_matriz(decodificar_bitset(compacto)) == resumo_programacao(raw, n)
+    print("  ✓ Ida e volta sem perda, bem menor que o JSON")
+
+    assert codificar_bitset(decodificar_json('[]', 4)) == ''
+    assert decodificar_bitset(compacto, 32) is None
+    for invalido in ('', '64', '64:@@', '3:AA==', 'x:AA=='):
+        assert decodificar_bitset(invalido) is None
+    print("  ✓ Texto inválido ou de outro número de portas é recusado")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - PROGRAMAÇÃO DE CENTRAIS")
+    print("=" * 70)
+
+    testes = [
+        test_formatos_aceitos,
+        test_bitset,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Testes da geração de QR codes (cache, ETag e alvos parametrizados).
+"""
+
+import re
+import sys
+
+from flask import Flask
+
+from appmodules.models import Usuario
+from appmodules.routes.os_routes import os_bp
+from appmodules.utils.qr_codes import criar_qr, renderizar_qr
+from appmodules.utils import qr_labels
+from appmodules.utils.qr_labels import gerar_pdf_etiquetas, matriz_qr
+
+
+def _criar_app():
+    app = Flask(__name__)
+    app.secret_key = 'teste'
+    app.register_blueprint(os_bp)
+    return app
+
+
+def test_qr_memorizado_com_etag():
+    """Testa o cache dos bytes renderizados e as respostas condicionais"""
+    print("\n✅ TESTE 1: QR Code Memorizado")
+
+    client = _criar_app().test_client()
+    renderizar_qr.cache_clear()
+
+    primeira = client.get('/qr-formulario.png')
+    assert primeira.status_code == 200 and primeira.mimetype == 'image/png'
+    assert primeira.data.startswith(b'\x89PNG')
+    assert 'public' in primeira.headers['Cache-Control']
+    assert 'max-age=604800' in primeira.headers['Cache-Control']
+    etag = primeira.headers['ETag']
+    assert not etag.startswith('W/'), "ETag deve ser forte"
+
+    segunda = client.get('/qr-formulario.png')
+    assert segunda.data == primeira.data
+    assert renderizar_qr.cache_info().hits == 1
+    print("  ✓ Segunda requisição servida do cache")
+
+    assert client.get('/qr-formulario.png', headers={'If-None-Match': etag}).status_code == 304
+    print("  ✓ If-None-Match responde 304")
+
+    pdf = client.get('/qr-formulario.pdf')
+    assert pdf.status_code == 200 and pdf.data.startswith(b'%PDF')
+    renderizar_qr.cache_clear()
+    assert client.get('/qr-formulario.pdf').headers['ETag'] == pdf.headers['ETag'], \
+        "Mesmo QR deve gerar a mesma ETag (ex.: em outro worker)"
+    print("  ✓ PDF determinístico (mesma ETag após renderizar de novo)")
+
+    return True
+
+
+def test_qr_alvos_parametrizados():
+    """Testa o endpoint de QR para outras páginas do sistema"""
+    print("\n✅ TESTE 2: QR para Alvos Parametrizados")
+
+    client = _criar_app().test_client()
+
+    consulta = client.get('/qr/consultar.png?numero_pedido=42&tamanho=4')
+    assert consulta.status_code == 200 and consulta.mimetype == 'image/png'
+    assert consulta.data != client.get('/qr/consultar.png?numero_pedido=43&tamanho=4').data
+    assert client.get('/qr/upload.pdf').status_code == 200
+    print("  ✓ QR por OS e para outras páginas")
+
+    assert client.get('/qr/externo.png').status_code == 404
+    assert client.get('/qr/consultar.gif').status_code == 404
+    assert client.get('/qr/consultar.png?numero_pedido=<script>').status_code == 400
+    assert client.get('/qr/consultar.png?tamanho=abc').status_code == 400
+    print("  ✓ Alvos, formatos e parâmetros inválidos recusados")
+
+    return True
+
+
+def _validar_pdf(pdf):
+    """Confere a estrutura do PDF: offsets do xref e startxref."""
+    assert pdf.startswith(b'%PDF-1.4') and pdf.rstrip().endswith(b'%%EOF')
+    inicio_xref = int(re.search(rb'startxref\n(\d+)', pdf).group(1))
+    assert pdf[inicio_xref:].startswith(b'xref')
+    entradas = re.findall(rb'(\d{10}) 00000 n ', pdf[inicio_xref:])
+    for numero, offset in enumerate(entradas, start=1):
+        assert pdf[int(offset):].startswith(b'%d 0 obj' % numero), f"Offset inválido do objeto {numero}"
+    return int(re.search(rb'/Type /Pages /Kids \[[^\]]*\] /Count (\d+)', pdf).group(1))
+
+
+class _FakeSheetsOS:
+    def get_os_indexada(self, os_id):
+        if os_id in ('10', '11'):
+            return {'ID': os_id, 'Equipamento ou Local afetado': f'Prensa {os_id}'}
+        return None
+
+
+class _FakeUserService:
+    carimbo_sessao = 'teste:1'
+
+    def get_usuario(self, username):
+        return Usuario(username=username, senha_hash='', role='admin')
+
+
+def test_folha_etiquetas_pdf():
+    """Testa a folha de etiquetas em PDF gerada em streaming"""
+    print("\n✅ TESTE 3: Folha de Etiquetas QR")
+
+    assert matriz_qr('https://exemplo/ferramentas?busca=F-001') == criar_qr('https://exemplo/ferramentas?busca=F-001').get_matrix()
+
+    etiquetas = [(f'https://exemplo/ferramentas?busca=F-{i:03d}', f'Furadeira ({i}) ção') for i in range(60)]
+    blocos = list(gerar_pdf_etiquetas(etiquetas, colunas=3, linhas=7, workers=2))
+    assert len(blocos) == 2 + 3, "Esperado um bloco por página, mais cabeçalho e final"
+    pdf = b''.join(blocos)
+    assert _validar_pdf(pdf) == 3
+    assert b'Furadeira \\(59\\)' in pdf and '\u00e7\u00e3o'.encode('cp1252') in pdf
+    assert qr_labels._pool is not None, "Lote grande deveria usar o pool de processos"
+    assert qr_labels._pool._mp_context.get_start_method() == 'spawn'
+    print("  ✓ 60 etiquetas em 3 páginas, geradas no pool de processos e enviadas por página")
+
+    app = _criar_app()
+    app.config['sheets_service'] = _FakeSheetsOS()
+    app.config['user_service'] = _FakeUserService()
+    app.add_url_rule('/login', endpoint='auth.login', view_func=lambda: 'login')
+    client = app.test_client()
+    with client.session_transaction() as sessao:
+        sessao['usuario'] = 'admin'
+
+    resposta = client.get('/os/etiquetas-qr.pdf?ids=10,%2311,999,10')
+    assert resposta.status_code == 200 and resposta.mimetype == 'application/pdf'
+    assert resposta.is_streamed
+    pdf = resposta.get_data()
+    assert _validar_pdf(pdf) == 1
+    assert pdf.count(b' Tj ET') == 2 and b'OS #11 - Prensa 11' in pdf
+    assert client.get('/os/etiquetas-qr.pdf').status_code == 400
+    assert client.get('/os/etiquetas-qr.pdf?ids=999').status_code == 404
+    print("  ✓ Endpoint de etiquetas de OS em streaming")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - QR CODES")
+    print("=" * 70)
+
+    testes = [
+        test_qr_memorizado_com_etag,
+        test_qr_alvos_parametrizados,
+        test_folha_etiquetas_pdf,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
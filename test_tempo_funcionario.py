@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Testes do relatório de tempo por funcionário (Controle de Horário).
+"""
+
+import re
+import sys
+import time
+
+import pandas as pd
+
+from appmodules.services.sheets_service import SheetsService
+from appmodules.services.time_report_service import TimeReportService, formatar_horas
+
+
+def _batida(data, funcionario, pedido, tipo, horario):
+    return {'Data': data, 'Funcionário': funcionario, 'Pedido/OS': pedido,
+            'Tipo': tipo, 'Horário': horario, 'Observação': ''}
+
+
+class _FakeAbaHorario:
+    """Aba do Controle de Horário em memória, registrando as leituras feitas."""
+
+    def __init__(self):
+        self.linhas = [['Data', 'Funcionário', 'Pedido/OS', 'Tipo', 'Horário', 'Observação']]
+        self.leituras = []
+
+    def get_all_values(self):
+        self.leituras.append('completa')
+        return [list(linha) for linha in self.linhas]
+
+    def get_values(self, intervalo):
+        self.leituras.append(intervalo)
+        inicio = int(re.match(r'A(\d+):', intervalo).group(1))
+        return [list(linha) for linha in self.linhas[inicio - 1:]]
+
+    def append_row(self, linha):
+        self.linhas.append(list(linha))
+
+
+def _ano_de_batidas(funcionarios=20):
+    """Um ano de batidas: cada funcionário com duas sessões por dia útil."""
+    registros = []
+    for dia in pd.bdate_range('2024-01-01', '2024-12-31'):
+        data = dia.strftime('%d/%m/%Y')
+        for f in range(funcionarios):
+            pedido = str(100 + (f + dia.dayofyear) % 15)
+            registros.append(_batida(data, f'Funcionário {f}', pedido, 'Entrada', '08:00'))
+            registros.append(_batida(data, f'Funcionário {f}', pedido, 'Saída', '12:00'))
+            registros.append(_batida(data, f'Funcionário {f}', pedido, 'Entrada', '13:00:00'))
+            registros.append(_batida(data, f'Funcionário {f}', pedido, 'Saída', '17:30:00'))
+    return registros
+
+
+def test_pareamento_entrada_saida():
+    """Testa o pareamento por funcionário/OS e os totais diário e semanal"""
+    print("\n✅ TESTE 1: Pareamento Entrada/Saída")
+
+    registros = [
+        _batida('01/03/2024', 'João', '10', 'Entrada', '08:00'),
+        _batida('01/03/2024', 'Ana', '11', 'Entrada', '08:15'),
+        _batida('01/03/2024', 'João', '#10', 'Saída', '12:30:00'),
+        _batida('01/03/2024', 'João', '12', 'saida', '13:00'),
+        _batida('01/03/2024', 'Ana', '11', 'SAÍDA', '10:15'),
+        _batida('04/03/2024', 'João', '10', 'Entrada', '13:00'),
+        _batida('04/03/2024', 'João', '10', 'Saída', '14:00'),
+        _batida('05/03/2024', 'João', '10', 'Entrada', '08:00'),
+    ]
+    relatorio = TimeReportService().relatorio(registros)
+
+    resumo = {(r['funcionario'], r['pedido_os']): r for r in relatorio.resumo}
+    assert resumo[('João', '10')]['horas'] == 5.5 and resumo[('João', '10')]['sessoes'] == 2
+    assert resumo[('Ana', '11')]['horas'] == 2.0
+    assert ('João', '12') not in resumo
+    assert relatorio.registros_sem_par == 2
+    print("  ✓ Saída fecha a entrada anterior do mesmo funcionário e OS")
+
+    assert {(d['funcionario'], d['data']): d['horas'] for d in relatorio.diario} == {
+        ('João', '04/03/2024'): 1.0, ('João', '01/03/2024'): 4.5, ('Ana', '01/03/2024'): 2.0,
+    }
+    semanas = {(s['funcionario'], s['semana']): s['horas'] for s in relatorio.semanal}
+    assert semanas[('João', '26/02/2024')] == 4.5 and semanas[('João', '04/03/2024')] == 1.0
+    print("  ✓ Totais por dia e por semana (segunda a domingo)")
+
+    filtrado = TimeReportService().relatorio(
+        registros, funcionario='joao', data_inicio=pd.Timestamp('2024-03-02'))
+    assert filtrado.total_horas == 1.0 and filtrado.sessoes == 1
+    assert formatar_horas(5.5) == '5h30'
+    print("  ✓ Filtros por funcionário (sem acento) e período")
+
+    return True
+
+
+def test_cache_por_versao():
+    """Testa que um ano de batidas é agregado rápido e reaproveitado por versão"""
+    print("\n✅ TESTE 2: Cache por Versão dos Dados")
+
+    registros = _ano_de_batidas()
+    servico = TimeReportService()
+
+    inicio = time.perf_counter()
+    relatorio = servico.relatorio(registros, versao='v1')
+    frio = time.perf_counter() - inicio
+    assert relatorio.sessoes == len(registros) // 2
+    assert relatorio.total_horas == len(registros) // 4 * 8.5
+    print(f"  ✓ {len(registros)} batidas pareadas em {frio * 1000:.0f} ms")
+    assert frio < 5, f"Agregação lenta demais: {frio:.2f}s"
+
+    inicio = time.perf_counter()
+    assert servico.relatorio(registros, versao='v1') is relatorio
+    quente = time.perf_counter() - inicio
+    assert servico.relatorio(registros, versao='v1', funcionario='Funcionário 3').sessoes == relatorio.sessoes // 20
+    print(f"  ✓ Mesma versão servida do cache em {quente * 1000:.2f} ms")
+
+    registros.append(_batida('31/12/2024', 'Novo', '999', 'Entrada', '08:00'))
+    registros.append(_batida('31/12/2024', 'Novo', '999', 'Saída', '09:00'))
+    assert servico.relatorio(registros, versao='v2').sessoes == relatorio.sessoes + 1
+    assert TimeReportService.versao_registros(registros) != TimeReportService.versao_registros(registros[:-1])
+    print("  ✓ Nova versão dos dados recalcula o relatório")
+
+    return True
+
+
+def test_cache_registros_horario():
+    """Testa o cache tipado, a sincronização incremental e os índices"""
+    print("\n✅ TESTE 3: Cache do Controle de Horário")
+
+    sheets = SheetsService('/nao/existe/credentials.json', 'x', 'OS', 'Horário', 'Usuários', 'Produção')
+    aba = _FakeAbaHorario()
+    sheets.sheet_horario = aba
+
+    sheets.add_time_record('01/03/2024', 'João', '#10', 'Entrada', '08:00')
+    sheets.add_time_record('01/03/2024', 'João', '10', 'Saída', '12:00:00')
+    assert len(sheets.get_time_records()) == 2 and aba.leituras == ['completa']
+    assert len(sheets.get_time_records()) == 2 and aba.leituras == ['completa']
+    versao = sheets.time_records_versao
+    print("  ✓ Leituras dentro do TTL não acessam a planilha")
+
+    sheets.add_time_record('02/03/2024', 'Ana', '11', 'Entrada', '07:30')
+    df = sheets.get_time_records_df()
+    assert aba.leituras == ['completa', 'A3:F'], aba.leituras
+    assert sheets.time_records_versao == versao + 1
+    assert str(df['Tipo'].dtype) == 'category'
+    assert df['Horário'].tolist()[-1] == pd.Timestamp('2024-03-02 07:30')
+    assert df['Data'].tolist()[0] == pd.Timestamp('2024-03-01')
+    print("  ✓ Após gravar, só as linhas novas são lidas; colunas tipadas")
+
+    assert sheets.get_time_records_por_os('10')['linha'].tolist() == [2, 3]
+    assert sheets.get_time_records_por_funcionario('Ana')['linha'].tolist() == [4]
+    assert sheets.get_time_records_por_funcionario('Ninguém').empty
+    print("  ✓ Consultas por funcionário e por OS pelo índice")
+
+    aba.linhas.pop()
+    aba.linhas[1][4] = '09:00'
+    sheets.get_time_records(use_cache=False)
+    assert aba.leituras[-1] == 'completa'
+    assert sheets.get_time_records_por_funcionario('Ana').empty
+    relatorio = TimeReportService().relatorio(
+        sheets.get_time_records_df(), versao=str(sheets.time_records_versao))
+    assert relatorio.total_horas == 3.0
+    print("  ✓ Edição/remoção na planilha força releitura completa")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - TEMPO POR FUNCIONÁRIO")
+    print("=" * 70)
+
+    testes = [
+        test_pareamento_entrada_saida,
+        test_cache_por_versao,
+        test_cache_registros_horario,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Testes do tempo de importação da aplicação (`python -X importtime`).
+
+A importação a frio de `app` não pode carregar pandas, NumPy, qrcode/Pillow
+nem pywhatkit (importados no primeiro uso) e precisa caber no orçamento
+APP_IMPORT_BUDGET_MS.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+DIRETORIO = Path(__file__).parent
+ORCAMENTO_MS = float(os.getenv('APP_IMPORT_BUDGET_MS', '1500'))
+MODULOS_ADIADOS = ('pandas', 'numpy', 'qrcode', 'PIL', 'pywhatkit', 'pyautogui', 'pyarrow')
+
+
+def _executar(codigo):
+    """Roda `codigo` em um interpretador novo com -X importtime; devolve (stdout, tempos em µs)."""
+    env = dict(os.environ, SECRET_KEY='teste-importacao', SERVICES_INIT_BACKGROUND='true',
+               PYTHONDONTWRITEBYTECODE='1')
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=DIRETORIO, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert resultado.returncode == 0, resultado.stderr[-2000:]
+    tempos = {}
+    for linha in resultado.stderr.splitlines():
+        m = re.match(r'import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$', linha)
+        if m and not m.group(2):  # só módulos de primeiro nível
+            tempos[m.group(3)] = int(m.group(1))
+    return resultado.stdout, tempos
+
+
+def test_importacao_a_frio():
+    """Testa que importar `app` não carrega módulos pesados e cabe no orçamento"""
+    print("\n✅ TESTE 1: Importação a Frio de app")
+
+    _, tempos = _executar('import app')
+    carregados = [m for m in MODULOS_ADIADOS if m in tempos]
+    assert not carregados, f"importados na inicialização: {carregados}"
+    print("  ✓ pandas, NumPy, qrcode/Pillow e pywhatkit fora da inicialização")
+
+    total_ms = tempos['app'] / 1000
+    print(f"  ✓ app importado em {total_ms:.0f} ms (orçamento {ORCAMENTO_MS:.0f} ms)")
+    assert total_ms <= ORCAMENTO_MS
+
+    return True
+
+
+def test_importacao_no_primeiro_uso():
+    """Testa que os módulos adiados são carregados quando usados"""
+    print("\n✅ TESTE 2: Importação no Primeiro Uso")
+
+    saida, _ = _executar(
+        'import sys, app\n'
+        'from appmodules.utils.qr_codes import renderizar_qr\n'
+        'from appmodules.utils.programacao import resumo_programacao\n'
+        'renderizar_qr("x")\n'
+        'print(resumo_programacao("[[2],[1]]", 2))\n'
+        'print(",".join(m for m in ("qrcode", "numpy", "pandas") if m in sys.modules))\n'
+    )
+    resumo, carregados = saida.strip().splitlines()[-2:]
+    assert resumo == '1→2; 2→1'
+    assert carregados == 'qrcode,numpy', carregados
+    print("  ✓ qrcode e NumPy carregados só quando usados; pandas continua fora")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - TEMPO DE IMPORTAÇÃO")
+    print("=" * 70)
+
+    testes = [
+        test_importacao_a_frio,
+        test_importacao_no_primeiro_uso,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Testes do recebimento de documentos em streaming (/upload-documento).
+"""
+
+import hashlib
+import io
+import os
+import re
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from flask import Flask
+from flask_wtf.csrf import CSRFProtect
+
+from appmodules.models import Usuario
+from appmodules.routes.os_routes import os_bp
+from appmodules.services.document_store import DocumentStore
+from appmodules.utils.upload_stream import UploadMuitoGrandeError, receber_upload_stream
+
+BOUNDARY = 'limite-teste'
+PDF = b'%PDF-1.4\n' + b'conteudo de teste ' * 100
+
+
+def _criar_app(root_path):
+    app = Flask(__name__, root_path=root_path, template_folder=os.path.join(os.path.dirname(__file__), 'templates'))
+    app.secret_key = 'teste'
+    csrf = CSRFProtect(app)
+    csrf.exempt('appmodules.routes.os_routes.upload_documento')
+    app.register_blueprint(os_bp)
+    app.add_url_rule('/login', endpoint='auth.login', view_func=lambda: 'login')
+    app.add_url_rule('/logout', endpoint='auth.logout', view_func=lambda: 'logout')
+    return app
+
+
+def _corpo_multipart(csrf_token, nome, conteudo, numero_pedido=None):
+    partes = []
+    if csrf_token is not None:
+        partes.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="csrf_token"\r\n\r\n{csrf_token}\r\n'.encode()
+        )
+    if numero_pedido is not None:
+        partes.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="numero_pedido"\r\n\r\n{numero_pedido}\r\n'.encode()
+        )
+    partes.append(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="arquivo"; filename="{nome}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'.encode() + conteudo + b'\r\n'
+    )
+    partes.append(f'--{BOUNDARY}--\r\n'.encode())
+    return b''.join(partes)
+
+
+def _enviar(client, token, nome, conteudo, numero_pedido=None):
+    return client.post(
+        '/upload-documento',
+        data=_corpo_multipart(token, nome, conteudo, numero_pedido),
+        content_type=f'multipart/form-data; boundary={BOUNDARY}',
+    )
+
+
+def _token(client):
+    html = client.get('/upload-documento').data.decode('utf-8')
+    return re.search(r'name="csrf_token" value="([^"]+)"', html).group(1)
+
+
+class _FakeSheetsOS:
+    """Índice de OS em memória."""
+
+    def __init__(self, ids):
+        self.ids = set(ids)
+
+    def get_os_indexada(self, os_id):
+        return {'ID': os_id} if str(os_id) in self.ids else None
+
+
+class _FakeUserService:
+    carimbo_sessao = 'teste:1'
+
+    def get_usuario(self, username):
+        return Usuario(username=username, senha_hash='', role='admin')
+
+
+class _CorpoGerado(io.RawIOBase):
+    """Stream que gera o corpo multipart sob demanda (sem materializar o arquivo)."""
+
+    def __init__(self, tamanho):
+        self._partes = self._gerar(tamanho)
+        self._resto = b''
+
+    @staticmethod
+    def _gerar(tamanho):
+        yield f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="arquivo"; filename="grande.txt"\r\n\r\n'.encode()
+        for _ in range(tamanho // 65536):
+            yield b'x' * 65536
+        yield f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        while len(self._resto) < n:
+            try:
+                self._resto += next(self._partes)
+            except StopIteration:
+                break
+        dados, self._resto = self._resto[:n], self._resto[n:]
+        return dados
+
+
+def test_upload_streaming():
+    """Testa o upload válido, a deduplicação por SHA-256 e a validação de conteúdo"""
+    print("\n✅ TESTE 1: Upload em Streaming")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _criar_app(tmp)
+        client = app.test_client()
+        objetos_dir = Path(tmp) / 'uploads' / 'documentos' / 'objetos'
+        token = _token(client)
+
+        def _objetos():
+            return [c for c in objetos_dir.rglob('*') if c.is_file()]
+
+        resposta = _enviar(client, token, 'relatorio.pdf', PDF)
+        assert resposta.status_code == 200, resposta.data
+        arquivos = _objetos()
+        assert len(arquivos) == 1 and arquivos[0].read_bytes() == PDF
+        print("  ✓ Arquivo gravado em disco")
+
+        assert _enviar(client, token, 'copia.pdf', PDF).status_code == 200
+        assert len(_objetos()) == 1
+        print("  ✓ Conteúdo duplicado não gera segunda cópia")
+
+        assert _enviar(client, token, 'falso.pdf', b'MZ\x90\x00executavel').status_code == 400
+        assert _enviar(client, token, 'script.exe', PDF).status_code == 400
+        print("  ✓ Extensão e conteúdo (magic bytes) validados")
+
+        assert _enviar(client, None, 'sem_token.pdf', PDF).status_code == 400
+        print("  ✓ Upload sem token CSRF recusado")
+
+        resposta = _enviar(client, token, 'grande.pdf', b'%PDF-' + b'0' * (10 * 1024 * 1024))
+        assert resposta.status_code == 413
+        assert len(_objetos()) == 1
+        assert not list((Path(tmp) / 'uploads' / 'documentos' / 'tmp').iterdir()), \
+            "Arquivo parcial não pode ficar em disco"
+        print("  ✓ Upload acima de 10 MB abortado sem deixar arquivo parcial")
+
+        # Sem Content-Length (chunked, já decodificado pelo servidor): o limite é
+        # aplicado durante o streaming
+        grande = _corpo_multipart(token, 'grande.pdf', b'%PDF-' + b'0' * (10 * 1024 * 1024))
+        resposta = client.post('/upload-documento', input_stream=io.BytesIO(grande),
+                               headers={'Transfer-Encoding': 'chunked'},
+                               environ_overrides={'wsgi.input_terminated': True},
+                               content_type=f'multipart/form-data; boundary={BOUNDARY}')
+        assert resposta.status_code == 413, resposta.status_code
+        assert not list((Path(tmp) / 'uploads' / 'documentos' / 'tmp').iterdir())
+        print("  ✓ Limite no streaming também responde 413")
+
+    return True
+
+
+def test_upload_memoria_constante():
+    """Testa que o pico de memória não cresce com o tamanho do arquivo"""
+    print("\n✅ TESTE 2: Memória Constante no Upload")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        destino = Path(tmp)
+        tracemalloc.start()
+        recebido = receber_upload_stream(_CorpoGerado(8 * 1024 * 1024), BOUNDARY.encode(), destino,
+                                         extensoes_permitidas={'txt'})
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert recebido.tamanho == 8 * 1024 * 1024
+        assert recebido.caminho.stat().st_size == recebido.tamanho
+        print(f"  ✓ 8 MB recebidos com pico de {pico / 1024:.0f} KB")
+        assert pico < 1024 * 1024, f"Pico de memória alto demais: {pico} bytes"
+        recebido.caminho.unlink()
+
+        try:
+            receber_upload_stream(_CorpoGerado(2 * 1024 * 1024), BOUNDARY.encode(), destino,
+                                  extensoes_permitidas={'txt'}, max_bytes=1024 * 1024)
+            assert False, "Deveria abortar acima do limite"
+        except UploadMuitoGrandeError:
+            pass
+        assert not list(destino.iterdir()), "Arquivo parcial não pode ficar em disco"
+        print("  ✓ Limite de tamanho verificado durante o streaming")
+
+    return True
+
+
+def test_armazenamento_por_conteudo():
+    """Testa o armazenamento endereçado por conteúdo e o índice SQLite"""
+    print("\n✅ TESTE 3: Armazenamento Endereçado por Conteúdo")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        (base / '20240105_101500_antigo.pdf').write_bytes(PDF)
+        (base / '20240106_090000_reenviado.pdf').write_bytes(PDF)
+
+        store = DocumentStore(base)
+        assert (base / '20240105_101500_antigo.pdf').exists(), "Abrir o armazenamento não importa nada"
+        assert store.importar_arquivos_legados() == 2
+        assert not (base / '20240105_101500_antigo.pdf').exists()
+        documentos = store.buscar_por_sha256(hashlib.sha256(PDF).hexdigest())
+        assert [d.nome_original for d in documentos] == ['antigo.pdf']
+        assert len([c for c in store.objetos_dir.rglob('*') if c.is_file()]) == 1
+        print("  ✓ Arquivos legados importados e deduplicados")
+
+        def _receber(conteudo):
+            caminho = store.tmp_dir / 'upload.parcial'
+            caminho.write_bytes(conteudo)
+            return caminho, hashlib.sha256(conteudo).hexdigest(), len(conteudo)
+
+        caminho, sha256, tamanho = _receber(b'%PDF-outro documento')
+        documento, novo = store.armazenar(caminho, sha256, tamanho, 'outro.pdf')
+        assert novo and documento.mime == 'application/pdf'
+        assert store.obter(documento.id).nome_original == 'outro.pdf'
+        assert store.caminho_objeto(sha256).read_bytes() == b'%PDF-outro documento'
+
+        caminho, sha256, tamanho = _receber(b'%PDF-outro documento')
+        repetido, novo = store.armazenar(caminho, sha256, tamanho, 'outro-nome.pdf')
+        assert not novo and repetido.id == documento.id
+        assert not caminho.exists()
+        print("  ✓ Reenvio do mesmo conteúdo reaproveita objeto e registro")
+
+        assert [d.nome_original for d in store.listar(limite=1)] == ['outro.pdf']
+        assert len(store.listar()) == 2
+        print("  ✓ Listagem pelo índice, sem varrer o diretório")
+
+    return True
+
+
+def test_anexos_vinculados_a_os():
+    """Testa o vínculo de documentos a OS e o download com Range/ETag"""
+    print("\n✅ TESTE 4: Anexos Vinculados a OS")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _criar_app(tmp)
+        app.config['sheets_service'] = _FakeSheetsOS({'42', '43'})
+        app.config['user_service'] = _FakeUserService()
+        client = app.test_client()
+        token = _token(client)
+
+        resposta = _enviar(client, token, 'orcamento.pdf', PDF, numero_pedido='42')
+        assert resposta.status_code == 200 and '#42' in resposta.data.decode('utf-8')
+        assert _enviar(client, token, 'foto.png', b'\x89PNG\r\n\x1a\n' + b'0' * 64, numero_pedido='#42').status_code == 200
+        assert _enviar(client, token, 'laudo.pdf', PDF, numero_pedido='43').status_code == 200
+        print("  ✓ Documentos vinculados ao número do pedido")
+
+        assert _enviar(client, token, 'x.pdf', b'%PDF-inexistente', numero_pedido='999').status_code == 400
+        store = app.config['document_store']
+        assert not list(store.tmp_dir.iterdir())
+        assert store.contar_por_pedidos(['42', '43', '999', '']) == {'42': 2, '43': 1}
+        print("  ✓ Pedido inexistente recusado antes de gravar; contagem em lote por OS")
+
+        assert client.get('/os/42/anexos').status_code == 302, "Lista de anexos exige admin"
+        with client.session_transaction() as sessao:
+            sessao['usuario'] = 'admin'
+
+        anexos = client.get('/os/42/anexos').get_json()['anexos']
+        assert [a['nome'] for a in anexos] == ['orcamento.pdf', 'foto.png']
+
+        url = anexos[0]['url']
+        completo = client.get(url)
+        assert completo.status_code == 200 and completo.data == PDF
+        parcial = client.get(url, headers={'Range': 'bytes=0-4'})
+        assert parcial.status_code == 206 and parcial.data == b'%PDF-'
+        assert client.get(url, headers={'If-None-Match': completo.headers['ETag']}).status_code == 304
+        assert client.get(url.replace('/42/', '/43/')).status_code == 404
+        print("  ✓ Download com Range, ETag e verificação do vínculo")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - UPLOAD DE DOCUMENTOS")
+    print("=" * 70)
+
+    testes = [
+        test_upload_streaming,
+        test_upload_memoria_constante,
+        test_armazenamento_por_conteudo,
+        test_anexos_vinculados_a_os,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+Testes do UserService usando uma planilha de usuários em memória
+(sem acesso ao Google Sheets).
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask, session
+from flask_wtf.csrf import CSRFProtect
+
+from appmodules.models import Usuario
+from appmodules.services.password_verifier import PasswordVerifier, VerificadorSaturadoError
+from appmodules.services.sheets_service import SheetsService
+from appmodules.services.user_directory_sync import UserDirectorySync
+from appmodules.services.user_service import UserService
+from appmodules.utils import admin_required, get_current_user_role, save_auth_snapshot
+
+
+class FakeSheetsUsuarios:
+    """Simula a aba de usuários do SheetsService em memória."""
+
+    def __init__(self, linhas=None):
+        self.linhas = [dict(linha) for linha in (linhas or [])]
+        self.usuarios_error = None
+        self.usuarios_last_row = None
+        self.chamadas = []
+
+    def get_usuarios_raw(self):
+        self.chamadas.append('get_usuarios_raw')
+        return [dict(linha) for linha in self.linhas]
+
+    def get_usuario_row(self, row_id):
+        self.chamadas.append('get_usuario_row')
+        if not 2 <= row_id <= len(self.linhas) + 1:
+            return None
+        return dict(self.linhas[row_id - 2])
+
+    def update_usuario(self, row_id, username, senha, role, data_cadastro=''):
+        self.chamadas.append('update_usuario')
+        self.linhas[row_id - 2].update({'Username': username, 'Senha': senha, 'Role': role,
+                                        'Data de Cadastro': data_cadastro})
+        return True
+
+    def update_usuarios_senhas(self, senhas_por_linha):
+        self.chamadas.append('update_usuarios_senhas')
+        for row_id, senha in senhas_por_linha.items():
+            self.linhas[row_id - 2]['Senha'] = senha
+        return True
+
+    def add_usuario(self, username, senha, role):
+        self.chamadas.append('add_usuario')
+        self.linhas.append({'Username': username, 'Senha': senha, 'Role': role, 'Data de Cadastro': ''})
+        self.usuarios_last_row = len(self.linhas) + 1
+        return True
+
+    def tombstone_usuario_row(self, row_id):
+        self.chamadas.append('tombstone_usuario_row')
+        self.linhas[row_id - 2] = {'Username': '', 'Senha': '', 'Role': '#removido', 'Data de Cadastro': ''}
+        return True
+
+    def delete_usuario_row(self, row_id):
+        self.chamadas.append('delete_usuario_row')
+        del self.linhas[row_id - 2]
+        return True
+
+    def delete_usuario(self, username):
+        self.chamadas.append('delete_usuario')
+        for i, linha in enumerate(self.linhas):
+            if linha['Username'] == username:
+                del self.linhas[i]
+                return True
+        return False
+
+
+def _hash(senha):
+    return Usuario.criar('x', senha).senha_hash
+
+
+def test_indice_username_case_insensitive():
+    """Testa o índice normalizado de usernames"""
+    print("\n✅ TESTE 1: Índice de Usernames")
+
+    sheets = FakeSheetsUsuarios([
+        {'Username': 'Admin', 'Senha': _hash('senha123'), 'Role': 'admin'},
+        {'Username': 'operador1', 'Senha': _hash('senha123'), 'Role': 'operador'},
+    ])
+    service = UserService(sheets)
+
+    assert service.get_usuario('admin').username == 'Admin'
+    assert service.get_usuario('  ADMIN ').username == 'Admin'
+    assert service.get_usuario('Operador1').role == 'operador'
+    assert service.get_usuario('inexistente') is None
+    assert service.get_usuario('') is None
+    print("  ✓ Lookup sem diferenciar maiúsculas")
+
+    assert service.criar_usuario('NovoUser', 'senha123', 'operador')
+    assert service.get_usuario('novouser').username == 'NovoUser'
+    assert not service.criar_usuario('novouser', 'outra123', 'operador')
+    print("  ✓ Índice atualizado ao criar usuário")
+
+    assert service.atualizar_usuario('NOVOUSER', role='visualizador')
+    assert service.get_usuario('novouser').role == 'visualizador'
+    print("  ✓ Índice consistente ao atualizar usuário")
+
+    assert service.deletar_usuario('novouser')
+    assert service.get_usuario('NovoUser') is None
+    assert 'NovoUser' not in {u.username for u in service.get_todos_usuarios()}
+    print("  ✓ Índice atualizado ao deletar usuário")
+
+    sheets.linhas.append({'Username': 'Recarregado', 'Senha': _hash('senha123'), 'Role': 'admin'})
+    service.recarregar()
+    assert service.get_usuario('recarregado') is not None
+    print("  ✓ Índice reconstruído ao recarregar")
+
+    return True
+
+
+def test_lookup_tempo_constante():
+    """Testa que o lookup não cresce com a quantidade de usuários"""
+    print("\n✅ TESTE 2: Lookup em Tempo Constante")
+
+    senha_hash = _hash('senha123')
+    sheets = FakeSheetsUsuarios([
+        {'Username': f'usuario{i}', 'Senha': senha_hash, 'Role': 'operador'}
+        for i in range(5000)
+    ])
+    service = UserService(sheets)
+
+    inicio = time.perf_counter()
+    for _ in range(10000):
+        service.get_usuario('USUARIO4999')
+    total_ms = (time.perf_counter() - inicio) * 1000
+
+    print(f"  ✓ 10000 lookups com 5000 usuários: {total_ms:.2f} ms")
+    assert total_ms < 500, f"Lookup lento demais: {total_ms:.2f} ms"
+
+    return True
+
+
+def test_snapshot_autorizacao_sessao():
+    """Testa o snapshot de role na sessão e a revogação por versão"""
+    print("\n✅ TESTE 3: Snapshot de Autorização na Sessão")
+
+    sheets = FakeSheetsUsuarios([
+        {'Username': 'chefe', 'Senha': _hash('senha123'), 'Role': 'admin'},
+    ])
+    service = UserService(sheets)
+
+    app = Flask(__name__)
+    app.secret_key = 'teste'
+    app.config['user_service'] = service
+
+    @app.route('/login-teste')
+    def login_teste():
+        usuario = service.get_usuario('chefe')
+        session['usuario'] = usuario.username
+        save_auth_snapshot(usuario, service)
+        return 'ok'
+
+    @app.route('/admin-teste')
+    @admin_required
+    def admin_teste():
+        return 'admin ok'
+
+    app.add_url_rule('/', endpoint='os.homepage', view_func=lambda: 'home')
+    app.add_url_rule('/login', endpoint='auth.login', view_func=lambda: 'login')
+
+    chamadas_lookup = []
+    get_usuario_original = service.get_usuario
+
+    def get_usuario_contado(username):
+        chamadas_lookup.append(username)
+        return get_usuario_original(username)
+
+    client = app.test_client()
+    client.get('/login-teste')
+    service.get_usuario = get_usuario_contado
+
+    for _ in range(5):
+        assert client.get('/admin-teste').data == b'admin ok'
+    assert chamadas_lookup == [], f"Lookups inesperados: {chamadas_lookup}"
+    print("  ✓ Rotas admin autorizadas só pela sessão")
+
+    service.get_usuario = get_usuario_original
+    assert service.atualizar_usuario('chefe', role='operador')
+    resposta = client.get('/admin-teste')
+    assert resposta.status_code == 302, "Rebaixamento de role deveria valer imediatamente"
+    print("  ✓ Mudança de role revoga o snapshot imediatamente")
+
+    with app.test_request_context():
+        session['usuario'] = 'chefe'
+        session['role'] = 'admin'
+        session['auth_versao'] = service.carimbo_sessao
+        assert get_current_user_role() == 'admin'
+        service.deletar_usuario('chefe')
+        assert get_current_user_role() is None
+    print("  ✓ Exclusão de usuário revoga o snapshot")
+
+    # Restart: o contador local recomeça igual, o carimbo acompanha o diretório
+    sheets.linhas[0].update({'Username': 'chefe', 'Senha': _hash('senha123'), 'Role': 'admin'})
+    antes_restart = UserService(sheets)
+    with app.test_request_context():
+        session['usuario'] = 'chefe'
+        save_auth_snapshot(antes_restart.get_usuario('chefe'), antes_restart)
+        carimbo = session['auth_versao']
+
+    # Outro worker com o mesmo diretório aceita o snapshot sem consultar o usuário
+    outro_worker = UserService(sheets)
+    assert outro_worker.carimbo_sessao == carimbo
+    outro_worker.get_usuario = lambda username: None
+    app.config['user_service'] = outro_worker
+    with app.test_request_context():
+        session.update({'usuario': 'chefe', 'role': 'admin', 'auth_versao': carimbo})
+        assert get_current_user_role() == 'admin'
+    print("  ✓ Snapshot de um worker vale nos demais (mesmo carimbo)")
+
+    sheets.linhas[0]['Role'] = 'operador'  # rebaixado enquanto o processo estava parado
+    depois_restart = UserService(sheets)
+    assert depois_restart.versao == antes_restart.versao
+    app.config['user_service'] = depois_restart
+    with app.test_request_context():
+        session.update({'usuario': 'chefe', 'role': 'admin', 'auth_versao': carimbo})
+        assert get_current_user_role() == 'operador'
+        assert session['auth_versao'] == depois_restart.carimbo_sessao
+    print("  ✓ Snapshot de antes do restart não é aceito pelo novo processo")
+
+    return True
+
+
+def test_sincronizacao_entre_workers():
+    """Testa a propagação de alterações entre workers via changelog SQLite"""
+    print("\n✅ TESTE 4: Sincronização entre Workers")
+
+    sheets = FakeSheetsUsuarios([
+        {'Username': 'chefe', 'Senha': _hash('senha123'), 'Role': 'admin'},
+    ])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'usuarios.sqlite3')
+        worker_1 = UserService(sheets, directory_sync=UserDirectorySync(db_path))
+        worker_2 = UserService(sheets, directory_sync=UserDirectorySync(db_path))
+
+        assert worker_1.criar_usuario('tecnico', 'senha123', 'operador')
+        assert worker_2.get_usuario('tecnico') is None
+
+        leituras_antes = sheets.chamadas.count('get_usuarios_raw')
+        worker_2.sincronizar()
+        assert worker_2.get_usuario('tecnico').role == 'operador'
+        assert worker_2.get_usuario('tecnico').verificar_senha('senha123')
+        assert sheets.chamadas.count('get_usuarios_raw') == leituras_antes, "Não deveria reler a aba inteira"
+        print("  ✓ Usuário criado em um worker aparece no outro sem reler a planilha")
+
+        versao_antes = worker_2.versao
+        carimbo_antes = worker_2.carimbo_sessao
+        assert worker_1.atualizar_usuario('chefe', role='operador')
+        worker_2.sincronizar()
+        assert worker_2.get_usuario('chefe').role == 'operador'
+        assert worker_2.versao > versao_antes, "Mudança de role deve invalidar snapshots de sessão"
+        assert worker_2.carimbo_sessao != carimbo_antes
+        assert worker_2.carimbo_sessao == worker_1.carimbo_sessao, "Workers sincronizados compartilham o carimbo"
+        print("  ✓ Mudança de role propagada e versão incrementada")
+
+        assert worker_2.deletar_usuario('tecnico')
+        worker_1.sincronizar()
+        assert worker_1.get_usuario('tecnico') is None
+        print("  ✓ Exclusão propagada")
+
+        versao_antes = worker_1.versao
+        worker_1.sincronizar()
+        assert worker_1.versao == versao_antes
+        print("  ✓ Sem alterações, sincronizar não faz nada")
+
+        sheets.linhas.append({'Username': 'legado', 'Senha': 'texto-plano', 'Role': 'operador'})
+        worker_1.recarregar()
+        worker_2.sincronizar()
+        assert worker_2.atualizar_usuario('legado', role='visualizador')
+        assert Usuario.is_hash_valido(sheets.linhas[-1]['Senha'])
+        worker_1.sincronizar()
+        assert worker_1.get_usuario('legado').role == 'visualizador'
+        assert worker_1.get_usuario('legado').verificar_senha('texto-plano')
+        with sqlite3.connect(db_path) as conn:
+            colunas = [row[1] for row in conn.execute('PRAGMA table_info(usuarios_changelog)')]
+            eventos = conn.execute('SELECT * FROM usuarios_changelog').fetchall()
+        assert colunas == ['seq', 'operacao', 'username', 'linha', 'criado_em']
+        assert not any('texto-plano' in str(e) or 'pbkdf2' in str(e) for e in eventos)
+        print("  ✓ Changelog sem senha/hash; senha legada regravada já como hash")
+
+    return True
+
+
+def test_migracao_senhas_legadas_em_background():
+    """Testa a migração de senhas legadas fora do boot, em um único batch"""
+    print("\n✅ TESTE 5: Migração de Senhas Legadas")
+
+    sheets = FakeSheetsUsuarios([
+        {'Username': 'antigo1', 'Senha': 'senha-legada-1', 'Role': 'admin'},
+        {'Username': 'moderno', 'Senha': _hash('senha123'), 'Role': 'admin'},
+        {'Username': 'antigo2', 'Senha': 'senha-legada-2', 'Role': 'operador'},
+    ])
+    service = UserService(sheets)
+
+    # Boot não espera a migração: usuários legados ficam pendentes e ainda fazem login
+    antigo = service.get_usuario('antigo1')
+    assert antigo.verificar_senha('senha-legada-1')
+    assert not antigo.verificar_senha('errada')
+    assert 'update_usuario' not in sheets.chamadas, "Não deveria haver uma escrita por usuário"
+    print("  ✓ Usuários legados carregados como migração pendente")
+
+    service._migracao_thread.join(timeout=60)
+    assert sheets.chamadas.count('update_usuarios_senhas') == 1
+    for username, senha in (('antigo1', 'senha-legada-1'), ('antigo2', 'senha-legada-2')):
+        usuario = service.get_usuario(username)
+        assert not usuario.migracao_pendente
+        assert Usuario.is_hash_valido(usuario.senha_hash)
+        assert usuario.verificar_senha(senha)
+    assert all(Usuario.is_hash_valido(linha['Senha']) for linha in sheets.linhas)
+    print("  ✓ Senhas migradas em uma única escrita em lote")
+
+    sheets = FakeSheetsUsuarios([
+        {'Username': 'antigo1', 'Senha': 'senha-legada-1', 'Role': 'admin'},
+        {'Username': 'antigo2', 'Senha': 'senha-legada-2', 'Role': 'operador'},
+    ])
+    senha_nova = _hash('trocada-no-outro-worker')
+
+    class _WorkerConcorrente(UserService):
+        def _gerar_hashes(self, senhas):
+            # Enquanto os hashes são gerados, outro worker troca a senha de antigo2
+            sheets.linhas[1]['Senha'] = senha_nova
+            return super()._gerar_hashes(senhas)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'usuarios.sqlite3')
+        outro = UserDirectorySync(db_path)
+        assert outro.adquirir_lease(UserService.LEASE_MIGRACAO, 'outro-worker', 60)
+        worker_2 = UserService(sheets, directory_sync=UserDirectorySync(db_path))
+        worker_2._migracao_thread.join(timeout=60)
+        assert 'update_usuarios_senhas' not in sheets.chamadas
+        assert worker_2.get_usuario('antigo1').migracao_pendente
+        outro.liberar_lease(UserService.LEASE_MIGRACAO, 'outro-worker')
+        print("  ✓ Sem a lease, o worker não migra")
+
+        worker_1 = _WorkerConcorrente(sheets, directory_sync=UserDirectorySync(db_path))
+        worker_1._migracao_thread.join(timeout=60)
+        assert sheets.chamadas.count('update_usuarios_senhas') == 1
+        assert sheets.linhas[1]['Senha'] == senha_nova, "Senha trocada por outro worker não pode ser revertida"
+        assert Usuario.is_hash_valido(sheets.linhas[0]['Senha'])
+        assert outro.adquirir_lease(UserService.LEASE_MIGRACAO, 'outro-worker', 60), "Lease deveria ser liberada"
+        print("  ✓ Linha conferida antes da escrita; senha alterada no meio é preservada")
+
+        worker_2.sincronizar()
+        antigo1 = worker_2.get_usuario('antigo1')
+        assert not antigo1.migracao_pendente and antigo1.verificar_senha('senha-legada-1')
+        assert sheets.chamadas.count('update_usuarios_senhas') == 1
+        print("  ✓ Demais workers recebem as senhas migradas pelo changelog")
+
+    return True
+
+
+def test_mapa_linhas_sem_releitura():
+    """Testa que mutações usam o mapa de linhas e fazem uma única escrita"""
+    print("\n✅ TESTE 6: Mapa de Linhas de Usuários")
+
+    senha_hash = _hash('senha123')
+    for modo in ('tombstone', 'delete_rows'):
+        sheets = FakeSheetsUsuarios([
+            {'Username': f'usuario{i}', 'Senha': senha_hash, 'Role': 'operador',
+             'Data de Cadastro': '01/01/2024'}
+            for i in range(5)
+        ])
+        service = UserService(sheets)
+        service.modo_exclusao = modo
+        sheets.chamadas.clear()
+
+        assert service.atualizar_usuario('usuario3', role='admin')
+        assert sheets.linhas[3]['Role'] == 'admin'
+        assert sheets.linhas[3]['Data de Cadastro'] == '01/01/2024', "Data de cadastro não pode ser apagada"
+
+        assert service.deletar_usuario('usuario1')
+        assert service.criar_usuario('novo', 'senha123', 'operador')
+        assert service.atualizar_usuario('novo', role='visualizador')
+        assert service.atualizar_usuario('usuario4', role='admin')
+
+        assert 'get_usuarios_raw' not in sheets.chamadas, f"Releitura inesperada ({modo}): {sheets.chamadas}"
+        assert len(sheets.chamadas) == 5, f"Escritas inesperadas ({modo}): {sheets.chamadas}"
+        print(f"  ✓ [{modo}] cada mutação fez exatamente uma escrita, sem releitura")
+
+        por_nome = {linha['Username']: linha for linha in sheets.linhas if linha['Username']}
+        assert 'usuario1' not in por_nome
+        assert por_nome['novo']['Role'] == 'visualizador'
+        assert por_nome['usuario4']['Role'] == 'admin'
+
+        # O mapa em memória continua consistente com a planilha
+        recarregado = UserService(sheets)
+        assert {u.username: u.role for u in recarregado.get_todos_usuarios()} == \
+            {u.username: u.role for u in service.get_todos_usuarios()}
+        print(f"  ✓ [{modo}] planilha consistente com o cache após as mutações")
+
+    return True
+
+
+def test_linha_append_por_thread():
+    """Testa que criações concorrentes leem cada uma a linha do próprio append"""
+    print("\n✅ TESTE 7: Linha do Append por Requisição")
+
+    class _AbaUsuariosLenta:
+        def __init__(self):
+            self.linhas = 1
+            self.lock = threading.Lock()
+
+        def append_row(self, valores):
+            with self.lock:
+                self.linhas += 1
+                linha = self.linhas
+            time.sleep(0.05)  # o append do outro thread termina neste intervalo
+            return {'updates': {'updatedRange': f"'Usuários'!A{linha}:D{linha}"}}
+
+    sheets = SheetsService('/nao/existe/credentials.json', 'x', 'OS', 'Horário', 'Usuários', 'Produção')
+    sheets.sheet_usuarios = _AbaUsuariosLenta()
+    linhas = {}
+
+    def criar(username):
+        assert sheets.add_usuario(username, _hash('senha123'), 'operador')
+        time.sleep(0.1)
+        linhas[username] = sheets.usuarios_last_row
+
+    threads = [threading.Thread(target=criar, args=(f'usuario{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(linhas.values()) == [2, 3, 4, 5], linhas
+    assert sheets.usuarios_last_row is None
+    print("  ✓ Cada thread vê a linha do seu append")
+
+    return True
+
+
+def test_verificador_senhas_limitado():
+    """Testa o pool limitado de verificação, o cache de resultados e o rehash"""
+    print("\n✅ TESTE 8: Verificação de Senhas com Custo Limitado")
+
+    from werkzeug.security import generate_password_hash
+
+    hash_antigo = generate_password_hash('senha123', method='pbkdf2:sha256:1000')
+    sheets = FakeSheetsUsuarios([
+        {'Username': 'turno', 'Senha': hash_antigo, 'Role': 'operador'},
+    ])
+    service = UserService(sheets)
+    verifier = PasswordVerifier(max_workers=1, max_fila=1, user_service=service)
+
+    usuario = service.get_usuario('turno')
+    assert not verifier.verificar(usuario, 'errada')
+    assert verifier.verificar(usuario, 'senha123')
+    print("  ✓ Senha verificada no pool")
+
+    # Rehash em background para o método configurado (custo padrão do Werkzeug)
+    for _ in range(100):
+        if not service.get_usuario('turno').precisa_rehash() and 'update_usuario' in sheets.chamadas:
+            break
+        time.sleep(0.05)
+    assert not service.get_usuario('turno').precisa_rehash()
+    assert sheets.linhas[0]['Senha'] != hash_antigo
+    assert service.get_usuario('turno').verificar_senha('senha123')
+    print("  ✓ Hash antigo refeito após login válido")
+
+    # Com o resultado em cache, não há trabalho de hash no pool
+    assert verifier.verificar(usuario, 'senha123')
+    verifier._em_andamento = verifier.capacidade
+    assert verifier.verificar(usuario, 'senha123'), "Verificação em cache não deveria usar o pool"
+    print("  ✓ Verificação repetida atendida pelo cache")
+
+    # Pool saturado: recusa imediata
+    try:
+        verifier.verificar(usuario, 'outra-senha')
+        assert False, "Deveria recusar com o pool saturado"
+    except VerificadorSaturadoError:
+        pass
+    verifier._em_andamento = 0
+    print("  ✓ Pool saturado recusa imediatamente")
+
+    return True
+
+
+def test_atualizacao_so_publica_apos_gravar():
+    """Testa que o cache só recebe a atualização depois da escrita no Sheets"""
+    print("\n✅ TESTE 9: Atualização Confirmada pelo Sheets")
+
+    senha_hash = _hash('senha123')
+    sheets = FakeSheetsUsuarios([
+        {'Username': 'maria', 'Senha': senha_hash, 'Role': 'operador', 'Data de Cadastro': ''},
+    ])
+    service = UserService(sheets)
+    carimbo = service.carimbo_sessao
+
+    sheets.update_usuario = lambda *args, **kwargs: False
+    assert not service.atualizar_usuario('maria', senha='nova456', role='admin')
+    usuario = service.get_usuario('maria')
+    assert usuario.role == 'operador' and usuario.senha_hash == senha_hash
+    assert usuario.verificar_senha('senha123')
+    assert service.carimbo_sessao == carimbo
+    print("  ✓ Escrita recusada não altera cache nem carimbo")
+
+    del sheets.update_usuario
+    sheets.linhas.clear()
+    service._linhas_usuarios.clear()
+    assert not service.atualizar_usuario('maria', role='admin')
+    assert service.get_usuario('maria').role == 'operador'
+    print("  ✓ Linha ausente na planilha retorna False sem publicar")
+
+    return True
+
+
+def test_logins_simultaneos_saturam_verificador():
+    """Testa que logins simultâneos num mesmo processo saturam o pool e recebem 429"""
+    print("\n✅ TESTE 10: Logins Simultâneos Recebem 429")
+
+    import urllib.error
+    import urllib.parse
+    import urllib.request
+    from werkzeug.security import generate_password_hash
+    from werkzeug.serving import make_server
+    from appmodules.routes.auth_routes import auth_bp
+    from appmodules.routes.os_routes import os_bp
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Procfile')) as procfile:
+        assert '--worker-class gthread' in procfile.read(), "Workers sync nunca saturam o pool"
+
+    # Hash propositalmente caro para que as verificações se sobreponham
+    senha_hash = generate_password_hash('senha123', method='pbkdf2:sha256:400000')
+    sheets = FakeSheetsUsuarios([
+        {'Username': 'turno', 'Senha': senha_hash, 'Role': 'operador'},
+    ])
+    service = UserService(sheets)
+
+    app = Flask(__name__)
+    app.secret_key = 'teste'
+    app.config['WTF_CSRF_ENABLED'] = False
+    CSRFProtect(app)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(os_bp)
+    app.add_url_rule('/producao', endpoint='producao', view_func=lambda: 'producao')
+    app.config['user_service'] = service
+    app.config['password_verifier'] = PasswordVerifier(max_workers=1, max_fila=1, cache_ttl_seconds=0,
+                                                       user_service=service)
+
+    # Servidor com uma thread por requisição, como o worker gthread do gunicorn
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_port}/login"
+    corpo = urllib.parse.urlencode({'username': 'turno', 'password': 'senha123'}).encode()
+
+    class _SemRedirecionar(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    abridor = urllib.request.build_opener(_SemRedirecionar)
+    status = []
+    inicio = threading.Barrier(8)
+
+    def logar():
+        inicio.wait()
+        try:
+            status.append(abridor.open(url, data=corpo, timeout=30).status)
+        except urllib.error.HTTPError as e:
+            status.append(e.code)
+
+    try:
+        threads = [threading.Thread(target=logar) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        servidor.shutdown()
+
+    assert len(status) == 8, status
+    assert 429 in status, f"Nenhum login recusado com o pool saturado: {status}"
+    assert 302 in status, f"Nenhum login aceito: {status}"
+    print(f"  ✓ {status.count(302)} logins aceitos, {status.count(429)} recusados com 429")
+
+    return True
+
+
+def main():
+    """Executa todos os testes"""
+    print("=" * 70)
+    print("🧪 TESTES - USER SERVICE")
+    print("=" * 70)
+
+    testes = [
+        test_indice_username_case_insensitive,
+        test_lookup_tempo_constante,
+        test_snapshot_autorizacao_sessao,
+        test_sincronizacao_entre_workers,
+        test_migracao_senhas_legadas_em_background,
+        test_mapa_linhas_sem_releitura,
+        test_linha_append_por_thread,
+        test_verificador_senhas_limitado,
+        test_atualizacao_so_publica_apos_gravar,
+        test_logins_simultaneos_saturam_verificador,
+    ]
+
+    resultados = []
+    for teste in testes:
+        try:
+            resultados.append((teste.__name__, teste()))
+        except Exception as e:
+            print(f"  ✗ Erro: {e}")
+            resultados.append((teste.__name__, False))
+
+    print("\n" + "=" * 70)
+    print("📊 RESUMO")
+    print("=" * 70)
+
+    total = len(resultados)
+    passou = sum(1 for _, r in resultados if r)
+    for nome, resultado in resultados:
+        print(f"{'✅' if resultado else '❌'} {nome}")
+
+    print(f"\n{passou}/{total} testes passaram")
+    return 0 if passou == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
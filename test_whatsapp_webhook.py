@@ -4,6 +4,11 @@ Testes para WhatsApp Webhook Service
 """
 
 import json
+import os
+import re
+import tempfile
+import time
+from appmodules.services.idempotency_store import IdempotencyStore
 from appmodules.services.whatsapp_webhook_service import WhatsAppWebhookService
 
 
@@ -208,6 +213,162 @@ def test_gerar_mensagem_ajuda():
     return True
 
 
+def test_benchmark_extrair_comando():
+    """Micro-benchmark: regex combinada x laço sobre padrões não compilados"""
+    print("\n✅ TESTE 11: Benchmark Extrair Comando")
+
+    service = WhatsAppWebhookService()
+
+    def extrair_comando_laco(mensagem):
+        """Implementação de referência: um re.search por comando"""
+        mensagem = mensagem.strip().lower()
+        for tipo_comando, padrao in WhatsAppWebhookService.COMANDOS.items():
+            match = re.search(padrao, mensagem)
+            if match:
+                if tipo_comando == 'ajuda':
+                    return {'tipo': 'ajuda', 'numero_os': None}
+                return {'tipo': tipo_comando, 'numero_os': match.group(1).upper()}
+        return None
+
+    mensagens = [
+        "status OS-2026-001",
+        "concluído OS-2026-002",
+        "cheguei OS-2026-003",
+        "retomar OS-2026-004",
+        "pause OS-2026-005",
+        "ajuda",
+        "Olá, bom dia a todos da equipe de manutenção",
+        "preciso de ajuda com status OS-2026-006",
+        "pausa status OS-2026-007",
+    ] * 200
+
+    for mensagem in mensagens[:9]:
+        assert service.extrair_comando(mensagem) == extrair_comando_laco(mensagem), mensagem
+
+    inicio = time.perf_counter()
+    for mensagem in mensagens:
+        extrair_comando_laco(mensagem)
+    tempo_laco = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for mensagem in mensagens:
+        service.extrair_comando(mensagem)
+    tempo_compilado = time.perf_counter() - inicio
+
+    por_mensagem_us = tempo_compilado / len(mensagens) * 1_000_000
+    print(f"  ✓ Laço re.search: {tempo_laco * 1000:.2f} ms ({len(mensagens)} mensagens)")
+    print(f"  ✓ Regex combinada: {tempo_compilado * 1000:.2f} ms ({por_mensagem_us:.1f} µs/mensagem)")
+
+    # Limite folgado para não falhar em máquinas lentas de CI
+    assert por_mensagem_us < 200, f"extrair_comando lento demais: {por_mensagem_us:.1f} µs/mensagem"
+
+    return True
+
+
+def test_extrair_comando_prioridade():
+    """Testa mensagens com mais de um comando: vale a prioridade de COMANDOS"""
+    print("\n✅ TESTE 12: Prioridade entre Comandos")
+
+    service = WhatsAppWebhookService()
+
+    testes = [
+        ("preciso de ajuda com status OS-2026-1", {"tipo": "status", "numero_os": "OS-2026-1"}),
+        ("tudo bem? status OS-5", {"tipo": "status", "numero_os": "OS-5"}),
+        ("pausa status OS-7", {"tipo": "status", "numero_os": "OS-7"}),
+        ("help, pausa OS-8 e retomar OS-9", {"tipo": "pausa", "numero_os": "OS-8"}),
+        ("cheguei OS-1, concluir OS-2", {"tipo": "concluir", "numero_os": "OS-2"}),
+    ]
+
+    for mensagem, esperado in testes:
+        resultado = service.extrair_comando(mensagem)
+        assert resultado == esperado, f"Falhou para '{mensagem}': {resultado} != {esperado}"
+        print(f"  ✓ '{mensagem}' -> {resultado}")
+
+    return True
+
+
+def test_idempotencia_mensagens():
+    """Testa descarte de reentregas pelo id da mensagem"""
+    print("\n✅ TESTE 13: Idempotência de Mensagens")
+
+    service = WhatsAppWebhookService()
+    assert service.registrar_mensagem('wamid.ABC') == True
+    assert service.registrar_mensagem('wamid.ABC') == False
+    assert service.registrar_mensagem('wamid.DEF') == True
+    print("  ✓ Duplicata em memória descartada")
+
+    # LRU limitado: a chave mais antiga sai primeiro
+    store = IdempotencyStore(ttl_seconds=60, max_entries=2)
+    store.registrar('a')
+    store.registrar('b')
+    store.registrar('c')
+    assert len(store) == 2
+    assert store.registrar('a') == True
+    print("  ✓ LRU limitado a max_entries")
+
+    # SQLite compartilhado: outro "worker" enxerga a mesma chave
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'dedup.sqlite3')
+        worker_1 = IdempotencyStore(ttl_seconds=60, db_path=db_path)
+        worker_2 = IdempotencyStore(ttl_seconds=60, db_path=db_path)
+        assert worker_1.registrar('wamid.XYZ') == True
+        assert worker_2.registrar('wamid.XYZ') == False
+        print("  ✓ Duplicata detectada entre workers via SQLite")
+
+        # Chave expirada volta a ser aceita
+        curto = IdempotencyStore(ttl_seconds=1, db_path=os.path.join(tmp, 'curto.sqlite3'))
+        assert curto.registrar('wamid.EXP') == True
+        time.sleep(1.1)
+        assert curto.registrar('wamid.EXP') == True
+        print("  ✓ Chave expirada aceita novamente")
+
+    return True
+
+
+def test_webhook_reentrega_apos_falha():
+    """Testa que uma entrega que falhou não bloqueia a reentrega do provedor"""
+    print("\n✅ TESTE 14: Reentrega Após Falha no Processamento")
+
+    os.environ.setdefault('SECRET_KEY', 'teste-webhook')
+    import app as aplicacao
+
+    class _WebhookInstavel(WhatsAppWebhookService):
+        """Primeira chamada de processamento falha; as seguintes funcionam."""
+
+        chamadas = 0
+
+        def processar_mensagem(self, dados):
+            self.chamadas += 1
+            if self.chamadas == 1:
+                raise RuntimeError('Sheets fora do ar')
+            return super().processar_mensagem(dados)
+
+    service = _WebhookInstavel(whatsapp_phone=None)
+    service.enabled = True
+    original = aplicacao.app.config['webhook_service']
+    aplicacao.app.config['webhook_service'] = service
+    try:
+        client = aplicacao.app.test_client()
+        corpo = {'entry': [{'changes': [{'value': {'messages': [{
+            'id': 'wamid.FALHA', 'type': 'text', 'from': '5512982200009',
+            'timestamp': '1767261600', 'text': {'body': 'status OS-2026-001'},
+        }]}}]}]}
+
+        assert client.post('/webhook/whatsapp', json=corpo).status_code == 500
+        resposta = client.post('/webhook/whatsapp', json=corpo)
+        assert resposta.status_code == 200 and not resposta.get_json().get('duplicada')
+        assert resposta.get_json()['resultado']['tipo'] == 'status' and service.chamadas == 2
+        print("  ✓ Falha libera o id; a reentrega é processada")
+
+        resposta = client.post('/webhook/whatsapp', json=corpo)
+        assert resposta.get_json().get('duplicada') is True and service.chamadas == 2
+        print("  ✓ Depois do sucesso, nova reentrega é descartada")
+    finally:
+        aplicacao.app.config['webhook_service'] = original
+
+    return True
+
+
 def main():
     """Executa todos os testes"""
     print("=" * 70)
@@ -225,6 +386,10 @@ def main():
         test_processar_comando_status,
         test_validar_remetente_autorizado,
         test_gerar_mensagem_ajuda,
+        test_benchmark_extrair_comando,
+        test_extrair_comando_prioridade,
+        test_idempotencia_mensagens,
+        test_webhook_reentrega_apos_falha,
     ]
     
     resultados = []